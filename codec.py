@@ -0,0 +1,368 @@
+"""Compact binary response framing (MessagePack subset + CRC16), MicroPython compatible.
+
+Frame layout (all integers big-endian):
+
+  0xA5 | len:u16 | payload[len] | crc16:u16
+
+`payload` is MessagePack (nil, bool, int, float32, str, array, map). Map keys
+listed in KEY_TABLE are sent as their positive-fixint index instead of a string.
+`crc16` is CRC-16/CCITT-FALSE over the len field and payload. Requests stay JSONL.
+"""
+
+import config
+import protocol
+
+try:
+  import ustruct as _struct
+except ImportError:
+  import struct as _struct
+
+
+FRAMING_JSONL = "jsonl"
+FRAMING_MSGPACK = "mpk"
+FRAMINGS = (FRAMING_JSONL, FRAMING_MSGPACK)
+
+MAGIC = 0xA5
+HEADER_BYTES = 3
+CRC_BYTES = 2
+
+# Append-only: the index is the wire id, shared with the ESP decoder.
+KEY_TABLE = (
+  "req_id",
+  "ok",
+  "result",
+  "error",
+  "code",
+  "message",
+  "status",
+  "tool",
+  "person",
+  "faces_detected",
+  "objects",
+  "confidence",
+  "frames",
+  "truncated",
+  "debug",
+  "fw_version",
+  "protocol_version",
+  "capabilities",
+  "faces",
+  "learn",
+  "sd",
+  "framings",
+  "framing",
+  "elapsed_ms",
+  "templates",
+  "object_model",
+  "reader",
+  "rx_dispatch_us",
+  "n",
+  "last",
+  "max",
+  "avg",
+  "baud",
+  "confirm_ms",
+  "results",
+  "cmd",
+  "dedup",
+  "entries",
+  "bytes",
+  "hits",
+  "misses",
+  "evictions",
+  "expired",
+  "attached",
+  "interleaved",
+  "target_req_id",
+  "cancelled",
+  "partial",
+  "stage_ms",
+  "capture",
+  "face_detect",
+  "face_match",
+  "frames_used",
+  "motion",
+  "ran",
+  "reused",
+  "age_ms",
+  "sensor",
+  "profile",
+  "switches",
+  "switch_ms",
+  "prep",
+  "done",
+  "saved",
+  "recover",
+  "camera",
+  "face",
+  "other",
+  "full",
+  "persons",
+  "recognizer",
+  "name",
+  "score",
+  "margin",
+  "conf",
+  "bbox",
+  "reader_downgrades",
+  "loaded",
+  "failed",
+)
+
+_KEY_IDS = {}
+for _i in range(len(KEY_TABLE)):
+  _KEY_IDS[KEY_TABLE[_i]] = _i
+
+
+class CodecError(Exception):
+  pass
+
+
+def _build_crc_table():
+  table = []
+  for i in range(256):
+    crc = i << 8
+    for _ in range(8):
+      if crc & 0x8000:
+        crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+      else:
+        crc = (crc << 1) & 0xFFFF
+    table.append(crc)
+  return table
+
+
+_CRC_TABLE = _build_crc_table()
+
+
+def crc16(data, crc=0xFFFF):
+  table = _CRC_TABLE
+  for b in data:
+    crc = ((crc << 8) & 0xFFFF) ^ table[((crc >> 8) ^ b) & 0xFF]
+  return crc
+
+
+def _pack_int(out, v):
+  if 0 <= v <= 0x7F:
+    out.append(v)
+  elif -32 <= v < 0:
+    out.append(v & 0xFF)
+  elif 0 <= v <= 0xFF:
+    out.append(0xCC)
+    out.append(v)
+  elif 0 <= v <= 0xFFFF:
+    out.extend(_struct.pack(">BH", 0xCD, v))
+  elif 0 <= v <= 0xFFFFFFFF:
+    out.extend(_struct.pack(">BI", 0xCE, v))
+  elif -0x80 <= v < 0:
+    out.extend(_struct.pack(">Bb", 0xD0, v))
+  elif -0x8000 <= v < 0:
+    out.extend(_struct.pack(">Bh", 0xD1, v))
+  elif -0x80000000 <= v < 0:
+    out.extend(_struct.pack(">Bi", 0xD2, v))
+  elif v > 0:
+    out.extend(_struct.pack(">BQ", 0xCF, v))
+  else:
+    out.extend(_struct.pack(">Bq", 0xD3, v))
+
+
+def _pack_str(out, text):
+  raw = text.encode("utf-8")
+  n = len(raw)
+  if n < 32:
+    out.append(0xA0 | n)
+  elif n <= 0xFF:
+    out.append(0xD9)
+    out.append(n)
+  else:
+    out.extend(_struct.pack(">BH", 0xDA, n))
+  out.extend(raw)
+
+
+def _pack_len(out, n, fix_tag, tag16):
+  if n < 16:
+    out.append(fix_tag | n)
+  else:
+    out.extend(_struct.pack(">BH", tag16, n))
+
+
+def _pack(out, obj):
+  if obj is None:
+    out.append(0xC0)
+  elif obj is True:
+    out.append(0xC3)
+  elif obj is False:
+    out.append(0xC2)
+  elif isinstance(obj, int):
+    _pack_int(out, obj)
+  elif isinstance(obj, float):
+    out.extend(_struct.pack(">Bf", 0xCA, obj))
+  elif isinstance(obj, str):
+    _pack_str(out, obj)
+  elif isinstance(obj, dict):
+    _pack_len(out, len(obj), 0x80, 0xDE)
+    for key in obj:
+      key_id = _KEY_IDS.get(key)
+      if key_id is None:
+        _pack_str(out, str(key))
+      else:
+        out.append(key_id)
+      _pack(out, obj[key])
+  elif isinstance(obj, (list, tuple)):
+    _pack_len(out, len(obj), 0x90, 0xDC)
+    for item in obj:
+      _pack(out, item)
+  else:
+    raise CodecError("unsupported type")
+
+
+def pack(obj):
+  out = bytearray()
+  _pack(out, obj)
+  return bytes(out)
+
+
+_INT_FORMATS = {
+  0xCC: ">B",
+  0xCD: ">H",
+  0xCE: ">I",
+  0xCF: ">Q",
+  0xD0: ">b",
+  0xD1: ">h",
+  0xD2: ">i",
+  0xD3: ">q",
+}
+
+
+def _unpack(data, pos):
+  tag = data[pos]
+  pos += 1
+  if tag <= 0x7F:
+    return tag, pos
+  if tag >= 0xE0:
+    return tag - 0x100, pos
+  if 0xA0 <= tag <= 0xBF:
+    n = tag & 0x1F
+    return bytes(data[pos:pos + n]).decode("utf-8"), pos + n
+  if 0x90 <= tag <= 0x9F:
+    return _unpack_array(data, pos, tag & 0x0F)
+  if 0x80 <= tag <= 0x8F:
+    return _unpack_map(data, pos, tag & 0x0F)
+  if tag == 0xC0:
+    return None, pos
+  if tag == 0xC2:
+    return False, pos
+  if tag == 0xC3:
+    return True, pos
+  if tag == 0xCA:
+    return _struct.unpack(">f", bytes(data[pos:pos + 4]))[0], pos + 4
+  if tag == 0xCB:
+    return _struct.unpack(">d", bytes(data[pos:pos + 8]))[0], pos + 8
+  fmt = _INT_FORMATS.get(tag)
+  if fmt is not None:
+    size = _struct.calcsize(fmt)
+    return _struct.unpack(fmt, bytes(data[pos:pos + size]))[0], pos + size
+  if tag == 0xD9:
+    n = data[pos]
+    pos += 1
+    return bytes(data[pos:pos + n]).decode("utf-8"), pos + n
+  if tag == 0xDA:
+    n = _struct.unpack(">H", bytes(data[pos:pos + 2]))[0]
+    pos += 2
+    return bytes(data[pos:pos + n]).decode("utf-8"), pos + n
+  if tag == 0xDC:
+    n = _struct.unpack(">H", bytes(data[pos:pos + 2]))[0]
+    return _unpack_array(data, pos + 2, n)
+  if tag == 0xDE:
+    n = _struct.unpack(">H", bytes(data[pos:pos + 2]))[0]
+    return _unpack_map(data, pos + 2, n)
+  raise CodecError("bad_tag")
+
+
+def _unpack_array(data, pos, n):
+  items = []
+  for _ in range(n):
+    item, pos = _unpack(data, pos)
+    items.append(item)
+  return items, pos
+
+
+def _unpack_map(data, pos, n):
+  out = {}
+  for _ in range(n):
+    key, pos = _unpack(data, pos)
+    if isinstance(key, int) and 0 <= key < len(KEY_TABLE):
+      key = KEY_TABLE[key]
+    value, pos = _unpack(data, pos)
+    out[key] = value
+  return out, pos
+
+
+def unpack(data):
+  try:
+    obj, pos = _unpack(data, 0)
+  except (IndexError, ValueError):
+    raise CodecError("truncated")
+  if pos != len(data):
+    raise CodecError("trailing")
+  return obj
+
+
+def frame(payload_bytes):
+  n = len(payload_bytes)
+  if n > 0xFFFF:
+    raise CodecError("too_long")
+  out = bytearray(HEADER_BYTES + n + CRC_BYTES)
+  out[0] = MAGIC
+  out[1] = (n >> 8) & 0xFF
+  out[2] = n & 0xFF
+  out[HEADER_BYTES:HEADER_BYTES + n] = payload_bytes
+  crc = crc16(memoryview(out)[1:HEADER_BYTES + n])
+  out[HEADER_BYTES + n] = (crc >> 8) & 0xFF
+  out[HEADER_BYTES + n + 1] = crc & 0xFF
+  return bytes(out)
+
+
+def is_frame(raw):
+  return len(raw) > 0 and raw[0] == MAGIC
+
+
+def encode_frame(payload, req_id=None, max_bytes=config.MAX_JSON_BYTES):
+  """Frame `payload`, shedding result fields like protocol.safe_json_encode()."""
+  overhead = HEADER_BYTES + CRC_BYTES
+
+  def _try(obj):
+    body = pack(obj)
+    if len(body) + overhead > max_bytes:
+      return None
+    return frame(body)
+
+  raw = _try(payload)
+  if raw is not None:
+    return raw
+  raw = protocol.shed_to_fit(payload, _try)
+  if raw is not None:
+    return raw
+
+  err_req_id = req_id
+  if err_req_id is None and isinstance(payload, dict):
+    err_req_id = payload.get("req_id")
+  raw = _try(protocol.short_error(err_req_id, "BAD_REQUEST", "too_long"))
+  if raw is not None:
+    return raw
+  return frame(pack(protocol.short_error(None, "BAD_REQUEST", "too_long")))
+
+
+def decode_frame(buf):
+  """Decode one frame from the start of `buf`; returns (payload, consumed)."""
+  if len(buf) < HEADER_BYTES + CRC_BYTES:
+    raise CodecError("short")
+  if buf[0] != MAGIC:
+    raise CodecError("bad_magic")
+  n = (buf[1] << 8) | buf[2]
+  end = HEADER_BYTES + n
+  if len(buf) < end + CRC_BYTES:
+    raise CodecError("short")
+  want = (buf[end] << 8) | buf[end + 1]
+  if crc16(memoryview(buf)[1:end]) != want:
+    raise CodecError("bad_crc")
+  return unpack(memoryview(buf)[HEADER_BYTES:end]), end + CRC_BYTES
@@ -10,21 +10,78 @@ UART_ID = 0
 UART_TX_PIN = 34
 UART_RX_PIN = 35
 UART_BAUD = 115200
+# Rates accepted by SET_BAUD. A switch must be confirmed by a PING at the new
+# rate within UART_BAUD_CONFIRM_MS, otherwise the runtime reverts.
+# Confirmed rates are persisted in SD config under UART_BAUD_CONFIG_KEY.
+UART_BAUD_RATES = (115200, 230400, 460800, 921600, 1500000)
+UART_BAUD_CONFIRM_MS = 1500
+UART_BAUD_CONFIG_KEY = "uart_baud"
 UART_READ_TIMEOUT_MS = 120
 UART_LINE_TIMEOUT_MS = 300
 UART_MAX_LINE_BYTES = 1024
+# How LineReader waits for request bytes: "poll" (uselect), "any" (uart.any()),
+# or "loop" (blocking read + 2 ms backoff). Unsupported modes fall back in that order.
+UART_WAIT_MODE = "poll"
 
 # USB REPL / stdout debug logging (does not affect Grove JSONL UART).
 USB_DEBUG_LOG = True
 
 # Protocol and runtime limits
 MAX_JSON_BYTES = 768
+# Result fields shed (in order) to fit MAX_JSON_BYTES before failing with too_long.
+# List fields lose their tail one entry at a time; others are dropped whole.
+JSON_SHED_ORDER = ("debug", "objects", "faces", "confidence")
 MAX_OBJECTS = 16
 MAX_SCAN_FRAMES = 5
 MAX_LEARN_FRAMES = 15
+MAX_BATCH_CMDS = 4
 # K210 object/scan inference can exceed 3s on some frames after cold/recover paths.
 COMMAND_TIMEOUT_MS = 5000
 DEDUP_TTL_MS = 2000
+# Hard bounds for cached responses; least-recently-used entries are evicted first.
+DEDUP_MAX_ENTRIES = 32
+DEDUP_MAX_BYTES = 8192
+# Per-stage frame cost estimates (EWMA, ms). A SCAN/WHO/OBJECTS frame is only
+# started when its estimated cost plus DEADLINE_GUARD_MS fits before the
+# command deadline; otherwise the frames already done are returned as partial.
+STAGE_COST_ALPHA = 0.25
+DEADLINE_GUARD_MS = 100
+# RELIABLE mode stops capturing once the person winner cannot change and the
+# object label set was identical for OBJECTS_STABLE_FRAMES frames in a row
+# (0 = objects never settle early). Responses then carry frames_used.
+EARLY_EXIT_VOTING = True
+OBJECTS_STABLE_FRAMES = 2
+# Motion gate: each frame is reduced to a MOTION_GRID x MOTION_GRID grid of
+# mean luminance. While the mean per-cell delta against the frame a face/object
+# result was computed on stays <= MOTION_THRESHOLD, that result is reused
+# (for at most MOTION_MAX_REUSE_MS) instead of running the KPU again.
+MOTION_GATE_ENABLED = True
+MOTION_GRID = 4
+MOTION_THRESHOLD = 4
+MOTION_MAX_REUSE_MS = 3000
+# SCAN/WHO/OBJECTS with args.max_age_ms may be answered from the last result of
+# the same command and frame count (SCAN also fills WHO/OBJECTS). Entries older
+# than RESULT_CACHE_TTL_MS are never served, whatever max_age_ms says.
+RESULT_CACHE_TTL_MS = 5000
+# Sensor profiles: output window per use. Face detection needs the full QVGA
+# frame; OBJECTS-only requests can take the object model input straight from
+# the sensor window and skip the per-frame CPU resize. Switching costs a
+# settle delay (tracked in debug.sensor), so the objects window is only used
+# after SENSOR_PROFILE_STREAK OBJECTS-only requests in a row.
+SENSOR_PROFILES = {
+  "faces": (320, 240),
+  "objects": (224, 224),
+}
+SENSOR_PROFILE_STREAK = 2
+SENSOR_PROFILE_SETTLE_MS = 100
+# Recovery after VISION_FAILED/TIMEOUT resets only the failed component
+# (camera, face model or object model). After RECOVER_ESCALATE_AFTER failures
+# of one component without a success in between, the whole runtime is reset;
+# full resets are spaced by a backoff that starts at RECOVER_BACKOFF_MS and
+# doubles up to RECOVER_BACKOFF_MAX_MS.
+RECOVER_ESCALATE_AFTER = 3
+RECOVER_BACKOFF_MS = 2000
+RECOVER_BACKOFF_MAX_MS = 30000
 
 # Canonical labels
 PERSON_OWNER_1 = "OWNER_1"
@@ -32,10 +89,39 @@ PERSON_OWNER_2 = "OWNER_2"
 PERSON_UNKNOWN = "UNKNOWN"
 PERSON_NONE = "NONE"
 KNOWN_PERSONS = (PERSON_OWNER_1, PERSON_OWNER_2)
+# Face gallery: up to GALLERY_MAX_PERSONS person IDs (A-Z, 0-9, _; at most
+# GALLERY_MAX_ID_LEN chars), each with up to GALLERY_MAX_TEMPLATES templates
+# (LEARN past that replaces the oldest). KNOWN_PERSONS are the legacy IDs whose
+# single owner_N.jpg is picked up when no gallery index exists yet.
+GALLERY_MAX_PERSONS = 16
+GALLERY_MAX_TEMPLATES = 5
+GALLERY_MAX_ID_LEN = 16
+# Matching compares a GALLERY_COARSE_GRID^2 summary of every template first and
+# runs the full feature distance only on the GALLERY_SHORTLIST closest (0 = all).
+GALLERY_COARSE_GRID = 4
+GALLERY_SHORTLIST = 4
+# Face recognizer backend: "difference" (feature thumbnails above) or
+# "embedding" (feature-extractor kmodel on the KPU, cosine similarity against
+# the enrolled embeddings). Embedding scores are (1 - cos) * 100.
+FACE_RECOGNIZER = "difference"
+FACE_EMBED_MODEL_SD_PATH = "/sd/models/face_features.kmodel"
+FACE_EMBED_MODEL_ADDR = None
+FACE_EMBED_INPUT = 128
+FACE_EMBED_SCORE_STRONG = 15
+FACE_EMBED_SCORE = 25
+# WHO/SCAN with "all_faces": up to MULTI_FACE_MAX detections per frame are
+# recognized (largest first) and followed across frames by bbox overlap
+# (IoU >= MULTI_FACE_TRACK_IOU percent) so each face gets its own vote.
+MULTI_FACE_MAX = 4
+MULTI_FACE_TRACK_IOU = 30
 
 # Vision thresholds
 FACE_SCORE_THRESH_STRONG = 12
 FACE_SCORE_THRESH = 18
+# Face templates and candidates are reduced once to a FACE_FEATURE_GRID x
+# FACE_FEATURE_GRID grayscale thumbnail; the match score is their mean absolute
+# difference on the 0..100 L scale, so the thresholds above still apply.
+FACE_FEATURE_GRID = 16
 
 # KPU model locations
 FACE_MODEL_ADDR = 0x300000
@@ -43,6 +129,9 @@ OBJECT_MODEL_SD_PATH = "/sd/models/objects.kmodel"
 OBJECT_MODEL_FLASH_ADDR = None
 OBJECT_CLASSES_SD_PATH = "/sd/models/classes.txt"
 OBJECT_LABEL_MAP_SD_PATH = "/sd/models/label_map.json"
+# Learned object-model input size, persisted in SD config per model
+# ("<path>:<size>" or "flash:<addr>") so frames are resized up front after boot.
+OBJECT_MODEL_DIMS_CONFIG_KEY = "object_model_dims"
 
 # YOLOv2 anchors (face detector defaults for K210 face model at 0x300000)
 FACE_YOLO_ANCHORS = (
@@ -2,12 +2,23 @@
 
 import config
 import storage
+from frames import frame_context
 
 try:
   import utime as _time
 except ImportError:
   import time as _time
 
+try:
+  import uos as _os
+except ImportError:
+  import os as _os
+
+try:
+  from array import array
+except ImportError:
+  from uarray import array
+
 
 class VisionError(Exception):
   def __init__(self, code, message):
@@ -39,20 +50,6 @@ def _clamp(v, lo, hi):
   return v
 
 
-def _safe_stat_l_mean(stat):
-  if stat is None:
-    return 255
-  if hasattr(stat, "l_mean"):
-    try:
-      return int(stat.l_mean())
-    except Exception:
-      pass
-  try:
-    return int(stat[0])
-  except Exception:
-    return 255
-
-
 def _safe_stat_l_stdev(stat):
   if stat is None:
     return 0
@@ -67,6 +64,381 @@ def _safe_stat_l_stdev(stat):
     return 0
 
 
+def _luma(pixel):
+  if isinstance(pixel, int):
+    return pixel
+  return (pixel[0] * 77 + pixel[1] * 150 + pixel[2] * 29) >> 8
+
+
+def _gray_buffer(img, n):
+  """The n pixels of an 8-bit grayscale `img` as one buffer, or None."""
+  try:
+    buf = memoryview(img)
+  except Exception:
+    try:
+      buf = img.to_bytes()
+    except Exception:
+      return None
+  if len(buf) != n:
+    return None
+  return buf
+
+
+def face_features(img, grid=None):
+  """Grayscale grid x grid thumbnail of a face image as array("B"), or None if unsupported."""
+  if grid is None:
+    grid = config.FACE_FEATURE_GRID
+  try:
+    small = img
+    if int(img.width()) != grid or int(img.height()) != grid:
+      small = img.resize(grid, grid)
+    n = grid * grid
+    pix = _gray_buffer(small, n)
+    if pix is None:
+      # Colour crop (e.g. a template JPEG): convert once, in place unless it is the caller's.
+      try:
+        small = small.to_grayscale(copy=small is img)
+        pix = _gray_buffer(small, n)
+      except Exception:
+        pix = None
+    if pix is not None:
+      out = array("B", pix)
+      total = sum(out)
+    else:
+      # Last resort for images that expose no pixel buffer.
+      out = array("B", bytes(n))
+      i = 0
+      total = 0
+      for y in range(grid):
+        for x in range(grid):
+          v = _luma(small.get_pixel(x, y))
+          out[i] = v
+          total += v
+          i += 1
+    # Centre on mid-grey so a global lighting change does not count as a mismatch.
+    shift = 128 - total // n
+    for i in range(n):
+      v = out[i] + shift
+      out[i] = 0 if v < 0 else (255 if v > 255 else v)
+    return out
+  except Exception:
+    return None
+
+
+def feature_distance(a, b, limit=255):
+  """Mean absolute difference of two feature vectors on the 0..100 L scale.
+
+  Gives up with 255 once the score is certain to exceed `limit`.
+  """
+  n = len(a)
+  if n == 0 or len(b) != n:
+    return 255
+  bound = (limit + 1) * 255 * n // 100
+  total = 0
+  i = 0
+  while i < n:
+    d = a[i] - b[i]
+    if d < 0:
+      d = -d
+    total += d
+    i += 1
+    if total > bound:
+      return 255
+  return total * 100 // (255 * n)
+
+
+def coarse_features(features, grid=None):
+  """Block means of a face_features() vector on a grid x grid layout, for cheap pruning."""
+  if grid is None:
+    grid = config.GALLERY_COARSE_GRID
+  side = config.FACE_FEATURE_GRID
+  block = side // grid
+  out = array("B", bytes(grid * grid))
+  area = block * block
+  for gy in range(grid):
+    for gx in range(grid):
+      total = 0
+      for y in range(gy * block, (gy + 1) * block):
+        row = y * side
+        for x in range(gx * block, (gx + 1) * block):
+          total += features[row + x]
+      out[gy * grid + gx] = total // area
+  return out
+
+
+def person_id(value):
+  """Normalized (upper-case) gallery ID, or None if `value` cannot be one."""
+  if not isinstance(value, str):
+    return None
+  pid = value.upper()
+  if not pid or len(pid) > config.GALLERY_MAX_ID_LEN:
+    return None
+  if pid in (config.PERSON_UNKNOWN, config.PERSON_NONE):
+    return None
+  for ch in pid:
+    if not ("A" <= ch <= "Z" or "0" <= ch <= "9" or ch == "_"):
+      return None
+  return pid
+
+
+def _track_best(best, person, score):
+  """Fold `score` into best = [person, score, runner-up score of another person]."""
+  if score < best[1]:
+    if person != best[0]:
+      best[2] = best[1]
+    best[0] = person
+    best[1] = score
+  elif person != best[0] and score < best[2]:
+    best[2] = score
+
+
+class DifferenceRecognizer:
+  """Gallery of face_features() thumbnails, matched coarse-to-fine by mean absolute difference.
+
+  Recognizer interface (see also EmbeddingRecognizer): name, roi_size,
+  roi_gray (whether a grayscale face crop is enough), thresholds(), describe(img), add/remove/clear/persons/len, match(vector)
+  and last ({"score", "margin"} of the latest match).
+  """
+
+  name = "difference"
+
+  def __init__(self):
+    # Blit faces straight at feature size; face_features() then needs no resize.
+    self.roi_size = config.FACE_FEATURE_GRID
+    self.roi_gray = True
+    # (person, features, coarse features), oldest first.
+    self._entries = []
+    self.last = None
+
+  def __len__(self):
+    return len(self._entries)
+
+  def thresholds(self):
+    return config.FACE_SCORE_THRESH_STRONG, config.FACE_SCORE_THRESH
+
+  def describe(self, img):
+    return face_features(img)
+
+  def deinit(self):
+    pass
+
+  def persons(self):
+    counts = {}
+    for entry in self._entries:
+      counts[entry[0]] = counts.get(entry[0], 0) + 1
+    return counts
+
+  def add(self, person, features):
+    self._entries.append((person, features, coarse_features(features)))
+    own = [entry for entry in self._entries if entry[0] == person]
+    if len(own) > config.GALLERY_MAX_TEMPLATES:
+      self._entries.remove(own[0])
+
+  def remove(self, person):
+    kept = [entry for entry in self._entries if entry[0] != person]
+    removed = len(self._entries) - len(kept)
+    self._entries = kept
+    return removed
+
+  def clear(self):
+    self._entries = []
+
+  def match(self, features):
+    """(person, score) of the closest template; (UNKNOWN, 255) when nothing is enrolled."""
+    entries = self._entries
+    shortlist = config.GALLERY_SHORTLIST
+    if shortlist and len(entries) > shortlist:
+      coarse = coarse_features(features)
+      ranked = []
+      for i in range(len(entries)):
+        ranked.append((feature_distance(coarse, entries[i][2]), i))
+      ranked.sort()
+      entries = [entries[i] for _, i in ranked[:shortlist]]
+
+    best = [config.PERSON_UNKNOWN, 255, 255]
+    for person, template, _ in entries:
+      # Cut off at the runner-up, not the best, so the margin stays exact.
+      _track_best(best, person, feature_distance(features, template, best[2]))
+    self.last = {"score": best[1], "margin": best[2] - best[1]}
+    return best[0], best[1]
+
+
+def _unit_vector(values):
+  total = 0.0
+  for v in values:
+    total += v * v
+  if total <= 0.0:
+    return None
+  scale = 1.0 / (total ** 0.5)
+  out = array("f", values)
+  for i in range(len(out)):
+    out[i] *= scale
+  return out
+
+
+class EmbeddingRecognizer:
+  """Gallery matrix of unit-length embeddings from a face feature-extractor kmodel.
+
+  The score is (1 - cosine similarity) * 100, so lower is better as with
+  DifferenceRecognizer, against FACE_EMBED_SCORE(_STRONG).
+  """
+
+  name = "embedding"
+
+  def __init__(self, kpu_mod=None, image_mod=None):
+    self._kpu = kpu_mod
+    self._image = image_mod
+    self._task = None
+    self.roi_size = config.FACE_EMBED_INPUT
+    self.roi_gray = False
+    # Row i of the matrix (dim floats) is an embedding of _rows[i]; oldest first.
+    self._rows = []
+    self._matrix = array("f")
+    self._dim = 0
+    self.last = None
+
+  def __len__(self):
+    return len(self._rows)
+
+  def thresholds(self):
+    return config.FACE_EMBED_SCORE_STRONG, config.FACE_EMBED_SCORE
+
+  def _resolve_model(self):
+    if storage.sd_available():
+      try:
+        _os.stat(config.FACE_EMBED_MODEL_SD_PATH)
+        return config.FACE_EMBED_MODEL_SD_PATH
+      except Exception:
+        pass
+    return config.FACE_EMBED_MODEL_ADDR
+
+  def _ensure_model(self):
+    if self._task is not None:
+      return
+    if self._kpu is None:
+      import KPU as kpu_mod
+      self._kpu = kpu_mod
+    model_ref = self._resolve_model()
+    if model_ref is None:
+      raise VisionError("MODEL_MISSING", "face_embed_model")
+    try:
+      self._task = self._kpu.load(model_ref)
+    except Exception:
+      raise VisionError("MODEL_MISSING", "face_embed_model")
+
+  def deinit(self):
+    if self._kpu is not None and self._task is not None:
+      try:
+        self._kpu.deinit(self._task)
+      except Exception:
+        pass
+    self._task = None
+
+  def _is_grayscale(self, img):
+    if self._image is None:
+      import image as image_mod
+      self._image = image_mod
+    try:
+      return img.format() == self._image.GRAYSCALE
+    except Exception:
+      return False
+
+  def _model_input(self, img):
+    """`img` as the model wants it: RGB at roi_size x roi_size.
+
+    Templates may be legacy 64x64 crops or grayscale JPEGs saved by the
+    difference backend.
+    """
+    size = self.roi_size
+    if int(img.width()) != size or int(img.height()) != size:
+      img = img.resize(size, size)
+    if self._is_grayscale(img):
+      try:
+        img = img.to_rgb565(copy=True)
+      except Exception:
+        rgb = self._image.Image(size=(size, size))
+        rgb.draw_image(img, 0, 0)
+        img = rgb
+    return img
+
+  def describe(self, img):
+    self._ensure_model()
+    try:
+      img = self._model_input(img)
+      try:
+        img.pix_to_ai()
+      except Exception:
+        pass
+      fmap = self._kpu.forward(self._task, img)
+      return _unit_vector(fmap[:])
+    except Exception:
+      raise VisionError("VISION_FAILED", "face_embed")
+
+  def persons(self):
+    counts = {}
+    for person in self._rows:
+      counts[person] = counts.get(person, 0) + 1
+    return counts
+
+  def _keep(self, keep):
+    dim = self._dim
+    matrix = array("f")
+    rows = []
+    for i in range(len(self._rows)):
+      if keep[i]:
+        matrix.extend(self._matrix[i * dim:(i + 1) * dim])
+        rows.append(self._rows[i])
+    self._matrix = matrix
+    self._rows = rows
+
+  def add(self, person, vector):
+    if not self._rows:
+      self._dim = len(vector)
+    elif len(vector) != self._dim:
+      return
+    self._rows.append(person)
+    self._matrix.extend(vector)
+    if self._rows.count(person) > config.GALLERY_MAX_TEMPLATES:
+      oldest = self._rows.index(person)
+      self._keep([i != oldest for i in range(len(self._rows))])
+
+  def remove(self, person):
+    removed = self._rows.count(person)
+    if removed:
+      self._keep([p != person for p in self._rows])
+    return removed
+
+  def clear(self):
+    self._rows = []
+    self._matrix = array("f")
+    self._dim = 0
+
+  def match(self, vector):
+    """(person, score) of the most similar row; (UNKNOWN, 255) when nothing is enrolled."""
+    best = [config.PERSON_UNKNOWN, 255, 255]
+    dim = self._dim
+    if len(vector) == dim:
+      matrix = self._matrix
+      for row in range(len(self._rows)):
+        base = row * dim
+        dot = 0.0
+        for i in range(dim):
+          dot += matrix[base + i] * vector[i]
+        score = int((1.0 - dot) * 100.0 + 0.5)
+        _track_best(best, self._rows[row], 0 if score < 0 else score)
+    self.last = {"score": best[1], "margin": best[2] - best[1]}
+    return best[0], best[1]
+
+
+def make_recognizer(name=None, kpu_mod=None, image_mod=None):
+  """Recognizer backend by name (config.FACE_RECOGNIZER by default)."""
+  if name is None:
+    name = config.FACE_RECOGNIZER
+  if name == EmbeddingRecognizer.name:
+    return EmbeddingRecognizer(kpu_mod, image_mod)
+  return DifferenceRecognizer()
+
+
 def _person_from_votes(votes, best_conf):
   if not votes:
     return config.PERSON_NONE, 0.0
@@ -99,14 +471,32 @@ def _person_from_votes(votes, best_conf):
   return tie_person, tie_conf
 
 
+def _iou_percent(a, b):
+  """Intersection over union of two (x, y, w, h) boxes, in percent."""
+  ix = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+  iy = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+  if ix <= 0 or iy <= 0:
+    return 0
+  inter = ix * iy
+  return inter * 100 // (a[2] * a[3] + b[2] * b[3] - inter)
+
+
 class FaceRuntime:
-  def __init__(self, image_mod=None, kpu_mod=None):
+  def __init__(self, image_mod=None, kpu_mod=None, recognizer=None):
     self._image = image_mod
     self._kpu = kpu_mod
     self._task_fd = None
-    self._known_templates = {}
+    self._recognizer = recognizer or make_recognizer(kpu_mod=kpu_mod, image_mod=image_mod)
+    # Gallery templates the recognizer could not describe on the last load.
+    self._template_failures = 0
+    self._template_error = None
     self._loaded = False
     self._last_error = None
+    # Reusable face crop; (size, gray) it was made for; False once blitting failed.
+    self._roi_buf = None
+    self._roi_key = None
+    self._roi_blit = True
+    self._roi_allocs = 0
 
   def _load_modules(self):
     if self._image is None:
@@ -136,30 +526,96 @@ class FaceRuntime:
         pass
     self._task_fd = None
     self._loaded = False
+    self._recognizer.deinit()
 
   def templates_loaded(self):
-    return len(self._known_templates)
+    return len(self._recognizer)
+
+  def recognizer_stats(self):
+    stats = {"name": self._recognizer.name}
+    if self._recognizer.last is not None:
+      stats.update(self._recognizer.last)
+    stats["roi"] = {"buffer": self._roi_buf is not None, "allocs": self._roi_allocs}
+    return stats
 
   def clear_templates(self):
-    self._known_templates = {}
+    self._recognizer.clear()
 
   def load_templates(self):
     self._load_modules()
-    loaded = {}
-    for person in config.KNOWN_PERSONS:
-      if storage.load_face_bytes(person) is None:
-        continue
-      path = storage.face_path(person)
-      if not path:
-        continue
-      try:
-        loaded[person] = self._image.Image(path)
-      except Exception:
-        continue
-    self._known_templates = loaded
-    return len(loaded)
+    recognizer = self._recognizer
+    recognizer.clear()
+    self._template_failures = 0
+    self._template_error = None
+    index = storage.gallery_index()
+    for person in index:
+      for name in index[person]:
+        vector = None
+        try:
+          vector = recognizer.describe(self._image.Image(storage.template_path(name)))
+        except VisionError as err:
+          self._template_error = err.message
+        except Exception:
+          self._template_error = "template_read"
+        if vector is None:
+          # Reported in STATS: a backend switch must not silently empty the gallery.
+          self._template_failures += 1
+          continue
+        recognizer.add(person, vector)
+    return len(recognizer)
+
+  def template_stats(self):
+    stats = {"loaded": len(self._recognizer), "failed": self._template_failures}
+    if self._template_error is not None:
+      stats["error"] = self._template_error
+    return stats
+
+  def _roi_buffer(self):
+    """The reusable roi_size x roi_size face buffer, or None if it cannot be made."""
+    key = (self._recognizer.roi_size, self._recognizer.roi_gray)
+    if self._roi_key == key:
+      return self._roi_buf
+    self._roi_key = key
+    self._roi_buf = None
+    self._load_modules()
+    size, gray = key
+    try:
+      if gray:
+        try:
+          self._roi_buf = self._image.Image(size=(size, size), format=self._image.GRAYSCALE)
+        except Exception:
+          self._roi_buf = self._image.Image(size=(size, size))
+      else:
+        self._roi_buf = self._image.Image(size=(size, size))
+      self._roi_allocs += 1
+    except Exception:
+      self._roi_buf = None
+    return self._roi_buf
+
+  def _blit_roi(self, frame, x, y, w, h):
+    """Scale the (x, y, w, h) face straight into the shared buffer; None if unsupported."""
+    if not self._roi_blit:
+      return None
+    buf = self._roi_buffer()
+    if buf is None:
+      return None
+    size = self._recognizer.roi_size
+    sx = float(size) / w
+    sy = float(size) / h
+    try:
+      # Drawing the whole frame shifted and scaled clips everything but the face.
+      buf.draw_image(frame, -int(x * sx), -int(y * sy), x_scale=sx, y_scale=sy)
+    except Exception:
+      self._roi_blit = False
+      return None
+    return buf
 
   def _extract_roi(self, frame, bbox):
+    """Face crop at roi_size, and the clamped bbox.
+
+    The crop is the runtime's shared buffer, overwritten by the next call;
+    keep it with copy(). Without draw_image() it falls back to copy + resize.
+    """
     x = int(getattr(bbox, "x", lambda: 0)())
     y = int(getattr(bbox, "y", lambda: 0)())
     w = int(getattr(bbox, "w", lambda: 0)())
@@ -173,7 +629,10 @@ class FaceRuntime:
     w = _clamp(w, 1, fw - x)
     h = _clamp(h, 1, fh - y)
 
-    roi = None
+    roi = self._blit_roi(frame, x, y, w, h)
+    if roi is not None:
+      return roi, (x, y, w, h)
+
     try:
       roi = frame.copy(roi=(x, y, w, h))
     except Exception:
@@ -181,21 +640,26 @@ class FaceRuntime:
         roi = frame.cut(x, y, w, h)
       except Exception:
         return None, (x, y, w, h)
+    self._roi_allocs += 1
 
     try:
-      roi = roi.resize(64, 64)
+      roi = roi.resize(self._recognizer.roi_size, self._recognizer.roi_size)
+      self._roi_allocs += 1
     except Exception:
       return None, (x, y, w, h)
 
     return roi, (x, y, w, h)
 
-  def _primary_face(self, frame):
+  def _detect(self, frame):
     self._ensure_detector()
     try:
-      detections = self._kpu.run_yolo2(self._task_fd, frame)
+      detections = self._kpu.run_yolo2(self._task_fd, frame.ai())
     except Exception:
       raise VisionError("VISION_FAILED", "face_detect")
+    return detections or []
 
+  def _primary_face(self, frame):
+    detections = self._detect(frame)
     if not detections:
       return None, 0
 
@@ -208,23 +672,13 @@ class FaceRuntime:
         best_area = area
     return best, len(detections)
 
-  def _score_match(self, candidate, template):
-    try:
-      diff = candidate.copy()
-      diff.difference(template)
-      stat = diff.get_statistics()
-      return _safe_stat_l_mean(stat)
-    except Exception:
-      return 255
-
   def _confidence(self, score, person):
     if person == config.PERSON_NONE:
       return 0.0
     if person == config.PERSON_UNKNOWN:
       return 0.40
 
-    strong = config.FACE_SCORE_THRESH_STRONG
-    weak = config.FACE_SCORE_THRESH
+    strong, weak = self._recognizer.thresholds()
     if score <= strong:
       return 0.95
     if score <= weak:
@@ -235,8 +689,15 @@ class FaceRuntime:
       return 0.95 - (0.25 * ratio)
     return 0.40
 
-  def recognize_frame(self, frame):
+  def recognize_frame(self, frame, costs=None):
+    """Recognize the largest face; `costs.add(stage, ms)` gets face_detect/face_match timings."""
+    frame = frame_context(frame)
+    started = _ticks_ms()
     bbox, face_count = self._primary_face(frame)
+    if costs is not None:
+      detected = _ticks_ms()
+      costs.add("face_detect", _ticks_diff(detected, started))
+      started = detected
     if bbox is None:
       return {
         "person": config.PERSON_NONE,
@@ -245,37 +706,62 @@ class FaceRuntime:
         "score": None,
       }
 
-    candidate, _ = self._extract_roi(frame, bbox)
+    out, _ = self._identify(frame, bbox)
+    out["faces_detected"] = face_count
+    if costs is not None:
+      costs.add("face_match", _ticks_diff(_ticks_ms(), started))
+    return out
+
+  def _identify(self, frame, bbox):
+    """({person, confidence, score}, clamped bbox) for one detection."""
+    candidate, xywh = self._extract_roi(frame.image, bbox)
     if candidate is None:
       raise VisionError("VISION_FAILED", "face_roi")
 
-    if not self._known_templates:
-      return {
-        "person": config.PERSON_UNKNOWN,
-        "confidence": 0.40,
-        "faces_detected": face_count,
-        "score": None,
-      }
+    if not len(self._recognizer):
+      return {"person": config.PERSON_UNKNOWN, "confidence": 0.40, "score": None}, xywh
 
-    best_person = config.PERSON_UNKNOWN
-    best_score = 255
-    for person in self._known_templates:
-      score = self._score_match(candidate, self._known_templates[person])
-      if score < best_score:
-        best_score = score
-        best_person = person
+    vector = self._recognizer.describe(candidate)
+    if vector is None:
+      raise VisionError("VISION_FAILED", "face_roi")
 
-    if best_score > config.FACE_SCORE_THRESH:
+    best_person, best_score = self._recognizer.match(vector)
+    if best_score > self._recognizer.thresholds()[1]:
       person = config.PERSON_UNKNOWN
     else:
       person = best_person
-
     return {
       "person": person,
       "confidence": self._confidence(best_score, person),
-      "faces_detected": face_count,
       "score": best_score,
-    }
+    }, xywh
+
+  def recognize_faces(self, frame, costs=None):
+    """Recognize up to MULTI_FACE_MAX faces, largest first.
+
+    Returns {"faces": [{person, confidence, score, bbox}], "faces_detected"};
+    `costs` gets face_detect/face_match like recognize_frame().
+    """
+    frame = frame_context(frame)
+    started = _ticks_ms()
+    detections = self._detect(frame)
+    if costs is not None:
+      detected = _ticks_ms()
+      costs.add("face_detect", _ticks_diff(detected, started))
+      started = detected
+    ranked = []
+    for i in range(len(detections)):
+      det = detections[i]
+      ranked.append((-int(det.w() * det.h()), i))
+    ranked.sort()
+    found = []
+    for _, i in ranked[:config.MULTI_FACE_MAX]:
+      face, xywh = self._identify(frame, detections[i])
+      face["bbox"] = xywh
+      found.append(face)
+    if costs is not None and found:
+      costs.add("face_match", _ticks_diff(_ticks_ms(), started))
+    return {"faces": found, "faces_detected": len(detections)}
 
   def vote_people(self, samples):
     votes = []
@@ -296,32 +782,95 @@ class FaceRuntime:
       "faces_detected": max_faces,
     }
 
+  def vote_faces(self, samples):
+    """Per-face vote over recognize_faces() samples.
+
+    Faces are tracked across frames by bbox overlap; a track seen in fewer
+    than half the frames is dropped as a false detection. Returns
+    [{person, conf, bbox}] for the largest MULTI_FACE_MAX tracks.
+    """
+    tracks = []
+    for sample in samples:
+      claimed = []
+      for face in sample.get("faces", ()):
+        bbox = face["bbox"]
+        best = -1
+        best_iou = config.MULTI_FACE_TRACK_IOU
+        for i in range(len(tracks)):
+          if i in claimed:
+            continue
+          overlap = _iou_percent(tracks[i]["bbox"], bbox)
+          if overlap >= best_iou:
+            best = i
+            best_iou = overlap
+        if best < 0:
+          best = len(tracks)
+          tracks.append({"votes": [], "best_conf": {}})
+        claimed.append(best)
+        track = tracks[best]
+        track["bbox"] = bbox
+        person = face["person"]
+        conf = float(face["confidence"])
+        track["votes"].append(person)
+        if conf > track["best_conf"].get(person, 0.0):
+          track["best_conf"][person] = conf
+
+    ranked = []
+    for track in tracks:
+      if len(track["votes"]) * 2 < len(samples):
+        continue
+      person, conf = _person_from_votes(track["votes"], track["best_conf"])
+      x, y, w, h = track["bbox"]
+      ranked.append((-w * h, len(ranked), {"person": person, "conf": round(conf, 2), "bbox": [x, y, w, h]}))
+    ranked.sort()
+    return [entry for _, _, entry in ranked[:config.MULTI_FACE_MAX]]
+
+  def _keep_roi(self, roi):
+    if roi is not self._roi_buf:
+      return roi
+    try:
+      kept = roi.copy()
+    except Exception:
+      return None
+    self._roi_allocs += 1
+    return kept
+
   def _encode_jpeg(self, img):
     try:
       return img.compress(quality=90)
     except Exception:
       return None
 
-  def learn(self, capture_cb, person, frames, deadline_ms):
-    if person not in config.KNOWN_PERSONS:
+  def learn(self, capture_cb, person, frames, deadline_ms, between_frames=None):
+    """Enroll one more template for `person` (a new ID or an existing one).
+
+    `between_frames()` runs at each frame boundary, as in run_steps().
+    """
+    person = person_id(person)
+    if person is None:
       raise VisionError("BAD_REQUEST", "bad_person")
     if not storage.sd_available() or not storage.ensure_sd_layout():
       raise VisionError("STORAGE_UNAVAILABLE", "sd_missing")
+    index = storage.gallery_index()
+    if person not in index and len(index) >= config.GALLERY_MAX_PERSONS:
+      raise VisionError("BAD_REQUEST", "gallery_full")
 
     best_img = None
     best_area = -1
     best_sharp = -1
 
-    for _ in range(frames):
+    for done in range(frames):
+      if done and between_frames is not None:
+        between_frames()
       if _ticks_diff(_ticks_ms(), deadline_ms) > 0:
         raise VisionError("TIMEOUT", "timeout")
 
-      frame = capture_cb()
+      frame = frame_context(capture_cb())
       bbox, _ = self._primary_face(frame)
       if bbox is None:
         continue
 
-      roi, xywh = self._extract_roi(frame, bbox)
+      roi, xywh = self._extract_roi(frame.image, bbox)
       if roi is None:
         continue
 
@@ -334,26 +883,52 @@ class FaceRuntime:
         sharp = 0
 
       if area > best_area or (area == best_area and sharp > best_sharp):
-        best_img = roi
+        # The next frame overwrites the shared ROI buffer; only the best is kept.
+        kept = self._keep_roi(roi)
+        if kept is None:
+          continue
+        best_img = kept
         best_area = area
         best_sharp = sharp
 
     if best_img is None:
       raise VisionError("VISION_FAILED", "no_face")
+    # Before saving: a recognizer that cannot describe the face must not leave a stray file.
+    vector = self._recognizer.describe(best_img)
+    if vector is None:
+      raise VisionError("VISION_FAILED", "face_roi")
 
     encoded = self._encode_jpeg(best_img)
     if encoded is not None:
       if not storage.save_face_jpeg(person, encoded):
         raise VisionError("STORAGE_UNAVAILABLE", "sd_write")
     else:
-      path = storage.face_path(person)
+      path = storage.new_template_path(person)
       try:
         best_img.save(path)
       except Exception:
         raise VisionError("STORAGE_UNAVAILABLE", "sd_write")
+      if not storage.commit_template(person, path):
+        raise VisionError("STORAGE_UNAVAILABLE", "sd_write")
+
+    self._recognizer.add(person, vector)
+    return {"status": "learned", "person": person, "templates": self._recognizer.persons().get(person, 0)}
 
-    self._known_templates[person] = best_img
-    return {"status": "learned", "person": person}
+  def list_faces(self):
+    """Enrolled (loaded) templates per person."""
+    return {"persons": self._recognizer.persons(), "templates": len(self._recognizer)}
+
+  def delete_face(self, person):
+    pid = person_id(person)
+    if pid is None:
+      raise VisionError("BAD_REQUEST", "bad_person")
+    if not storage.sd_available() or not storage.ensure_sd_layout():
+      raise VisionError("STORAGE_UNAVAILABLE", "sd_missing")
+    removed = storage.delete_face(pid)
+    loaded = self._recognizer.remove(pid)
+    if not removed and not loaded:
+      raise VisionError("BAD_REQUEST", "unknown_person")
+    return {"status": "deleted", "person": pid, "templates": max(removed, loaded)}
 
   def reset_faces(self):
     if not storage.sd_available() or not storage.ensure_sd_layout():
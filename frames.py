@@ -0,0 +1,83 @@
+"""Per-capture frame context shared by the face and object detectors."""
+
+
+class FrameContext:
+  """One captured image plus derived buffers, computed on first use and memoized.
+
+  `counters` (a dict with "done" and "saved") is shared across frames so the
+  runtime can report how many conversions the memoization avoided.
+  """
+
+  def __init__(self, image, counters=None):
+    self.image = image
+    self._counters = counters if counters is not None else {"done": 0, "saved": 0}
+    self._ai_ready = False
+    self._resized = {}
+    self._stats = {}
+
+  def width(self):
+    return int(self.image.width())
+
+  def height(self):
+    return int(self.image.height())
+
+  def _hit(self):
+    self._counters["saved"] += 1
+
+  def _miss(self):
+    self._counters["done"] += 1
+
+  def ai(self):
+    """The image with its KPU (AI layout) buffer filled."""
+    if self._ai_ready:
+      self._hit()
+      return self.image
+    self._miss()
+    try:
+      self.image.pix_to_ai()
+    except Exception:
+      pass
+    self._ai_ready = True
+    return self.image
+
+  def resized(self, w, h):
+    """KPU-ready copy at w x h; the frame itself when it already has that size."""
+    try:
+      if self.width() == w and self.height() == h:
+        return self.ai()
+    except Exception:
+      pass
+    key = (w, h)
+    img = self._resized.get(key)
+    if img is not None:
+      self._hit()
+      return img
+    self._miss()
+    img = self.image.resize(w, h)
+    try:
+      img.pix_to_ai()
+    except Exception:
+      pass
+    self._resized[key] = img
+    return img
+
+  def statistics(self, roi=None):
+    """Grayscale statistics of the frame or an (x, y, w, h) region."""
+    key = roi
+    if key in self._stats:
+      self._hit()
+      return self._stats[key]
+    self._miss()
+    if roi is None:
+      stat = self.image.get_statistics()
+    else:
+      stat = self.image.get_statistics(roi=roi)
+    self._stats[key] = stat
+    return stat
+
+
+def frame_context(frame, counters=None):
+  """Wrap a raw image; an existing FrameContext is passed through."""
+  if isinstance(frame, FrameContext):
+    return frame
+  return FrameContext(frame, counters)
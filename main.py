@@ -1,9 +1,11 @@
 """UnitV vision tool runtime entrypoint (UART JSONL, one request-one response)."""
 
+import codec
 import config
 import led
 import protocol
-from vision import VisionRuntime, VisionError
+import storage
+from vision import VisionRuntime, VisionError, _bool_arg, all_faces_requested, merge_scan_args, objects_from_scan, run_steps, who_from_scan
 
 try:
   import machine
@@ -31,6 +33,12 @@ def _ticks_ms():
   return int(_time.time() * 1000)
 
 
+def _ticks_us():
+  if hasattr(_time, "ticks_us"):
+    return _time.ticks_us()
+  return int(_time.time() * 1000000)
+
+
 def _ticks_diff(now, old):
   if hasattr(_time, "ticks_diff"):
     return _time.ticks_diff(now, old)
@@ -43,58 +51,289 @@ def _ticks_add(base, delta):
   return base + delta
 
 
+_PING_RESULT = {
+  "status": "ok",
+  "tool": config.TOOL_NAME,
+}
+
+
+# Commands allowed inside BATCH (no state switches, no nested batches).
+_BATCH_CMDS = ("PING", "INFO", "STATS", "SCAN", "WHO", "OBJECTS")
+# Vision commands that can share one set of captured frames.
+_SHARED_FRAME_CMDS = ("SCAN", "WHO", "OBJECTS")
+# Shared-SCAN failures of the objects side; WHO does not need that model.
+_OBJECTS_FAILURES = ("objects_model", "objects_detect")
+# Commands that handle COMMAND_TIMEOUT_MS themselves.
+_SELF_TIMED_CMDS = ("SCAN", "WHO", "OBJECTS", "BATCH")
+# Cheap commands answered between frames of a running vision command.
+_CONTROL_CMDS = ("PING", "INFO", "STATS", "CANCEL")
+# Commands that may preempt the running one with args.preempt=true.
+_PREEMPT_CMDS = ("SCAN", "WHO", "OBJECTS")
+
+
+class LatencyStats:
+  def __init__(self):
+    self.count = 0
+    self.last = 0
+    self.max = 0
+    self._total = 0
+
+  def add(self, value):
+    if value < 0:
+      value = 0
+    self.count += 1
+    self.last = value
+    self._total += value
+    if value > self.max:
+      self.max = value
+
+  def as_dict(self):
+    avg = 0
+    if self.count:
+      avg = self._total // self.count
+    return {"n": self.count, "last": self.last, "max": self.max, "avg": avg}
+
+
+# DedupCache node fields. Each node sits on two circular lists that share one
+# sentinel: recency (LRU eviction) and insertion age (TTL expiry from the head).
+_LRU_PREV = 0
+_LRU_NEXT = 1
+_AGE_PREV = 2
+_AGE_NEXT = 3
+_KEY = 4
+_CREATED = 5
+_RAW = 6
+
+
 class DedupCache:
-  def __init__(self, ttl_ms):
+  def __init__(self, ttl_ms, max_entries=config.DEDUP_MAX_ENTRIES, max_bytes=config.DEDUP_MAX_BYTES):
     self._ttl_ms = ttl_ms
+    self._max_entries = max_entries
+    self._max_bytes = max_bytes
     self._items = {}
+    self._bytes = 0
+    root = [None] * 7
+    root[_LRU_PREV] = root[_LRU_NEXT] = root
+    root[_AGE_PREV] = root[_AGE_NEXT] = root
+    self._root = root
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.expired = 0
+    self.attached = 0
+    self._inflight = None
+    # Preempting request accepted to run right after the current one.
+    self._queued = None
+
+  def __len__(self):
+    return len(self._items)
+
+  def _remove(self, node):
+    node[_LRU_PREV][_LRU_NEXT] = node[_LRU_NEXT]
+    node[_LRU_NEXT][_LRU_PREV] = node[_LRU_PREV]
+    node[_AGE_PREV][_AGE_NEXT] = node[_AGE_NEXT]
+    node[_AGE_NEXT][_AGE_PREV] = node[_AGE_PREV]
+    del self._items[node[_KEY]]
+    self._bytes -= len(node[_RAW])
 
   def _gc(self, now):
-    to_delete = []
-    for req_id in self._items:
-      created_ms, _ = self._items[req_id]
-      if _ticks_diff(now, created_ms) > self._ttl_ms:
-        to_delete.append(req_id)
-    for req_id in to_delete:
-      try:
-        del self._items[req_id]
-      except Exception:
-        pass
+    # Oldest entries sit at the head of the age list, so stop at the first live one.
+    root = self._root
+    node = root[_AGE_NEXT]
+    while node is not root and _ticks_diff(now, node[_CREATED]) > self._ttl_ms:
+      self._remove(node)
+      self.expired += 1
+      node = root[_AGE_NEXT]
 
   def get(self, req_id, now):
     self._gc(now)
-    item = self._items.get(req_id)
-    if not item:
-      return None
-    created_ms, raw = item
-    if _ticks_diff(now, created_ms) > self._ttl_ms:
-      try:
-        del self._items[req_id]
-      except Exception:
-        pass
+    node = self._items.get(req_id)
+    if node is None:
+      self.misses += 1
       return None
-    return raw
+    self.hits += 1
+    # Move to the most-recently-used end.
+    root = self._root
+    node[_LRU_PREV][_LRU_NEXT] = node[_LRU_NEXT]
+    node[_LRU_NEXT][_LRU_PREV] = node[_LRU_PREV]
+    last = root[_LRU_PREV]
+    node[_LRU_PREV] = last
+    node[_LRU_NEXT] = root
+    last[_LRU_NEXT] = node
+    root[_LRU_PREV] = node
+    return node[_RAW]
 
   def set(self, req_id, raw_bytes, now):
     self._gc(now)
-    self._items[req_id] = (now, raw_bytes)
+    old = self._items.get(req_id)
+    if old is not None:
+      self._remove(old)
+    size = len(raw_bytes)
+    if size > self._max_bytes:
+      return
+
+    root = self._root
+    while self._items and (len(self._items) >= self._max_entries or self._bytes + size > self._max_bytes):
+      self._remove(root[_LRU_NEXT])
+      self.evictions += 1
+
+    lru_last = root[_LRU_PREV]
+    age_last = root[_AGE_PREV]
+    node = [lru_last, root, age_last, root, req_id, now, raw_bytes]
+    lru_last[_LRU_NEXT] = node
+    root[_LRU_PREV] = node
+    age_last[_AGE_NEXT] = node
+    root[_AGE_PREV] = node
+    self._items[req_id] = node
+    self._bytes += size
+
+  def begin(self, req_id):
+    """Mark `req_id` as the request currently being executed."""
+    self._inflight = req_id
+    if self._queued == req_id:
+      self._queued = None
+
+  def queue(self, req_id):
+    """Mark `req_id` as queued to run next (None: nothing queued)."""
+    self._queued = req_id
+
+  def queued(self):
+    return self._queued
+
+  def attach(self, req_id):
+    """True if `req_id` duplicates the running or queued request; it shares that reply."""
+    if req_id is None or (req_id != self._inflight and req_id != self._queued):
+      return False
+    self.attached += 1
+    return True
+
+  def inflight(self):
+    return self._inflight
+
+  def finish(self, req_id, raw_bytes, now):
+    if self._inflight == req_id:
+      self._inflight = None
+    if raw_bytes is not None:
+      self.set(req_id, raw_bytes, now)
+
+  def stats(self):
+    return {
+      "entries": len(self._items),
+      "bytes": self._bytes,
+      "hits": self.hits,
+      "misses": self.misses,
+      "evictions": self.evictions,
+      "expired": self.expired,
+      "attached": self.attached,
+    }
 
 
 class Runtime:
-  def __init__(self, uart):
+  def __init__(self, uart, baud=config.UART_BAUD):
     self._uart = uart
+    self._baud = baud
+    # (revert_baud, new_baud, confirm_deadline_ms) while SET_BAUD awaits its PING.
+    self._baud_pending = None
+    self._reader = protocol.LineReader(uart)
     self._vision = VisionRuntime()
     self._dedup = DedupCache(config.DEDUP_TTL_MS)
     self._processing = False
+    self._templates = None
+    self._framing = codec.FRAMING_JSONL
+    # PROTO/SET_BAUD switch only after their own response went out the old way.
+    self._after_reply = None
+    # First request byte seen by the reader -> dispatch, in microseconds.
+    self._rx_latency = LatencyStats()
+    # Control commands answered while a vision command was running.
+    self._interleaved = 0
+    # "cancelled"/"preempted" for the running request, honoured at its next frame boundary.
+    self._cancel_pending = None
+    # (req, rx_us) of a preempting request, run once the cancelled one has replied.
+    self._preempted_by = None
     _usb_debug("runtime_init")
 
   def _write_raw(self, raw_bytes):
+    if codec.is_frame(raw_bytes):
+      try:
+        self._uart.write(raw_bytes)
+      except Exception:
+        pass
+      return
     protocol.uart_writeline(self._uart, raw_bytes)
 
+  def _encode_payload(self, payload, req_id=None):
+    if self._framing == codec.FRAMING_MSGPACK:
+      return codec.encode_frame(payload, req_id=req_id)
+    return protocol.safe_json_encode(payload, req_id=req_id)
+
   def _write_payload(self, payload, req_id=None):
-    raw = protocol.safe_json_encode(payload, req_id=req_id)
-    protocol.uart_writeline(self._uart, raw)
+    raw = self._encode_payload(payload, req_id=req_id)
+    self._write_raw(raw)
     return raw
 
+  def _build_templates(self):
+    slot = protocol.Slot
+    optional = protocol.Slot(optional=True)
+    templates = {
+      "PING": protocol.ResponseTemplate(_PING_RESULT),
+      "SCAN": protocol.ResponseTemplate({
+        "person": slot(),
+        "faces_detected": slot(),
+        "objects": slot(),
+        "frames": slot(),
+        "frames_used": optional,
+        "truncated": slot(),
+        "partial": optional,
+        "confidence": optional,
+        "faces": optional,
+        "age_ms": optional,
+        "debug": optional,
+      }),
+      "WHO": protocol.ResponseTemplate({
+        "person": slot(),
+        "frames": slot(),
+        "frames_used": optional,
+        "partial": optional,
+        "confidence": optional,
+        "faces": optional,
+        "age_ms": optional,
+        "debug": optional,
+      }),
+      "OBJECTS": protocol.ResponseTemplate({
+        "objects": slot(),
+        "frames": slot(),
+        "frames_used": optional,
+        "truncated": slot(),
+        "partial": optional,
+        "age_ms": optional,
+        "debug": optional,
+      }),
+    }
+    try:
+      info = self._info_result()
+      caps = info.get("capabilities")
+      if isinstance(caps, dict) and "sd" in caps:
+        caps = dict(caps)
+        caps["sd"] = slot()
+        info["capabilities"] = caps
+      templates["INFO"] = protocol.ResponseTemplate(info)
+    except Exception:
+      _usb_debug("templates", "info_failed")
+    return templates
+
+  def _encode_result(self, cmd, req_id, result):
+    if self._framing != codec.FRAMING_JSONL:
+      return self._encode_payload({"req_id": req_id, "ok": True, "result": result}, req_id=req_id)
+    if self._templates is None:
+      self._templates = self._build_templates()
+    template = self._templates.get(cmd)
+    if template is not None:
+      raw = template.render(req_id, result)
+      if raw is not None:
+        return raw
+    payload = {"req_id": req_id, "ok": True, "result": result}
+    return protocol.safe_json_encode(payload, req_id=req_id)
+
   def _bad_request(self, req_id, message):
     return protocol.short_error(req_id, "BAD_REQUEST", message)
 
@@ -125,26 +364,29 @@ class Runtime:
     args = req["args"]
 
     if cmd == "PING":
-      return {
-        "status": "ok",
-        "tool": config.TOOL_NAME,
-      }
+      return _PING_RESULT
 
     if cmd == "INFO":
-      return self._vision.info()
+      return self._info_result()
 
     if cmd == "SCAN":
-      return self._vision.scan(args, deadline_ms)
+      return self._run_vision(self._vision.scan_steps(args, deadline_ms))
 
     if cmd == "WHO":
-      return self._vision.who(args, deadline_ms)
+      return self._run_vision(self._vision.who_steps(args, deadline_ms))
 
     if cmd == "OBJECTS":
-      return self._vision.objects(args, deadline_ms)
+      return self._run_vision(self._vision.objects_steps(args, deadline_ms))
 
-    if cmd == "LEARN":
+    if cmd in ("LEARN", "ENROLL"):
       led.learning()
-      return self._vision.learn(args, deadline_ms)
+      return self._vision.learn(args, deadline_ms, self._frame_boundary)
+
+    if cmd == "LIST_FACES":
+      return self._vision.list_faces()
+
+    if cmd == "DELETE_FACE":
+      return self._vision.delete_face(args)
 
     if cmd == "RESET_FACES":
       return self._vision.reset_faces()
@@ -153,14 +395,302 @@ class Runtime:
       enabled = args.get("enabled", False)
       return self._vision.set_debug(enabled)
 
+    if cmd == "STATS":
+      return self.stats()
+
+    if cmd == "PROTO":
+      return self._proto(args)
+
+    if cmd == "SET_BAUD":
+      return self._set_baud(args)
+
+    if cmd == "BATCH":
+      return self._batch(args, deadline_ms)
+
+    if cmd == "CANCEL":
+      return self._cancel(args)
+
     raise VisionError("BAD_REQUEST", "unknown_cmd")
 
+  def _run_vision(self, steps):
+    return run_steps(steps, self._frame_boundary)
+
+  def _frame_boundary(self):
+    self._service_control()
+    if self._cancel_pending is not None:
+      # Models and camera stay loaded: this is not a failure, so no recover().
+      raise VisionError("CANCELLED", self._cancel_pending)
+
+  def _cancel(self, args):
+    target = args.get("target_req_id")
+    if target is None:
+      raise VisionError("BAD_REQUEST", "missing_target")
+    if self._preempted_by is not None and self._dedup.queued() == target:
+      # Queued preempting request: drop it before it starts; it still gets its one reply.
+      self._preempted_by = None
+      self._dedup.queue(None)
+      self._reply_cancelled(target, "cancelled")
+      if self._cancel_pending == "preempted":
+        # Nothing to make room for any more; let the running request go on.
+        self._cancel_pending = None
+      return {"target_req_id": target, "cancelled": True}
+    cancelled = self._processing and self._dedup.inflight() == target
+    if cancelled:
+      self._cancel_pending = "cancelled"
+    return {"target_req_id": target, "cancelled": cancelled}
+
+  def _reply_cancelled(self, req_id, message):
+    raw = self._write_payload(protocol.short_error(req_id, "CANCELLED", message), req_id=req_id)
+    # Cached, so a retry gets the same single reply instead of running.
+    self._dedup.set(req_id, raw, _ticks_ms())
+
+  def _preempt(self, req, rx_us):
+    if self._preempted_by is not None:
+      # Superseded before it started; it still gets its one reply.
+      self._reply_cancelled(self._preempted_by[0]["req_id"], "preempted")
+    self._preempted_by = (req, rx_us)
+    self._dedup.queue(req["req_id"])
+    self._cancel_pending = "preempted"
+    _usb_debug("preempt", req["cmd"], "req_id=%s" % req["req_id"])
+
+  def _service_control(self):
+    """Frame boundary of a running vision command: handle every complete line already received."""
+    while True:
+      line = self._reader.poll_line()
+      if line is None:
+        return
+      self._handle_line(line, self._reader.line_rx_us)
+
+  def _answer_control(self, req, now, rx_us=None):
+    req_id = req["req_id"]
+    if rx_us is not None:
+      self._rx_latency.add(_ticks_diff(_ticks_us(), rx_us))
+    try:
+      result = self._dispatch(req, None)
+      raw = self._encode_result(req["cmd"], req_id, result)
+    except VisionError as err:
+      raw = self._encode_payload(protocol.short_error(req_id, err.code, err.message), req_id=req_id)
+    except Exception:
+      raw = self._encode_payload(protocol.short_error(req_id, "VISION_FAILED", "internal"), req_id=req_id)
+    self._write_raw(raw)
+    self._dedup.set(req_id, raw, now)
+    self._interleaved += 1
+    _usb_debug("interleaved", req["cmd"], "req_id=%s" % req_id)
+
+  def _batch_subcommands(self, args):
+    items = args.get("cmds")
+    if not isinstance(items, list) or not items:
+      raise VisionError("BAD_REQUEST", "bad_batch")
+    if len(items) > config.MAX_BATCH_CMDS:
+      raise VisionError("BAD_REQUEST", "batch_too_long")
+
+    subs = []
+    for item in items:
+      if isinstance(item, str):
+        item = {"cmd": item}
+      if not isinstance(item, dict) or item.get("cmd") is None:
+        subs.append(("?", {}))
+        continue
+      sub_args = item.get("args", {})
+      if not isinstance(sub_args, dict):
+        sub_args = {}
+      subs.append((str(item["cmd"]).upper(), sub_args))
+    return subs
+
+  def _batch(self, args, deadline_ms):
+    subs = self._batch_subcommands(args)
+
+    # WHO/OBJECTS/SCAN together run as one SCAN over the same frames.
+    face_args = []
+    object_args = []
+    vision_subs = 0
+    for cmd, sub_args in subs:
+      if cmd in _SHARED_FRAME_CMDS:
+        vision_subs += 1
+      if cmd in ("WHO", "SCAN"):
+        face_args.append(sub_args)
+      if cmd in ("OBJECTS", "SCAN"):
+        object_args.append(sub_args)
+    shared = vision_subs > 1
+    scan_result = None
+    scan_error = None
+    # VisionError message of the failure to recover from, if any.
+    recover = None
+
+    results = []
+    for cmd, sub_args in subs:
+      try:
+        if cmd not in _BATCH_CMDS:
+          raise VisionError("BAD_REQUEST", "unknown_cmd")
+        if _ticks_diff(_ticks_ms(), deadline_ms) > 0:
+          # Skipped, not failed: nothing to recover from.
+          entry = protocol.short_error(None, "TIMEOUT", "timeout")
+          results.append({"cmd": cmd, "ok": False, "error": entry["error"]})
+          continue
+
+        if shared and cmd in _SHARED_FRAME_CMDS:
+          if scan_result is None and scan_error is None:
+            try:
+              scan_result = self._run_vision(
+                self._vision.scan_steps(merge_scan_args(face_args, object_args), deadline_ms)
+              )
+            except VisionError as err:
+              scan_error = err
+          if scan_error is not None:
+            if cmd == "WHO" and scan_error.message in _OBJECTS_FAILURES:
+              # Faces do not need the objects model; retry WHO on its own.
+              result = self._run_vision(self._vision.who_steps(sub_args, deadline_ms))
+            else:
+              raise scan_error
+          elif cmd == "WHO":
+            result = who_from_scan(scan_result)
+          elif cmd == "OBJECTS":
+            result = objects_from_scan(scan_result)
+          else:
+            result = scan_result
+          if "faces" in result and not all_faces_requested(sub_args):
+            # Another sub-command asked for all_faces; this one did not.
+            result = dict(result)
+            del result["faces"]
+        else:
+          result = self._dispatch({"cmd": cmd, "args": sub_args}, deadline_ms)
+
+        if isinstance(result, dict) and "debug" in result:
+          # Keep the combined response compact.
+          result = dict(result)
+          del result["debug"]
+        results.append({"cmd": cmd, "ok": True, "result": result})
+      except VisionError as err:
+        if err.code == "CANCELLED":
+          # Abort the whole batch, not just this subcommand.
+          raise
+        if err.code in ("VISION_FAILED", "TIMEOUT"):
+          recover = err.message
+        entry = protocol.short_error(None, err.code, err.message)
+        results.append({"cmd": cmd, "ok": False, "error": entry["error"]})
+      except Exception:
+        recover = "internal"
+        entry = protocol.short_error(None, "VISION_FAILED", "internal")
+        results.append({"cmd": cmd, "ok": False, "error": entry["error"]})
+
+    if recover:
+      # One recovery for the batch, scoped to the last failure.
+      self._vision.recover(recover)
+    return {"results": results}
+
+  def _info_result(self):
+    info = self._vision.info()
+    info["framings"] = list(codec.FRAMINGS)
+    return info
+
+  def _proto(self, args):
+    framing = args.get("framing")
+    if framing is None:
+      return {"framing": self._framing, "framings": list(codec.FRAMINGS)}
+    framing = str(framing).lower()
+    if framing not in codec.FRAMINGS:
+      raise VisionError("BAD_REQUEST", "bad_framing")
+    self._after_reply = lambda _raw: self._set_framing(framing)
+    return {"framing": framing}
+
+  def _set_framing(self, framing):
+    _usb_debug("framing", framing)
+    self._framing = framing
+
+  def _set_baud(self, args):
+    try:
+      baud = int(args.get("baud"))
+    except Exception:
+      raise VisionError("BAD_REQUEST", "bad_baud")
+    if baud not in config.UART_BAUD_RATES:
+      raise VisionError("BAD_REQUEST", "bad_baud")
+    if baud == self._baud and self._baud_pending is None:
+      return {"baud": baud, "confirm_ms": 0}
+    self._after_reply = lambda raw: self._begin_baud_switch(baud, len(raw) + 1)
+    return {"baud": baud, "confirm_ms": config.UART_BAUD_CONFIRM_MS}
+
+  def _wait_tx_drain(self, nbytes):
+    # 8N1: 10 bits per byte, plus margin for the driver FIFO.
+    ms = (nbytes * 10000) // self._baud + 5
+    if hasattr(_time, "sleep_ms"):
+      _time.sleep_ms(ms)
+    else:
+      _time.sleep(ms / 1000.0)
+
+  def _apply_uart_baud(self, baud):
+    uart = self._uart
+    switched = False
+    if hasattr(uart, "init"):
+      try:
+        uart.init(baud, bits=8, parity=None, stop=1, timeout=config.UART_READ_TIMEOUT_MS)
+        switched = True
+      except Exception:
+        try:
+          uart.init(baud)
+          switched = True
+        except Exception:
+          switched = False
+    if not switched:
+      try:
+        uart.deinit()
+      except Exception:
+        pass
+      uart = _build_uart(baud)
+    self._uart = uart
+    self._baud = baud
+    self._reader.reset(uart)
+    _usb_debug("uart", "baud=%d" % baud)
+
+  def _begin_baud_switch(self, baud, reply_len=config.MAX_JSON_BYTES):
+    revert = self._baud
+    if self._baud_pending is not None:
+      revert = self._baud_pending[0]
+    self._wait_tx_drain(reply_len)
+    self._apply_uart_baud(baud)
+    self._baud_pending = (revert, baud, _ticks_add(_ticks_ms(), config.UART_BAUD_CONFIRM_MS))
+
+  def _confirm_baud(self):
+    _, baud, _ = self._baud_pending
+    self._baud_pending = None
+    data = storage.read_config({})
+    data[config.UART_BAUD_CONFIG_KEY] = baud
+    saved = storage.write_config(data)
+    _usb_debug("uart", "baud_confirmed=%d" % baud, "saved=%s" % saved)
+
+  def poll_baud_confirm(self, now=None):
+    if self._baud_pending is None:
+      return
+    if now is None:
+      now = _ticks_ms()
+    revert, baud, deadline = self._baud_pending
+    if _ticks_diff(now, deadline) <= 0:
+      return
+    _usb_debug("uart", "baud_unconfirmed=%d" % baud, "revert=%d" % revert)
+    self._baud_pending = None
+    self._apply_uart_baud(revert)
+
+  def stats(self):
+    out = {
+      "reader": self._reader.wait_mode(),
+      "reader_downgrades": self._reader.downgrades,
+      "baud": self._baud,
+      "rx_dispatch_us": self._rx_latency.as_dict(),
+      "dedup": self._dedup.stats(),
+      "interleaved": self._interleaved,
+      "recover": self._vision.recovery_stats(),
+    }
+    # Only when something is wrong: STATS has to fit next to vision results in a BATCH.
+    templates = self._vision.template_stats()
+    if templates.get("failed"):
+      out["templates"] = templates
+    return out
+
   def _led_for_result(self, result):
     if not isinstance(result, dict):
       led.idle()
       return
     person = result.get("person")
-    if person in config.KNOWN_PERSONS:
+    if person is not None and person not in (config.PERSON_UNKNOWN, config.PERSON_NONE):
       led.owner()
     elif person == config.PERSON_UNKNOWN:
       led.unknown()
@@ -169,7 +699,7 @@ class Runtime:
     else:
       led.idle()
 
-  def _handle_line(self, line_bytes):
+  def _handle_line(self, line_bytes, rx_us=None):
     led.busy()
 
     payload, err = protocol.parse_json_line(line_bytes)
@@ -188,6 +718,9 @@ class Runtime:
 
     _usb_debug("req", req["cmd"], "req_id=%s" % req["req_id"])
 
+    if self._baud_pending is not None and req["cmd"] == "PING":
+      self._confirm_baud()
+
     req_id = req["req_id"]
     now = _ticks_ms()
     cached = self._dedup.get(req_id, now)
@@ -197,43 +730,70 @@ class Runtime:
       return
 
     if self._processing:
+      if self._dedup.attach(req_id):
+        # Retry of the running request: its final reply answers both.
+        _usb_debug("dedup_attach", "req_id=%s" % req_id)
+        return
+      if req["cmd"] in _CONTROL_CMDS:
+        self._answer_control(req, now, rx_us)
+        return
+      if req["cmd"] in _PREEMPT_CMDS and _bool_arg(req["args"].get("preempt"), False):
+        self._preempt(req, rx_us)
+        return
       _usb_debug("busy", "req_id=%s" % req_id)
+      # Not cached: a retry after the current job finishes must really run.
       err_payload = protocol.short_error(req_id, "BUSY", "busy")
-      raw = self._write_payload(err_payload, req_id=req_id)
-      self._dedup.set(req_id, raw, now)
+      self._write_payload(err_payload, req_id=req_id)
       return
 
+    self._execute(req, now, rx_us)
+    while self._preempted_by is not None:
+      req, rx_us = self._preempted_by
+      self._preempted_by = None
+      self._execute(req, _ticks_ms(), rx_us)
+
+  def _execute(self, req, now, rx_us=None):
+    req_id = req["req_id"]
     self._processing = True
+    self._cancel_pending = None
+    self._dedup.begin(req_id)
     raw = None
     started = now
     deadline_ms = _ticks_add(started, config.COMMAND_TIMEOUT_MS)
 
+    if rx_us is not None:
+      self._rx_latency.add(_ticks_diff(_ticks_us(), rx_us))
+
     try:
       result = self._dispatch(req, deadline_ms)
-      if _ticks_diff(_ticks_ms(), deadline_ms) > 0:
+      # Vision commands stop early with partial results; BATCH reports per-subcommand timeouts.
+      if req["cmd"] not in _SELF_TIMED_CMDS and _ticks_diff(_ticks_ms(), deadline_ms) > 0:
         raise VisionError("TIMEOUT", "timeout")
-      payload = {"req_id": req_id, "ok": True, "result": result}
-      raw = self._write_payload(payload, req_id=req_id)
+      raw = self._encode_result(req["cmd"], req_id, result)
+      self._write_raw(raw)
+      if self._after_reply is not None:
+        self._after_reply(raw)
       _usb_debug("ok", req["cmd"], "req_id=%s" % req_id)
       self._led_for_result(result)
     except VisionError as err_ex:
       if err_ex.code in ("VISION_FAILED", "TIMEOUT"):
-        self._vision.recover()
+        self._vision.recover(err_ex.message)
       payload = protocol.short_error(req_id, err_ex.code, err_ex.message)
       raw = self._write_payload(payload, req_id=req_id)
       _usb_debug("err", req["cmd"], "req_id=%s" % req_id, err_ex.code, err_ex.message)
       led.error()
     except Exception:
-      self._vision.recover()
+      self._vision.recover("internal")
       payload = protocol.short_error(req_id, "VISION_FAILED", "internal")
       raw = self._write_payload(payload, req_id=req_id)
       _usb_debug("err", req["cmd"], "req_id=%s" % req_id, "VISION_FAILED", "internal")
       led.error()
     finally:
       self._processing = False
+      self._cancel_pending = None
+      self._after_reply = None
 
-    if raw is not None:
-      self._dedup.set(req_id, raw, _ticks_ms())
+    self._dedup.finish(req_id, raw, _ticks_ms())
 
   def run_forever(self):
     _usb_debug("boot", "runtime_loop_start")
@@ -242,6 +802,7 @@ class Runtime:
     try:
       self._vision.boot()
       _usb_debug("boot", "vision_ready")
+      self._templates = self._build_templates()
     except Exception:
       _usb_debug("boot", "vision_boot_failed")
       # Keep serving requests even if boot preloading failed.
@@ -250,14 +811,15 @@ class Runtime:
 
     while True:
       try:
-        line = protocol.uart_readline(self._uart)
+        line = self._reader.readline()
+        self.poll_baud_confirm()
         if line is None:
           continue
-        self._handle_line(line)
+        self._handle_line(line, self._reader.line_rx_us)
       except Exception:
         _usb_debug("loop", "recover")
         # Keep loop alive without emitting unsolicited UART output.
-        self._vision.recover()
+        self._vision.recover("internal")
 
 
 def _register_uart_pins():
@@ -270,12 +832,25 @@ def _register_uart_pins():
     pass
 
 
-def _build_uart():
+def _configured_baud():
+  """Baud rate confirmed by a previous SET_BAUD handshake, else config.UART_BAUD."""
+  try:
+    baud = int(storage.read_config({}).get(config.UART_BAUD_CONFIG_KEY, config.UART_BAUD))
+  except Exception:
+    return config.UART_BAUD
+  if baud not in config.UART_BAUD_RATES:
+    return config.UART_BAUD
+  return baud
+
+
+def _build_uart(baud=None):
   if machine is None:
     raise RuntimeError("machine module unavailable")
+  if baud is None:
+    baud = config.UART_BAUD
 
   _register_uart_pins()
-  _usb_debug("uart", "id=%d" % config.UART_ID, "baud=%d" % config.UART_BAUD)
+  _usb_debug("uart", "id=%d" % config.UART_ID, "baud=%d" % baud)
 
   kwargs = {}
   kwargs["timeout"] = config.UART_READ_TIMEOUT_MS
@@ -283,13 +858,13 @@ def _build_uart():
 
   try:
     _usb_debug("uart", "open_with_kwargs")
-    return machine.UART(config.UART_ID, config.UART_BAUD, **kwargs)
+    return machine.UART(config.UART_ID, baud, **kwargs)
   except Exception:
     _usb_debug("uart", "open_with_kwargs_failed")
     pass
   try:
     _usb_debug("uart", "open_basic")
-    return machine.UART(config.UART_ID, config.UART_BAUD)
+    return machine.UART(config.UART_ID, baud)
   except Exception:
     _usb_debug("uart", "open_basic_failed")
     pass
@@ -297,8 +872,9 @@ def _build_uart():
 
 
 def main():
-  uart = _build_uart()
-  Runtime(uart).run_forever()
+  baud = _configured_baud()
+  uart = _build_uart(baud)
+  Runtime(uart, baud=baud).run_forever()
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@
 
 import config
 import storage
+from frames import frame_context
 
 try:
   import ujson as _json
@@ -34,6 +35,7 @@ class ObjectRuntime:
     self._label_map = {}
     self._input_w = None
     self._input_h = None
+    self._model_key = None
 
   def _load_module(self):
     if self._kpu is None:
@@ -49,6 +51,9 @@ class ObjectRuntime:
     self._task = None
     self._loaded = False
     self._source = None
+    self._model_key = None
+    self._input_w = None
+    self._input_h = None
 
   def _resolve_model(self):
     if storage.sd_available() and storage.ensure_sd_layout():
@@ -128,6 +133,8 @@ class ObjectRuntime:
       self._label_map = self._load_label_map()
       self._loaded = True
       self._source = source
+      self._model_key = self._model_key_for(model_ref, source)
+      self._load_input_dims()
     except Exception:
       self.deinit()
       raise VisionError("MODEL_MISSING", "objects_model")
@@ -135,6 +142,53 @@ class ObjectRuntime:
   def model_source(self):
     return self._source
 
+  def input_dims(self):
+    if self._input_w is None:
+      return None
+    return (self._input_w, self._input_h)
+
+  def _model_key_for(self, model_ref, source):
+    if source == "sd":
+      # Size in the key: a replaced model file must not reuse old dims.
+      size = 0
+      try:
+        size = int(_os.stat(model_ref)[6])
+      except Exception:
+        pass
+      return "%s:%d" % (model_ref, size)
+    return "%s:%s" % (source, model_ref)
+
+  def _load_input_dims(self):
+    if not storage.sd_available():
+      return
+    dims = storage.read_config({}).get(config.OBJECT_MODEL_DIMS_CONFIG_KEY)
+    if not isinstance(dims, dict):
+      return
+    entry = dims.get(self._model_key)
+    try:
+      w = int(entry[0])
+      h = int(entry[1])
+    except Exception:
+      return
+    if w > 0 and h > 0:
+      self._input_w, self._input_h = (w, h)
+      self._usb_debug("input dims %dx%d (saved)" % (w, h))
+
+  def _remember_input_dims(self, w, h):
+    if (w, h) == (self._input_w, self._input_h):
+      return
+    self._input_w, self._input_h = (w, h)
+    if self._model_key is None or not storage.sd_available():
+      return
+    data = storage.read_config({})
+    dims = data.get(config.OBJECT_MODEL_DIMS_CONFIG_KEY)
+    if not isinstance(dims, dict):
+      dims = {}
+    dims[self._model_key] = [w, h]
+    data[config.OBJECT_MODEL_DIMS_CONFIG_KEY] = dims
+    saved = storage.write_config(data)
+    self._usb_debug("input dims %dx%d saved=%s" % (w, h, saved))
+
   def _parse_model_dims_from_error(self, err_text):
     # Example from MaixPy:
     # "[MAIXPY]kpu: img w=320,h=240, but model w=224,h=224"
@@ -182,16 +236,17 @@ class ObjectRuntime:
     except Exception:
       pass
 
-  def _prepare_frame_for_kpu(self, frame):
-    try:
-      frame.pix_to_ai()
-    except Exception:
-      pass
-    return frame
-
   def _run_yolo2_with_resize_fallback(self, frame):
+    if self._input_w is not None:
+      # Fast path: input size already known, no failed KPU call first.
+      try:
+        return self._kpu.run_yolo2(self._task, frame.resized(self._input_w, self._input_h))
+      except Exception:
+        self._usb_debug("run_yolo2 learned %dx%d failed, rediscovering" % (self._input_w, self._input_h))
+        self._input_w = self._input_h = None
+
     try:
-      return self._kpu.run_yolo2(self._task, self._prepare_frame_for_kpu(frame))
+      detections = self._kpu.run_yolo2(self._task, frame.ai())
     except Exception as ex:
       # Some MaixPy builds print mismatch details to stdout but raise an empty exception.
       # Retry parsed dims first, then a common YOLO2 sample-model size.
@@ -207,13 +262,21 @@ class ObjectRuntime:
       for (w, h) in candidates:
         try:
           self._usb_debug("run_yolo2 retry %dx%d" % (w, h))
-          resized = frame.resize(w, h)
-          self._input_w, self._input_h = (w, h)
-          return self._kpu.run_yolo2(self._task, self._prepare_frame_for_kpu(resized))
+          detections = self._kpu.run_yolo2(self._task, frame.resized(w, h))
         except Exception as retry_ex:
           last_ex = retry_ex
+          continue
+        self._remember_input_dims(w, h)
+        return detections
       raise last_ex
 
+    # The model takes the frame as is.
+    try:
+      self._remember_input_dims(frame.width(), frame.height())
+    except Exception:
+      pass
+    return detections
+
   def _label_from_det(self, det):
     class_id = None
     try:
@@ -236,6 +299,8 @@ class ObjectRuntime:
     return mapped
 
   def detect_frame(self, frame, allow_partial=False):
+    """Labels on `frame` (a raw image or a frames.FrameContext shared with faces)."""
+    frame = frame_context(frame)
     try:
       self.ensure_loaded()
     except VisionError as err:
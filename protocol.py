@@ -13,16 +13,20 @@ except ImportError:
   import time as _time
 
 
-def _ticks_ms():
-  if hasattr(_time, "ticks_ms"):
-    return _time.ticks_ms()
-  return int(_time.time() * 1000)
+# Resolved once: the line reader calls these several times per UART chunk.
+if hasattr(_time, "ticks_ms"):
+  _ticks_ms = _time.ticks_ms
+  _ticks_us = _time.ticks_us
+  _ticks_diff = _time.ticks_diff
+else:
+  def _ticks_ms():
+    return int(_time.time() * 1000)
 
+  def _ticks_us():
+    return int(_time.time() * 1000000)
 
-def _ticks_diff(now, old):
-  if hasattr(_time, "ticks_diff"):
-    return _time.ticks_diff(now, old)
-  return now - old
+  def _ticks_diff(now, old):
+    return now - old
 
 
 def _trim_message(message):
@@ -55,24 +59,351 @@ def _json_dumps(obj):
     return _json.dumps(obj)
 
 
+class _BufferFull(Exception):
+  pass
+
+
+class JsonWriter:
+  """Compact JSON encoder that writes UTF-8 straight into a fixed buffer.
+
+  `encode()` returns False instead of growing when the payload does not fit.
+  """
+
+  _KEY_CACHE_MAX = 64
+
+  def __init__(self, max_bytes=config.MAX_JSON_BYTES):
+    self._max_bytes = max_bytes
+    self._buf = bytearray(max_bytes)
+    self._mv = memoryview(self._buf)
+    self._pos = 0
+    self._keys = {}
+
+  def _put(self, data):
+    end = self._pos + len(data)
+    if end > self._max_bytes:
+      raise _BufferFull()
+    self._buf[self._pos:end] = data
+    self._pos = end
+
+  def _key(self, key):
+    raw = self._keys.get(key)
+    if raw is None:
+      raw = (_json_dumps(str(key)) + ":").encode("utf-8")
+      if len(self._keys) < self._KEY_CACHE_MAX:
+        self._keys[key] = raw
+    self._put(raw)
+
+  def _value(self, obj):
+    if obj is None:
+      self._put(b"null")
+    elif obj is True:
+      self._put(b"true")
+    elif obj is False:
+      self._put(b"false")
+    elif isinstance(obj, str):
+      # ujson escapes in C; only the short value string is allocated.
+      self._put(_json_dumps(obj).encode("utf-8"))
+    elif isinstance(obj, int):
+      self._put(str(obj).encode("utf-8"))
+    elif isinstance(obj, float):
+      self._put(_json_dumps(obj).encode("utf-8"))
+    elif isinstance(obj, dict):
+      self._put(b"{")
+      first = True
+      for key in obj:
+        if not first:
+          self._put(b",")
+        first = False
+        self._key(key)
+        self._value(obj[key])
+      self._put(b"}")
+    elif isinstance(obj, (list, tuple)):
+      self._put(b"[")
+      first = True
+      for item in obj:
+        if not first:
+          self._put(b",")
+        first = False
+        self._value(item)
+      self._put(b"]")
+    else:
+      raise TypeError("unsupported json type")
+
+  def encode(self, obj):
+    self._pos = 0
+    try:
+      self._value(obj)
+    except _BufferFull:
+      return False
+    return True
+
+  def getvalue(self):
+    return bytes(self._mv[:self._pos])
+
+
+_writer = None
+
+
+def _get_writer(max_bytes):
+  global _writer
+  if max_bytes != config.MAX_JSON_BYTES:
+    return JsonWriter(max_bytes)
+  if _writer is None:
+    _writer = JsonWriter(max_bytes)
+  return _writer
+
+
+def shed_to_fit(payload, try_encode):
+  """Drop low-value result fields (config.JSON_SHED_ORDER) until it encodes.
+
+  `try_encode(obj)` returns the encoded bytes or None when over budget.
+  A BATCH result sheds inside each sub-result instead (see _shed_batch).
+  """
+  if not isinstance(payload, dict):
+    return None
+  result = payload.get("result")
+  if not isinstance(result, dict):
+    return None
+
+  result = dict(result)
+  shaped = dict(payload)
+  shaped["result"] = result
+  if isinstance(result.get("results"), list):
+    return _shed_batch(shaped, result, try_encode)
+  result["truncated"] = True
+  raw = try_encode(shaped)
+  if raw is not None:
+    return raw
+
+  for field in config.JSON_SHED_ORDER:
+    if field not in result:
+      continue
+    items = result[field]
+    if isinstance(items, list):
+      # Lists lose their tail one entry at a time.
+      items = list(items)
+      result[field] = items
+      while items:
+        items.pop()
+        raw = try_encode(shaped)
+        if raw is not None:
+          return raw
+    else:
+      del result[field]
+      raw = try_encode(shaped)
+      if raw is not None:
+        return raw
+  return None
+
+
+def _shed_batch(shaped, result, try_encode):
+  """shed_to_fit() for {"results": [{cmd, ok, result}, ...]}.
+
+  Each field of JSON_SHED_ORDER is shed from every sub-result before the next
+  field is touched; list tails go one entry per sub-result per round. A
+  sub-result that lost anything gets "truncated": true. If even that does not
+  fit, successful sub-results are replaced by a too_long error, last first,
+  and the rest are shed again from their full form.
+  """
+  original = result["results"]
+  dropped = 0
+  while True:
+    subs = []
+    results = []
+    skip = dropped
+    for i in range(len(original) - 1, -1, -1):
+      entry = original[i]
+      if skip and isinstance(entry, dict) and entry.get("ok"):
+        skip -= 1
+        entry = {"cmd": entry.get("cmd"), "ok": False, "error": short_error(None, "BAD_REQUEST", "too_long")["error"]}
+      elif isinstance(entry, dict) and isinstance(entry.get("result"), dict):
+        entry = dict(entry)
+        entry["result"] = dict(entry["result"])
+        subs.append(entry["result"])
+      results.append(entry)
+    if skip:
+      return None
+    results.reverse()
+    subs.reverse()
+    result["results"] = results
+
+    raw = try_encode(shaped) if dropped else None
+    if raw is not None:
+      return raw
+    for field in config.JSON_SHED_ORDER:
+      while True:
+        shed = False
+        for sub in subs:
+          if field not in sub:
+            continue
+          items = sub[field]
+          if isinstance(items, list):
+            if not items:
+              continue
+            sub[field] = items[:-1]
+          else:
+            del sub[field]
+          sub["truncated"] = True
+          shed = True
+          raw = try_encode(shaped)
+          if raw is not None:
+            return raw
+        if not shed:
+          break
+    dropped += 1
+
+
 def safe_json_encode(payload, req_id=None, max_bytes=config.MAX_JSON_BYTES):
-  text = _json_dumps(payload)
-  data = text.encode("utf-8")
-  if len(data) <= max_bytes:
-    return data
+  writer = _get_writer(max_bytes)
+  if writer.encode(payload):
+    return writer.getvalue()
+
+  def _try(obj):
+    if writer.encode(obj):
+      return writer.getvalue()
+    return None
+
+  shed = shed_to_fit(payload, _try)
+  if shed is not None:
+    return shed
 
   err_req_id = req_id
   if err_req_id is None and isinstance(payload, dict):
     err_req_id = payload.get("req_id")
   fallback = short_error(err_req_id, "BAD_REQUEST", "too_long")
-  raw = _json_dumps(fallback).encode("utf-8")
-  if len(raw) <= max_bytes:
-    return raw
+  if writer.encode(fallback):
+    return writer.getvalue()
 
   # Last-resort minimal JSON to always respect transport cap.
   return b'{"req_id":null,"ok":false,"error":{"code":"BAD_REQUEST","message":"too_long"}}'
 
 
+class Slot:
+  """Placeholder for a per-request value in a ResponseTemplate result shape."""
+
+  def __init__(self, optional=False):
+    self.optional = optional
+    self.path = None
+    self.prefix = b""
+
+
+_MISSING = object()
+
+
+def _lookup(obj, path):
+  for key in path:
+    if not isinstance(obj, dict) or key not in obj:
+      return _MISSING
+    obj = obj[key]
+  return obj
+
+
+def _shape_matches(shape, value):
+  """Whether `value` has exactly the keys of `shape` and equals its constants."""
+  if isinstance(shape, Slot):
+    return True
+  if isinstance(shape, dict):
+    if not isinstance(value, dict):
+      return False
+    for key in value:
+      if key not in shape:
+        return False
+    for key in shape:
+      sub = shape[key]
+      if key not in value:
+        if isinstance(sub, Slot) and sub.optional:
+          continue
+        return False
+      if not _shape_matches(sub, value[key]):
+        return False
+    return True
+  # True == 1 in Python, but they encode differently.
+  return type(shape) is type(value) and shape == value
+
+
+class ResponseTemplate:
+  """Success response with constant fragments encoded once at build time.
+
+  `render()` splices `req_id` and the Slot values from a result dict into the
+  shared output buffer. It returns None when the result does not match the
+  shape (a key missing or unknown at any level, or a constant that differs)
+  or does not fit, so the caller can fall back to safe_json_encode().
+  Optional slots are skipped when absent and must not be the first key.
+  """
+
+  def __init__(self, result_shape, max_bytes=config.MAX_JSON_BYTES):
+    self._max_bytes = max_bytes
+    self._shape = result_shape
+
+    parts = [b'{"req_id":', None, b',"ok":true,"result":']
+    self._compile(result_shape, (), parts, JsonWriter(max_bytes))
+    parts.append(b"}")
+
+    # Merge adjacent constant fragments.
+    merged = []
+    for part in parts:
+      if isinstance(part, bytes) and merged and isinstance(merged[-1], bytes):
+        merged[-1] = merged[-1] + part
+      else:
+        merged.append(part)
+    self._parts = merged
+
+  def _compile(self, obj, path, parts, encoder):
+    if isinstance(obj, Slot):
+      slot = Slot()
+      slot.path = path
+      parts.append(slot)
+      return
+    if not isinstance(obj, dict):
+      if not encoder.encode(obj):
+        raise ValueError("template constant too long")
+      parts.append(encoder.getvalue())
+      return
+
+    parts.append(b"{")
+    first = True
+    for key in obj:
+      value = obj[key]
+      key_raw = (_json_dumps(str(key)) + ":").encode("utf-8")
+      sep = b"" if first else b","
+      if isinstance(value, Slot) and value.optional:
+        if first:
+          raise ValueError("optional slot first")
+        slot = Slot(optional=True)
+        slot.path = path + (key,)
+        slot.prefix = sep + key_raw
+        parts.append(slot)
+      else:
+        parts.append(sep + key_raw)
+        self._compile(value, path + (key,), parts, encoder)
+      first = False
+    parts.append(b"}")
+
+  def render(self, req_id, result):
+    if not isinstance(result, dict) or not _shape_matches(self._shape, result):
+      return None
+    writer = _get_writer(self._max_bytes)
+    writer._pos = 0
+    try:
+      for part in self._parts:
+        if part is None:
+          writer._value(req_id)
+        elif isinstance(part, bytes):
+          writer._put(part)
+        else:
+          value = _lookup(result, part.path)
+          if value is _MISSING:
+            if part.optional:
+              continue
+            return None
+          if part.optional:
+            writer._put(part.prefix)
+          writer._value(value)
+    except _BufferFull:
+      return None
+    return writer.getvalue()
+
+
 def uart_writeline(uart, payload, req_id=None):
   if isinstance(payload, bytes):
     line = payload
@@ -84,7 +415,8 @@ def uart_writeline(uart, payload, req_id=None):
   if not line.endswith(b"\n"):
     line = line + b"\n"
 
-  if len(line) > config.MAX_JSON_BYTES:
+  # The cap applies to the JSON payload; the '\n' terminator is framing.
+  if len(line) > config.MAX_JSON_BYTES + 1:
     line = safe_json_encode(short_error(req_id, "BAD_REQUEST", "too_long"))
     line = line + b"\n"
 
@@ -137,16 +469,354 @@ def uart_readline(uart, timeout_ms=config.UART_LINE_TIMEOUT_MS, max_bytes=config
   return None
 
 
+def _sleep_ms(ms):
+  if hasattr(_time, "sleep_ms"):
+    _time.sleep_ms(ms)
+  else:
+    _time.sleep(ms / 1000.0)
+
+
+def _find_newline(buf, start, end):
+  # bytearray.find is missing on some MicroPython builds; scan manually there.
+  try:
+    return buf.find(b"\n", start, end)
+  except AttributeError:
+    pass
+  i = start
+  while i < end:
+    if buf[i] == 10:
+      return i
+    i += 1
+  return -1
+
+
+def _make_poller(uart):
+  try:
+    import uselect as _select
+  except ImportError:
+    try:
+      import select as _select
+    except ImportError:
+      return None
+  try:
+    poller = _select.poll()
+    poller.register(uart, _select.POLLIN)
+    return poller
+  except Exception:
+    return None
+
+
+class LineReader:
+  """Persistent UART line reader backed by one preallocated buffer.
+
+  `readline()` returns a memoryview into the internal buffer; it stays valid
+  only until the next `readline()` call.
+
+  Wait modes:
+  - "poll": block in uselect.poll() until the UART is readable.
+  - "any": spin on uart.any() with 1 ms sleeps, never entering a blocking read.
+  - "loop": blocking readinto() with 2 ms backoff (legacy behaviour).
+  "poll" falls back to "any", and "any" to "loop", when the UART lacks support
+  or the wait itself fails at runtime (counted in `downgrades`).
+  """
+
+  def __init__(self, uart, max_bytes=config.UART_MAX_LINE_BYTES, wait_mode=config.UART_WAIT_MODE):
+    self._bind(uart)
+    self._max_bytes = max_bytes
+    self._buf = bytearray(max_bytes)
+    self._mv = memoryview(self._buf)
+    self._start = 0
+    self._end = 0
+    self._scan = 0
+    self._discard = False
+    # Set by _take_line() when it dropped an oversized line.
+    self._dropped = False
+    self._poller = None
+    self._requested_mode = wait_mode
+    self._mode = self._resolve_wait_mode(wait_mode)
+    self.downgrades = 0
+    # Tick (us) when the first byte of the pending fragment / returned line was seen.
+    self._rx_us = None
+    self._fill_us = None
+    # Tick (us) at which _wait() saw the UART become readable.
+    self._ready_us = None
+    # Arrival of the returned line, or None in "loop" mode: a blocking read
+    # hides when its bytes came in, so there is nothing honest to report.
+    self.line_rx_us = None
+
+  def _bind(self, uart):
+    self._uart = uart
+    self._has_any = hasattr(uart, "any")
+    self._readinto = getattr(uart, "readinto", None)
+    # Whether readinto() takes an nbytes argument, as MicroPython's does; None until tried.
+    self._nbytes = None
+
+  def _resolve_wait_mode(self, mode):
+    if mode == "poll":
+      self._poller = _make_poller(self._uart)
+      if self._poller is not None:
+        return "poll"
+      mode = "any"
+    if mode == "any" and self._has_any:
+      return "any"
+    return "loop"
+
+  def wait_mode(self):
+    return self._mode
+
+  def _downgrade(self):
+    """Drop to the next wait mode after the current one failed."""
+    if self._mode == "poll" and self._has_any:
+      self._mode = "any"
+    else:
+      self._mode = "loop"
+    self._poller = None
+    self.downgrades += 1
+
+  def reset(self, uart=None):
+    """Drop buffered bytes (e.g. line noise after a baud switch), optionally swapping the UART."""
+    self._start = self._end = self._scan = 0
+    self._discard = False
+    self._rx_us = None
+    if uart is not None and uart is not self._uart:
+      self._bind(uart)
+      self._poller = None
+      self._mode = self._resolve_wait_mode(self._requested_mode)
+
+  def pending(self):
+    return self._end - self._start
+
+  def _compact(self):
+    if self._start == 0:
+      return
+    n = self._end - self._start
+    if n <= self._start:
+      self._buf[0:n] = self._mv[self._start:self._end]
+    else:
+      # Overlapping move; copy forward byte by byte.
+      buf = self._buf
+      off = self._start
+      for i in range(n):
+        buf[i] = buf[off + i]
+    self._scan -= self._start
+    self._start = 0
+    self._end = n
+
+  def _wait(self, timeout_ms):
+    """Bytes waiting once the UART is readable (-1 if poll() cannot tell), 0 on timeout."""
+    if self._mode == "poll":
+      return -1 if self._poller.poll(timeout_ms) else 0
+    uart = self._uart
+    avail = uart.any()
+    if avail:
+      return avail
+    start = _ticks_ms()
+    while True:
+      _sleep_ms(1)
+      avail = uart.any()
+      if avail:
+        return avail
+      if _ticks_diff(_ticks_ms(), start) >= timeout_ms:
+        return 0
+
+  def _read_at(self, end, free):
+    """readinto() at offset `end`, without slicing a new memoryview when the buffer is empty."""
+    if end == 0:
+      if free == self._max_bytes:
+        return self._readinto(self._buf)
+      if self._nbytes is not False:
+        try:
+          n = self._readinto(self._buf, free)
+        except TypeError:
+          if self._nbytes:
+            raise
+          self._nbytes = False
+        else:
+          self._nbytes = True
+          return n
+    return self._readinto(self._mv[end:end + free])
+
+  def _fill(self, nonblocking=False, avail=0):
+    """Append received bytes to the buffer; returns how many.
+
+    Outside "loop" mode (or when `nonblocking`) only what the FIFO already
+    holds is read, so readinto() never blocks, and all of it is drained in one
+    call. `avail` is a byte count the caller already got from any().
+    """
+    if self._end >= self._max_bytes:
+      self._compact()
+    end = self._end
+    room = self._max_bytes - end
+    if room <= 0:
+      return 0
+
+    uart = self._uart
+    fifo = (self._mode != "loop" or nonblocking) and self._has_any
+    n = 0
+    while room > 0:
+      free = room
+      if fifo:
+        if avail <= 0:
+          avail = uart.any()
+          if not avail:
+            break
+        if avail < free:
+          free = avail
+        avail = 0
+      if self._readinto is not None:
+        got = self._read_at(end + n, free)
+      else:
+        chunk = uart.read(free)
+        got = 0
+        if chunk:
+          if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+          got = min(len(chunk), free)
+          self._buf[end + n:end + n + got] = chunk[:got]
+      if not got:
+        break
+      n += got
+      room -= got
+      if not fifo:
+        break
+    if not n:
+      return 0
+    self._end = end + n
+    self._fill_us = self._ready_us if self._ready_us is not None else _ticks_us()
+    self._ready_us = None
+    if self._rx_us is None:
+      self._rx_us = self._fill_us
+    return n
+
+  def _arrival(self, rx_us):
+    if self._mode == "loop":
+      return None
+    return rx_us
+
+  def _take_line(self):
+    """Next complete line, or None; sets `_dropped` when an oversized line was thrown away."""
+    self._dropped = False
+    while True:
+      pos = _find_newline(self._buf, self._scan, self._end)
+      if pos < 0:
+        self._scan = self._end
+        if self._discard:
+          self._start = self._end = self._scan = 0
+          self._rx_us = None
+          return None
+        if self._end - self._start >= self._max_bytes:
+          # Oversized line: drop what we have and skip up to the next '\n'.
+          self._start = self._end = self._scan = 0
+          self._discard = True
+          self._rx_us = None
+          self._dropped = True
+        return None
+
+      begin = self._start
+      self._start = pos + 1
+      self._scan = self._start
+      rx_us = self._rx_us
+      self._rx_us = self._fill_us if self._start < self._end else None
+      if self._discard:
+        # Tail of an oversized line; the next line starts after it.
+        self._discard = False
+        continue
+
+      stop = pos
+      if stop > begin and self._buf[stop - 1] == 13:  # '\r'
+        stop -= 1
+      self.line_rx_us = self._arrival(rx_us)
+      return self._mv[begin:stop]
+
+  def poll_line(self):
+    """Non-blocking readline(): a complete line already in the FIFO, else None.
+
+    Unterminated fragments stay buffered; they are never flushed as stale here.
+    """
+    line = self._take_line()
+    if line is not None:
+      return line
+    if not self._has_any:
+      return None
+    if self._start == self._end:
+      self._start = self._end = self._scan = 0
+    try:
+      if not self._fill(nonblocking=True):
+        return None
+    except Exception:
+      return None
+    return self._take_line()
+
+  def readline(self, timeout_ms=config.UART_LINE_TIMEOUT_MS):
+    start = _ticks_ms()
+
+    while True:
+      line = self._take_line()
+      if line is not None:
+        return line
+      if self._dropped:
+        return None
+
+      remaining = timeout_ms - _ticks_diff(_ticks_ms(), start)
+      if remaining <= 0:
+        break
+
+      if self._start == self._end:
+        # Nothing buffered: rewind so the next fill gets the whole buffer.
+        self._start = self._end = self._scan = 0
+
+      avail = 0
+      if self._mode != "loop":
+        try:
+          avail = self._wait(remaining)
+          if not avail:
+            continue
+          self._ready_us = _ticks_us()
+        except Exception:
+          # A broken poller/any() must not silence the reader for good.
+          self._downgrade()
+          continue
+      try:
+        n = self._fill(avail=avail)
+      except Exception:
+        return None
+
+      if not n and self._mode == "loop":
+        _sleep_ms(2)
+
+    # Flush a stale unterminated fragment, like uart_readline() does on timeout.
+    if self._rx_us is not None and self._end > self._start and not self._discard:
+      if _ticks_diff(_ticks_us(), self._rx_us) >= timeout_ms * 1000:
+        begin = self._start
+        stop = self._end
+        self.line_rx_us = self._arrival(self._rx_us)
+        self._start = self._end = self._scan = 0
+        self._rx_us = None
+        if self._buf[stop - 1] == 13:
+          stop -= 1
+        return self._mv[begin:stop]
+    return None
+
+
+def _loads_buffer(buf):
+  # ujson.loads accepts any buffer; CPython json needs bytes.
+  try:
+    return _json.loads(buf)
+  except TypeError:
+    return _json.loads(bytes(buf))
+
+
 def parse_json_line(line_bytes):
   if line_bytes is None:
     return None, short_error(None, "BAD_REQUEST", "empty")
 
   try:
-    if isinstance(line_bytes, bytes):
-      text = line_bytes.decode("utf-8")
+    if isinstance(line_bytes, memoryview):
+      payload = _loads_buffer(line_bytes)
+    elif isinstance(line_bytes, bytes):
+      payload = _json.loads(line_bytes.decode("utf-8"))
     else:
-      text = str(line_bytes)
-    payload = _json.loads(text)
+      payload = _json.loads(str(line_bytes))
   except Exception:
     return None, short_error(None, "BAD_REQUEST", "bad_json")
 
@@ -53,7 +53,11 @@ def ensure_sd_layout():
   return True
 
 
-def face_path(person):
+# Gallery index in SD_FACES_DIR: person -> template file names, oldest first.
+_INDEX_NAME = "index.json"
+
+
+def _legacy_face_path(person):
   if person == config.PERSON_OWNER_1:
     return config.OWNER_1_FACE_PATH
   if person == config.PERSON_OWNER_2:
@@ -61,6 +65,91 @@ def face_path(person):
   return None
 
 
+def _basename(path):
+  return path.split("/")[-1]
+
+
+def template_path(name):
+  return config.SD_FACES_DIR + "/" + name
+
+
+def gallery_index():
+  """person -> template file names (oldest first), from the index or legacy owner files."""
+  if _path_exists(template_path(_INDEX_NAME)):
+    try:
+      with open(template_path(_INDEX_NAME), "r") as f:
+        data = _json.loads(f.read())
+      if isinstance(data, dict):
+        return data
+    except Exception:
+      pass
+  index = {}
+  for person in config.KNOWN_PERSONS:
+    path = _legacy_face_path(person)
+    if path and _path_exists(path):
+      index[person] = [_basename(path)]
+  return index
+
+
+def _write_index(index):
+  try:
+    payload = _json.dumps(index, separators=(",", ":"))
+  except TypeError:
+    payload = _json.dumps(index)
+  try:
+    with open(template_path(_INDEX_NAME), "w") as f:
+      f.write(payload)
+    return True
+  except Exception:
+    return False
+
+
+def _remove(path):
+  try:
+    _os.remove(path)
+    return True
+  except Exception:
+    return False
+
+
+def new_template_path(person):
+  """Free file path for the next template of `person`; register it with commit_template().
+
+  Names are checked against every person's templates, case-insensitively
+  (FAT on the SD card is), and against files already on the card.
+  """
+  index = gallery_index()
+  used = {}
+  for names in index.values():
+    for name in names:
+      used[name.lower()] = True
+  n = 0
+  while True:
+    name = "%s_%d.jpg" % (person.lower(), n)
+    if name not in used and not _path_exists(template_path(name)):
+      return template_path(name)
+    n += 1
+
+
+def commit_template(person, path):
+  """Add a written template to the index; the oldest beyond GALLERY_MAX_TEMPLATES is deleted."""
+  index = gallery_index()
+  names = index.get(person, [])
+  names.append(_basename(path))
+  while len(names) > config.GALLERY_MAX_TEMPLATES:
+    _remove(template_path(names.pop(0)))
+  index[person] = names
+  return _write_index(index)
+
+
+def face_path(person):
+  """Path of the newest template of `person`, or None."""
+  names = gallery_index().get(person)
+  if not names:
+    return None
+  return template_path(names[-1])
+
+
 def load_face_bytes(person):
   path = face_path(person)
   if not path or not _path_exists(path):
@@ -75,45 +164,44 @@ def load_face_bytes(person):
 def save_face_jpeg(person, jpeg_bytes):
   if not ensure_sd_layout():
     return False
-  path = face_path(person)
-  if not path or jpeg_bytes is None:
+  if jpeg_bytes is None:
     return False
+  path = new_template_path(person)
   try:
     with open(path, "wb") as f:
       f.write(jpeg_bytes)
-    return True
   except Exception:
     return False
+  return commit_template(person, path)
 
 
 def delete_face(person):
-  path = face_path(person)
-  if not path or not _path_exists(path):
-    return False
-  try:
-    _os.remove(path)
-    return True
-  except Exception:
-    return False
+  """Delete every template of `person`; returns how many were removed."""
+  index = gallery_index()
+  names = index.pop(person, None)
+  if not names:
+    return 0
+  removed = 0
+  for name in names:
+    if _remove(template_path(name)):
+      removed += 1
+  _write_index(index)
+  return removed
 
 
 def reset_faces():
   removed = 0
-  if delete_face(config.PERSON_OWNER_1):
-    removed += 1
-  if delete_face(config.PERSON_OWNER_2):
-    removed += 1
+  for person in list(gallery_index()):
+    removed += delete_face(person)
   return removed
 
 
 def load_face_files():
   faces = {}
-  b1 = load_face_bytes(config.PERSON_OWNER_1)
-  b2 = load_face_bytes(config.PERSON_OWNER_2)
-  if b1 is not None:
-    faces[config.PERSON_OWNER_1] = b1
-  if b2 is not None:
-    faces[config.PERSON_OWNER_2] = b2
+  for person in gallery_index():
+    data = load_face_bytes(person)
+    if data is not None:
+      faces[person] = data
   return faces
 
 
@@ -0,0 +1,58 @@
+import json
+import unittest
+
+import codec
+import config
+import protocol
+
+
+class CodecTests(unittest.TestCase):
+    def test_roundtrip_scan_payload(self):
+        payload = {
+            "req_id": "42",
+            "ok": True,
+            "result": {
+                "person": "OWNER_1",
+                "faces_detected": 1,
+                "objects": ["sofa", "table"],
+                "confidence": {"person": 0.5},
+                "frames": 3,
+                "truncated": False,
+                "custom_key": [None, -5, 300, -70000, 2 ** 40],
+            },
+        }
+        raw = codec.encode_frame(payload)
+        decoded, used = codec.decode_frame(raw)
+        self.assertEqual(used, len(raw))
+        self.assertEqual(decoded, payload)
+
+    def test_frame_is_smaller_than_json(self):
+        payload = {
+            "req_id": "42",
+            "ok": True,
+            "result": {"person": "NONE", "faces_detected": 0, "objects": [], "frames": 1, "truncated": False},
+        }
+        self.assertLess(len(codec.encode_frame(payload)), len(protocol.safe_json_encode(payload)))
+
+    def test_crc_mismatch_is_rejected(self):
+        raw = bytearray(codec.encode_frame({"req_id": 1, "ok": True, "result": {}}))
+        raw[4] ^= 0x01
+        with self.assertRaises(codec.CodecError):
+            codec.decode_frame(bytes(raw))
+
+    def test_crc16_ccitt_false_check_value(self):
+        self.assertEqual(codec.crc16(b"123456789"), 0x29B1)
+
+    def test_oversized_result_is_shed(self):
+        payload = {"req_id": "s", "ok": True, "result": {"objects": ["x" * 40] * 40, "frames": 1}}
+        raw = codec.encode_frame(payload)
+        self.assertLessEqual(len(raw), config.MAX_JSON_BYTES)
+        decoded, _ = codec.decode_frame(raw)
+        self.assertTrue(decoded["ok"])
+        self.assertTrue(decoded["result"]["truncated"])
+        self.assertLess(len(decoded["result"]["objects"]), 40)
+        json.dumps(decoded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -38,11 +38,29 @@ class FakeStat:
 
 
 class FakeImage:
-    def __init__(self, score=10, sharp=5):
+    def __init__(self, score=10, sharp=5, level=128):
         self.score = score
         self.sharp = sharp
+        self.level = level
         self.saved_path = None
 
+    def width(self):
+        return 64
+
+    def height(self):
+        return 64
+
+    def get_pixel(self, x, y):
+        # Halves around mid-grey: features are mean-centred, so a flat image carries no signal,
+        # and the coarse gallery summary must see the structure too.
+        v = self.level if x < config.FACE_FEATURE_GRID // 2 else 255 - self.level
+        return (v, v, v)
+
+    def to_bytes(self):
+        # The grayscale thumbnail buffer; the fake resize() is a no-op.
+        grid = config.FACE_FEATURE_GRID
+        return bytes(self.get_pixel(x, y)[0] for y in range(grid) for x in range(grid))
+
     def copy(self, roi=None):
         return FakeImage(self.score, self.sharp)
 
@@ -75,6 +93,168 @@ class FakeFrame(FakeImage):
         return self._height
 
 
+class EmbedImage:
+    """Face crop whose embedding the fake feature extractor returns as is."""
+
+    def __init__(self, vec):
+        self.vec = vec
+        self.ai = False
+
+    def width(self):
+        return 128
+
+    def height(self):
+        return 128
+
+    def pix_to_ai(self):
+        self.ai = True
+
+    def resize(self, _w, _h):
+        return self
+
+    def get_statistics(self):
+        return FakeStat(l_stdev=5)
+
+    def compress(self, quality=90):
+        return b"jpeg"
+
+
+class FakeEmbedKPU:
+    def __init__(self):
+        self.loaded = []
+        self.forwards = 0
+
+    def load(self, ref):
+        self.loaded.append(ref)
+        return "fe"
+
+    def forward(self, _task, img):
+        assert img.ai
+        self.forwards += 1
+        return list(img.vec)
+
+    def deinit(self, _task):
+        return None
+
+
+class TemplateImage:
+    """Gallery JPEG as the image module loads it; legacy templates are 64x64 grayscale."""
+
+    def __init__(self, vec, size=64, fmt="grayscale"):
+        self.vec = vec
+        self.size = size
+        self.fmt = fmt
+        self.ai = False
+
+    def width(self):
+        return self.size
+
+    def height(self):
+        return self.size
+
+    def format(self):
+        return self.fmt
+
+    def resize(self, w, _h):
+        return TemplateImage(self.vec, w, self.fmt)
+
+    def to_rgb565(self, copy=True):
+        return TemplateImage(self.vec, self.size, "rgb565")
+
+    def pix_to_ai(self):
+        self.ai = True
+
+
+class TemplateImageModule:
+    GRAYSCALE = "grayscale"
+
+    def __init__(self, files):
+        self.files = files
+
+    def Image(self, path):
+        vec = self.files[path]
+        if vec is None:
+            raise OSError("read")
+        return TemplateImage(vec)
+
+
+class InputCheckingKPU(FakeEmbedKPU):
+    def forward(self, task, img):
+        assert (img.width(), img.height(), img.format()) == (config.FACE_EMBED_INPUT, config.FACE_EMBED_INPUT, "rgb565")
+        return super().forward(task, img)
+
+
+class BufferImage(FakeImage):
+    """Preallocated ROI buffer; copies count as allocations of the owning module."""
+
+    def __init__(self, module, size, fmt):
+        super().__init__()
+        self.module = module
+        self.size = size
+        self.format = fmt
+        self.draws = []
+
+    def width(self):
+        return self.size[0]
+
+    def height(self):
+        return self.size[1]
+
+    def draw_image(self, src, x, y, x_scale=1.0, y_scale=1.0):
+        if not self.module.draw:
+            raise AttributeError("draw_image")
+        self.draws.append((x, y, x_scale, y_scale))
+        self.level = src.level
+
+    def copy(self, roi=None):
+        self.module.allocs += 1
+        return FakeImage(self.score, self.sharp, self.level)
+
+    def resize(self, _w, _h):
+        self.module.allocs += 1
+        return FakeImage(self.score, self.sharp, self.level)
+
+
+class CountingImageModule:
+    GRAYSCALE = "grayscale"
+
+    def __init__(self, draw=True):
+        self.draw = draw
+        self.allocs = 0
+
+    def Image(self, size=None, format=None):
+        self.allocs += 1
+        return BufferImage(self, size, format)
+
+
+class CountingFrame(FakeFrame):
+    def __init__(self, level=128):
+        super().__init__()
+        self.level = level
+        self.copies = 0
+
+    def copy(self, roi=None):
+        self.copies += 1
+        return FakeImage(self.score, self.sharp, self.level)
+
+
+class DetectKPU:
+    def __init__(self, dets):
+        self.dets = dets
+
+    def load(self, _ref):
+        return "fd"
+
+    def init_yolo2(self, *_args):
+        return None
+
+    def run_yolo2(self, _task, _img):
+        return self.dets
+
+    def deinit(self, _task):
+        return None
+
+
 class FaceRuntimeTests(unittest.TestCase):
     def test_person_vote_tie_break_by_conf(self):
         p, c = faces._person_from_votes(
@@ -100,19 +280,64 @@ class FaceRuntimeTests(unittest.TestCase):
     def test_recognize_best_template(self):
         rt = faces.FaceRuntime(image_mod=object(), kpu_mod=object())
         rt._primary_face = lambda _frame: (FakeDet(), 1)
-        rt._extract_roi = lambda _frame, _bbox: (FakeImage(score=10), (0, 0, 10, 10))
-        rt._known_templates = {
-            config.PERSON_OWNER_1: FakeImage(score=11),
-            config.PERSON_OWNER_2: FakeImage(score=16),
-        }
+        rt._extract_roi = lambda _frame, _bbox: (FakeImage(level=100), (0, 0, 10, 10))
+        rt._recognizer.add(config.PERSON_OWNER_1, faces.face_features(FakeImage(level=110)))
+        rt._recognizer.add(config.PERSON_OWNER_2, faces.face_features(FakeImage(level=140)))
         out = rt.recognize_frame(FakeFrame())
         self.assertEqual(out["person"], config.PERSON_OWNER_1)
         self.assertGreater(out["confidence"], 0.7)
 
+    def test_recognize_unknown_above_threshold(self):
+        rt = faces.FaceRuntime(image_mod=object(), kpu_mod=object())
+        rt._primary_face = lambda _frame: (FakeDet(), 1)
+        rt._extract_roi = lambda _frame, _bbox: (FakeImage(level=40), (0, 0, 10, 10))
+        rt._recognizer.add(config.PERSON_OWNER_1, faces.face_features(FakeImage(level=200)))
+        out = rt.recognize_frame(FakeFrame())
+        self.assertEqual(out["person"], config.PERSON_UNKNOWN)
+
+    def test_face_features_read_the_pixel_buffer_once(self):
+        grid = config.FACE_FEATURE_GRID
+        n = grid * grid
+
+        class Thumb:
+            def __init__(self, data):
+                self.data = data
+                self.gray_copies = []
+
+            def width(self):
+                return grid
+
+            def height(self):
+                return grid
+
+            def get_pixel(self, _x, _y):
+                raise AssertionError("per-pixel read")
+
+            def to_bytes(self):
+                return self.data
+
+            def to_grayscale(self, copy=False):
+                self.gray_copies.append(copy)
+                return Thumb(bytes(range(n // 2)) * 2)
+
+        gray = Thumb(bytes([100]) * (n // 2) + bytes([200]) * (n // 2))
+        self.assertEqual(list(faces.face_features(gray)), [78] * (n // 2) + [178] * (n // 2))
+        # RGB565: twice the bytes; converted once, as a copy since the image is the caller's.
+        rgb = Thumb(bytes(2 * n))
+        self.assertIsNotNone(faces.face_features(rgb))
+        self.assertEqual(rgb.gray_copies, [True])
+
+    def test_feature_distance_scale_and_cutoff(self):
+        a = faces.array("B", [0, 0, 0, 0])
+        b = faces.array("B", [255, 255, 0, 0])
+        self.assertEqual(faces.feature_distance(a, b), 50)
+        self.assertEqual(faces.feature_distance(a, a), 0)
+        self.assertEqual(faces.feature_distance(a, b, limit=10), 255)
+
     def test_learn_bad_person(self):
         rt = faces.FaceRuntime(image_mod=object(), kpu_mod=object())
         with self.assertRaises(faces.VisionError) as ctx:
-            rt.learn(lambda: FakeFrame(), "NOPE", 1, faces._ticks_ms() + 10000)
+            rt.learn(lambda: FakeFrame(), "not an id", 1, faces._ticks_ms() + 10000)
         self.assertEqual(ctx.exception.code, "BAD_REQUEST")
 
     def test_learn_storage_missing(self):
@@ -144,17 +369,249 @@ class FaceRuntimeTests(unittest.TestCase):
         ), mock.patch("storage.save_face_jpeg", return_value=True):
             out = rt.learn(lambda: FakeFrame(), config.PERSON_OWNER_1, 1, faces._ticks_ms() + 10000)
         self.assertEqual(out["status"], "learned")
-        self.assertIn(config.PERSON_OWNER_1, rt._known_templates)
+        self.assertEqual(out["templates"], 1)
+        self.assertEqual(rt._recognizer.persons(), {config.PERSON_OWNER_1: 1})
+
+    def test_learn_yields_between_frames(self):
+        rt = faces.FaceRuntime(image_mod=object(), kpu_mod=object())
+        rt._primary_face = lambda _frame: (None, 0)
+        boundaries = []
+        with mock.patch("storage.sd_available", return_value=True), mock.patch(
+            "storage.ensure_sd_layout", return_value=True
+        ):
+            with self.assertRaises(faces.VisionError):
+                rt.learn(lambda: FakeFrame(), config.PERSON_OWNER_1, 3, faces._ticks_ms() + 10000, lambda: boundaries.append(1))
+        self.assertEqual(len(boundaries), 2)
+
+    def test_learn_undescribable_face_saves_nothing(self):
+        rt = faces.FaceRuntime(image_mod=object(), kpu_mod=object())
+        rt._primary_face = lambda _frame: (FakeDet(w=20, h=20), 1)
+        rt._extract_roi = lambda _frame, _bbox: (FakeImage(score=10, sharp=7), (0, 0, 20, 20))
+        rt._recognizer.describe = lambda _img: None
+        with mock.patch("storage.sd_available", return_value=True), mock.patch(
+            "storage.ensure_sd_layout", return_value=True
+        ), mock.patch("storage.save_face_jpeg") as save, mock.patch("storage.commit_template") as commit:
+            with self.assertRaises(faces.VisionError) as ctx:
+                rt.learn(lambda: FakeFrame(), config.PERSON_OWNER_1, 1, faces._ticks_ms() + 10000)
+        self.assertEqual((ctx.exception.code, ctx.exception.message), ("VISION_FAILED", "face_roi"))
+        save.assert_not_called()
+        commit.assert_not_called()
+        self.assertEqual(len(rt._recognizer), 0)
+
+    def test_learn_new_person_when_gallery_full(self):
+        rt = faces.FaceRuntime(image_mod=object(), kpu_mod=object())
+        full = {"P%d" % i: ["p%d_0.jpg" % i] for i in range(config.GALLERY_MAX_PERSONS)}
+        with mock.patch("storage.sd_available", return_value=True), mock.patch(
+            "storage.ensure_sd_layout", return_value=True
+        ), mock.patch("storage.gallery_index", return_value=full):
+            with self.assertRaises(faces.VisionError) as ctx:
+                rt.learn(lambda: FakeFrame(), "alice", 1, faces._ticks_ms() + 10000)
+        self.assertEqual(ctx.exception.message, "gallery_full")
+
+    def test_roi_buffer_reused_across_frames(self):
+        module = CountingImageModule()
+        rt = faces.FaceRuntime(image_mod=module, kpu_mod=DetectKPU([FakeDet(40, 20, 80, 80)]))
+        rt._recognizer.add(config.PERSON_OWNER_1, faces.face_features(FakeImage(level=100)))
+        frame = CountingFrame(level=100)
+        for _ in range(5):
+            out = rt.recognize_frame(frame)
+            self.assertEqual(out["person"], config.PERSON_OWNER_1)
+        self.assertEqual(module.allocs, 1)
+        self.assertEqual(frame.copies, 0)
+        buf = rt._roi_buf
+        grid = config.FACE_FEATURE_GRID
+        self.assertEqual((buf.size, buf.format), ((grid, grid), module.GRAYSCALE))
+        scale = float(grid) / 80
+        self.assertEqual(buf.draws[0], (-int(40 * scale), -int(20 * scale), scale, scale))
+        self.assertEqual(rt.recognizer_stats()["roi"], {"buffer": True, "allocs": 1})
+
+    def test_roi_falls_back_to_copy_without_draw_image(self):
+        module = CountingImageModule(draw=False)
+        rt = faces.FaceRuntime(image_mod=module, kpu_mod=DetectKPU([FakeDet(40, 20, 80, 80)]))
+        frame = CountingFrame()
+        for _ in range(3):
+            rt.recognize_frame(frame)
+        self.assertEqual(frame.copies, 3)
+        # The buffer, then copy + resize per frame.
+        self.assertEqual(rt.recognizer_stats()["roi"]["allocs"], 1 + 3 * 2)
+
+    def test_learn_copies_only_improving_rois(self):
+        module = CountingImageModule()
+        dets = [FakeDet(0, 0, 40, 40), FakeDet(0, 0, 30, 30), FakeDet(0, 0, 60, 60)]
+        rt = faces.FaceRuntime(image_mod=module, kpu_mod=DetectKPU([]))
+        rt._primary_face = lambda _frame: (dets.pop(0), 1)
+        saved = []
+        with mock.patch("storage.sd_available", return_value=True), mock.patch(
+            "storage.ensure_sd_layout", return_value=True
+        ), mock.patch("storage.gallery_index", return_value={}), mock.patch(
+            "storage.save_face_jpeg", side_effect=lambda person, data: saved.append(person) or True
+        ):
+            rt.learn(lambda: CountingFrame(), "alice", 3, faces._ticks_ms() + 10000)
+        # The buffer plus copies of the 40x40 and 60x60 faces, not the smaller one.
+        self.assertEqual(module.allocs, 3)
+        self.assertEqual(saved, ["ALICE"])
+
+    def test_recognize_faces_largest_first_and_capped(self):
+        sizes = [10, 50, 30, 70, 20, 60]
+        dets = [FakeDet(x=i * 40, y=0, w=w, h=w) for i, w in enumerate(sizes)]
+        rt = faces.FaceRuntime(image_mod=object(), kpu_mod=DetectKPU(dets))
+        rt._extract_roi = lambda _frame, det: (FakeImage(level=100), (det.x(), det.y(), det.w(), det.h()))
+        rt._recognizer.add(config.PERSON_OWNER_1, faces.face_features(FakeImage(level=100)))
+        out = rt.recognize_faces(FakeFrame())
+        self.assertEqual(out["faces_detected"], 6)
+        widths = [face["bbox"][2] for face in out["faces"]]
+        self.assertEqual(widths, sorted(sizes, reverse=True)[:config.MULTI_FACE_MAX])
+        self.assertEqual({face["person"] for face in out["faces"]}, {config.PERSON_OWNER_1})
+
+    def test_vote_faces_tracks_each_face_across_frames(self):
+        rt = faces.FaceRuntime(image_mod=object(), kpu_mod=object())
+
+        def face(person, conf, bbox):
+            return {"person": person, "confidence": conf, "bbox": bbox}
+
+        samples = [
+            {"faces": [face("ALICE", 0.9, (10, 10, 80, 80)), face("BOB", 0.8, (200, 20, 50, 50))]},
+            # Alice misread once and a one-frame false detection.
+            {"faces": [face("BOB", 0.5, (14, 12, 80, 80)), face("BOB", 0.9, (202, 20, 50, 50)),
+                       face(config.PERSON_UNKNOWN, 0.4, (120, 150, 20, 20))]},
+            {"faces": [face("ALICE", 0.95, (16, 12, 80, 80)), face("BOB", 0.85, (204, 22, 50, 50))]},
+        ]
+        self.assertEqual(rt.vote_faces(samples), [
+            {"person": "ALICE", "conf": 0.95, "bbox": [16, 12, 80, 80]},
+            {"person": "BOB", "conf": 0.9, "bbox": [204, 22, 50, 50]},
+        ])
+
+    def test_person_id_normalization(self):
+        self.assertEqual(faces.person_id("alice_2"), "ALICE_2")
+        self.assertIsNone(faces.person_id("unknown"))
+        self.assertIsNone(faces.person_id("a b"))
+        self.assertIsNone(faces.person_id("X" * (config.GALLERY_MAX_ID_LEN + 1)))
+        self.assertIsNone(faces.person_id(7))
+
+    def test_gallery_keeps_newest_templates_per_person(self):
+        gallery = faces.DifferenceRecognizer()
+        for level in range(config.GALLERY_MAX_TEMPLATES + 2):
+            gallery.add("ALICE", faces.face_features(FakeImage(level=level * 20)))
+        gallery.add("BOB", faces.face_features(FakeImage(level=250)))
+        self.assertEqual(gallery.persons(), {"ALICE": config.GALLERY_MAX_TEMPLATES, "BOB": 1})
+        self.assertEqual(gallery.remove("ALICE"), config.GALLERY_MAX_TEMPLATES)
+        self.assertEqual(len(gallery), 1)
+
+    def test_gallery_prunes_to_shortlist_and_finds_best(self):
+        gallery = faces.DifferenceRecognizer()
+        for i in range(20):
+            gallery.add("P%d" % i, faces.face_features(FakeImage(level=10 + i * 12)))
+        probe = faces.face_features(FakeImage(level=10 + 7 * 12 + 2))
+        calls = []
+        real = faces.feature_distance
+
+        def counting(a, b, limit=255):
+            calls.append(len(a))
+            return real(a, b, limit)
+
+        with mock.patch("faces.feature_distance", counting):
+            person, score = gallery.match(probe)
+        self.assertEqual(person, "P7")
+        self.assertLessEqual(score, config.FACE_SCORE_THRESH_STRONG)
+        full = config.FACE_FEATURE_GRID * config.FACE_FEATURE_GRID
+        self.assertEqual(calls.count(full), config.GALLERY_SHORTLIST)
+
+    def test_delete_face(self):
+        rt = faces.FaceRuntime(image_mod=object(), kpu_mod=object())
+        rt._recognizer.add("ALICE", faces.face_features(FakeImage()))
+        with mock.patch("storage.sd_available", return_value=True), mock.patch(
+            "storage.ensure_sd_layout", return_value=True
+        ), mock.patch("storage.delete_face", side_effect=lambda p: 1 if p == "ALICE" else 0):
+            out = rt.delete_face("alice")
+            self.assertEqual(out, {"status": "deleted", "person": "ALICE", "templates": 1})
+            with self.assertRaises(faces.VisionError) as ctx:
+                rt.delete_face("bob")
+        self.assertEqual(rt.list_faces(), {"persons": {}, "templates": 0})
+        self.assertEqual(ctx.exception.message, "unknown_person")
+
+    def _embedding_runtime(self):
+        kpu = FakeEmbedKPU()
+        with mock.patch.object(config, "FACE_RECOGNIZER", "embedding"):
+            rt = faces.FaceRuntime(image_mod=object(), kpu_mod=kpu)
+        rt._primary_face = lambda _frame: (FakeDet(), 1)
+        return rt, kpu
+
+    def test_recognizer_selected_by_config(self):
+        self.assertIsInstance(faces.FaceRuntime(image_mod=object(), kpu_mod=object())._recognizer, faces.DifferenceRecognizer)
+        rt, _ = self._embedding_runtime()
+        self.assertIsInstance(rt._recognizer, faces.EmbeddingRecognizer)
+        self.assertEqual(rt._recognizer.roi_size, config.FACE_EMBED_INPUT)
+
+    def test_embedding_backend_matches_by_cosine(self):
+        rt, kpu = self._embedding_runtime()
+        with mock.patch.object(config, "FACE_EMBED_MODEL_ADDR", 0x500000), mock.patch(
+            "storage.sd_available", return_value=False
+        ):
+            rt._recognizer.add("ALICE", rt._recognizer.describe(EmbedImage([1.0, 0.0, 0.0])))
+            rt._recognizer.add("BOB", rt._recognizer.describe(EmbedImage([0.0, 1.0, 0.0])))
+            rt._extract_roi = lambda _frame, _bbox: (EmbedImage([0.9, 0.2, 0.1]), (0, 0, 10, 10))
+            out = rt.recognize_frame(FakeFrame())
+        self.assertEqual(kpu.loaded, [0x500000])
+        self.assertEqual(out["person"], "ALICE")
+        self.assertLessEqual(out["score"], config.FACE_EMBED_SCORE_STRONG)
+        stats = rt.recognizer_stats()
+        self.assertEqual(stats["name"], "embedding")
+        self.assertGreater(stats["margin"], 50)
+
+    def test_embedding_backend_unknown_below_similarity(self):
+        rt, _ = self._embedding_runtime()
+        with mock.patch.object(config, "FACE_EMBED_MODEL_ADDR", 0x500000), mock.patch(
+            "storage.sd_available", return_value=False
+        ):
+            rt._recognizer.add("ALICE", rt._recognizer.describe(EmbedImage([1.0, 0.0])))
+            rt._extract_roi = lambda _frame, _bbox: (EmbedImage([0.5, 0.5]), (0, 0, 10, 10))
+            out = rt.recognize_frame(FakeFrame())
+        self.assertEqual(out["person"], config.PERSON_UNKNOWN)
+
+    def test_embedding_model_missing(self):
+        rt, _ = self._embedding_runtime()
+        rt._recognizer.add("ALICE", faces.array("f", [1.0, 0.0]))
+        rt._extract_roi = lambda _frame, _bbox: (EmbedImage([1.0, 0.0]), (0, 0, 10, 10))
+        with mock.patch.object(config, "FACE_EMBED_MODEL_ADDR", None), mock.patch(
+            "storage.sd_available", return_value=False
+        ):
+            with self.assertRaises(faces.VisionError) as ctx:
+                rt.recognize_frame(FakeFrame())
+        self.assertEqual(ctx.exception.code, "MODEL_MISSING")
+
+    def test_embedding_backend_loads_legacy_templates(self):
+        module = TemplateImageModule({"alice_0.jpg": [1.0, 0.0], "alice_1.jpg": None, "bob_0.jpg": [0.0, 1.0]})
+        kpu = InputCheckingKPU()
+        with mock.patch.object(config, "FACE_RECOGNIZER", "embedding"):
+            rt = faces.FaceRuntime(image_mod=module, kpu_mod=kpu)
+        index = {"ALICE": ["alice_0.jpg", "alice_1.jpg"], "BOB": ["bob_0.jpg"]}
+        with mock.patch.object(config, "FACE_EMBED_MODEL_ADDR", 0x500000), mock.patch(
+            "storage.gallery_index", return_value=index
+        ), mock.patch("storage.template_path", side_effect=lambda name: name):
+            self.assertEqual(rt.load_templates(), 2)
+        self.assertEqual(kpu.forwards, 2)
+        self.assertEqual(rt._recognizer.persons(), {"ALICE": 1, "BOB": 1})
+        self.assertEqual(rt.template_stats(), {"loaded": 2, "failed": 1, "error": "template_read"})
+
+    def test_embedding_gallery_matrix_caps_and_removes_rows(self):
+        rec = faces.EmbeddingRecognizer(kpu_mod=FakeEmbedKPU())
+        for i in range(config.GALLERY_MAX_TEMPLATES + 1):
+            rec.add("ALICE", faces.array("f", [float(i), 1.0]))
+        rec.add("BOB", faces.array("f", [0.0, 1.0]))
+        self.assertEqual(rec.persons(), {"ALICE": config.GALLERY_MAX_TEMPLATES, "BOB": 1})
+        self.assertEqual(list(rec._matrix[:2]), [1.0, 1.0])
+        self.assertEqual(rec.remove("ALICE"), config.GALLERY_MAX_TEMPLATES)
+        self.assertEqual(list(rec._matrix), [0.0, 1.0])
 
     def test_reset_faces(self):
         rt = faces.FaceRuntime(image_mod=object(), kpu_mod=object())
-        rt._known_templates = {config.PERSON_OWNER_1: FakeImage()}
+        rt._recognizer.add(config.PERSON_OWNER_1, faces.face_features(FakeImage()))
         with mock.patch("storage.sd_available", return_value=True), mock.patch(
             "storage.ensure_sd_layout", return_value=True
         ), mock.patch("storage.reset_faces", return_value=1):
             out = rt.reset_faces()
         self.assertEqual(out["status"], "reset")
-        self.assertEqual(rt._known_templates, {})
+        self.assertEqual(rt.templates_loaded(), 0)
 
 
 if __name__ == "__main__":
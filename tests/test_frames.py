@@ -0,0 +1,95 @@
+import unittest
+
+import faces
+import frames
+import objects
+
+
+class CountingImage:
+    def __init__(self, w=320, h=240):
+        self.w = w
+        self.h = h
+        self.ops = []
+
+    def width(self):
+        return self.w
+
+    def height(self):
+        return self.h
+
+    def pix_to_ai(self):
+        self.ops.append(("ai", self.w, self.h))
+
+    def resize(self, w, h):
+        self.ops.append(("resize", w, h))
+        return CountingImage(w, h)
+
+    def get_statistics(self, roi=None):
+        self.ops.append(("stats", roi))
+        return (100, 10)
+
+
+class SharedKPU:
+    def __init__(self):
+        self.inputs = []
+
+    def load(self, _ref):
+        return object()
+
+    def init_yolo2(self, *_args):
+        return None
+
+    def run_yolo2(self, _task, img):
+        self.inputs.append(img)
+        return []
+
+    def deinit(self, _task):
+        return None
+
+
+class FrameContextTests(unittest.TestCase):
+    def test_conversions_are_memoized(self):
+        img = CountingImage()
+        counters = {"done": 0, "saved": 0}
+        ctx = frames.FrameContext(img, counters)
+        self.assertIs(ctx.ai(), img)
+        self.assertIs(ctx.ai(), img)
+        small = ctx.resized(224, 224)
+        self.assertIs(ctx.resized(224, 224), small)
+        ctx.statistics((0, 0, 8, 8))
+        ctx.statistics((0, 0, 8, 8))
+        self.assertEqual(img.ops, [("ai", 320, 240), ("resize", 224, 224), ("stats", (0, 0, 8, 8))])
+        self.assertEqual(small.ops, [("ai", 224, 224)])
+        self.assertEqual(counters, {"done": 3, "saved": 3})
+
+    def test_resize_to_own_size_is_the_ai_frame(self):
+        img = CountingImage(224, 224)
+        ctx = frames.FrameContext(img)
+        self.assertIs(ctx.resized(224, 224), img)
+        self.assertEqual(img.ops, [("ai", 224, 224)])
+
+    def test_existing_context_is_passed_through(self):
+        ctx = frames.FrameContext(CountingImage())
+        self.assertIs(frames.frame_context(ctx), ctx)
+
+    def test_face_and_object_detectors_share_one_conversion(self):
+        img = CountingImage()
+        counters = {"done": 0, "saved": 0}
+        ctx = frames.FrameContext(img, counters)
+        kpu = SharedKPU()
+        face_rt = faces.FaceRuntime(image_mod=object(), kpu_mod=kpu)
+        obj_rt = objects.ObjectRuntime(kpu_mod=kpu)
+        obj_rt._task = object()
+        obj_rt._source = "sd"
+        obj_rt.ensure_loaded = lambda: None
+        obj_rt._input_w, obj_rt._input_h = 320, 240
+
+        face_rt.recognize_frame(ctx)
+        obj_rt.detect_frame(ctx)
+        self.assertEqual(kpu.inputs, [img, img])
+        self.assertEqual(img.ops, [("ai", 320, 240)])
+        self.assertEqual(counters["saved"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@ import json
 import unittest
 from unittest import mock
 
+import codec
 import config
 import main
 from vision import VisionError
@@ -16,10 +17,37 @@ class FakeUART:
         return len(data)
 
 
+class FakeRxUART(FakeUART):
+    """FakeUART with an RX FIFO that tests can feed between frames."""
+
+    def __init__(self):
+        super().__init__()
+        self.rx = bytearray()
+
+    def any(self):
+        return len(self.rx)
+
+    def readinto(self, buf):
+        n = min(len(buf), len(self.rx))
+        buf[:n] = self.rx[:n]
+        del self.rx[:n]
+        return n
+
+
+class FakeBaudUART(FakeUART):
+    def __init__(self):
+        super().__init__()
+        self.inits = []
+
+    def init(self, baud, **kwargs):
+        self.inits.append(baud)
+
+
 class FakeVision:
     def __init__(self):
         self.calls = []
         self.recover_called = 0
+        self.recover_reasons = []
 
     def info(self):
         self.calls.append(("INFO", None))
@@ -37,7 +65,22 @@ class FakeVision:
         self.calls.append(("OBJECTS", args))
         return {"objects": [], "frames": 1, "truncated": False}
 
-    def learn(self, args, deadline_ms):
+    # Runtime drives the *_steps generators; one frame boundary, then the result.
+    def scan_steps(self, args, deadline_ms):
+        yield None
+        yield self.scan(args, deadline_ms)
+
+    def who_steps(self, args, deadline_ms):
+        yield None
+        yield self.who(args, deadline_ms)
+
+    def objects_steps(self, args, deadline_ms):
+        yield None
+        yield self.objects(args, deadline_ms)
+
+    def learn(self, args, deadline_ms, between_frames=None):
+        if between_frames is not None:
+            between_frames()
         self.calls.append(("LEARN", args))
         return {"status": "learned", "person": "OWNER_1"}
 
@@ -45,12 +88,27 @@ class FakeVision:
         self.calls.append(("RESET_FACES", None))
         return {"status": "reset"}
 
+    def list_faces(self):
+        self.calls.append(("LIST_FACES", None))
+        return {"persons": {"ALICE": 2}, "templates": 2}
+
+    def delete_face(self, args):
+        self.calls.append(("DELETE_FACE", args))
+        return {"status": "deleted", "person": "ALICE", "templates": 2}
+
     def set_debug(self, enabled):
         self.calls.append(("DEBUG", enabled))
         return {"debug": bool(enabled)}
 
-    def recover(self):
+    def recover(self, reason=None):
         self.recover_called += 1
+        self.recover_reasons.append(reason)
+
+    def recovery_stats(self):
+        return {"camera": 0, "face": 0, "objects": 0, "other": 0, "full": 0}
+
+    def template_stats(self):
+        return {"loaded": 2, "failed": 0}
 
 
 class RuntimeTests(unittest.TestCase):
@@ -71,6 +129,158 @@ class RuntimeTests(unittest.TestCase):
         self.assertTrue(data["ok"])
         self.assertEqual(data["result"]["status"], "ok")
 
+    def test_info_template_matches_vision_info(self):
+        rt, uart = self._new_runtime()
+        rt._vision.info = lambda: {"tool": "vision_k210", "capabilities": {"faces": True, "sd": False}}
+        rt._handle_line(b'{"cmd":"INFO","req_id":"i1"}')
+        data = self._last_json(uart)
+        self.assertEqual(
+            data["result"],
+            {"tool": "vision_k210", "capabilities": {"faces": True, "sd": False}, "framings": ["jsonl", "mpk"]},
+        )
+        self.assertIn("INFO", rt._templates)
+
+    def test_scan_with_unexpected_key_uses_generic_encoder(self):
+        rt, uart = self._new_runtime()
+        rt._vision.scan = lambda _args, _deadline: {"person": "NONE", "frames": 1, "new_field": 2}
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"g1","args":{}}')
+        data = self._last_json(uart)
+        self.assertTrue(data["ok"])
+        self.assertEqual(data["result"]["new_field"], 2)
+
+    def test_proto_switches_framing_after_reply(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"PROTO","req_id":"p1","args":{"framing":"mpk"}}')
+        data = self._last_json(uart)
+        self.assertEqual(data["result"]["framing"], "mpk")
+
+        rt._handle_line(b'{"cmd":"PING","req_id":"p2"}')
+        payload, used = codec.decode_frame(uart.writes[-1])
+        self.assertEqual(used, len(uart.writes[-1]))
+        self.assertEqual(payload["req_id"], "p2")
+        self.assertEqual(payload["result"]["tool"], config.TOOL_NAME)
+
+        rt._handle_line(b'{"cmd":"PROTO","req_id":"p3","args":{"framing":"jsonl"}}')
+        self.assertTrue(codec.is_frame(uart.writes[-1]))
+        rt._handle_line(b'{"cmd":"PING","req_id":"p4"}')
+        self.assertEqual(self._last_json(uart)["req_id"], "p4")
+
+    def test_proto_rejects_unknown_framing(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"PROTO","req_id":"p5","args":{"framing":"cbor"}}')
+        data = self._last_json(uart)
+        self.assertEqual(data["error"]["code"], "BAD_REQUEST")
+        self.assertEqual(rt._framing, "jsonl")
+
+    def test_batch_shares_frames_between_who_and_objects(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(
+            b'{"cmd":"BATCH","req_id":"bt1","args":{"cmds":['
+            b'{"cmd":"WHO","args":{"frames":2}},{"cmd":"OBJECTS","args":{"frames":1}},"INFO"]}}'
+        )
+        data = self._last_json(uart)
+        self.assertTrue(data["ok"])
+        results = data["result"]["results"]
+        self.assertEqual([r["cmd"] for r in results], ["WHO", "OBJECTS", "INFO"])
+        self.assertTrue(all(r["ok"] for r in results))
+        self.assertEqual(results[0]["result"], {"person": "NONE", "frames": 1})
+        self.assertEqual(results[1]["result"], {"objects": [], "frames": 1, "truncated": False})
+        vision_calls = [c for c in rt._vision.calls if c[0] != "INFO"]
+        self.assertEqual(vision_calls, [("SCAN", {"frames": 2, "allow_partial": False})])
+        self.assertLessEqual(len(uart.writes[-1]), config.MAX_JSON_BYTES + 1)
+
+    def test_batch_all_faces_only_where_requested(self):
+        rt, uart = self._new_runtime()
+
+        def scan(args, _deadline):
+            rt._vision.calls.append(("SCAN", args))
+            return {"person": "ALICE", "objects": [], "frames": 1, "truncated": False, "faces_detected": 2,
+                    "faces": [{"person": "ALICE", "conf": 0.9, "bbox": [0, 0, 40, 40]}]}
+
+        rt._vision.scan = scan
+        rt._handle_line(
+            b'{"cmd":"BATCH","req_id":"bt3","args":{"cmds":['
+            b'{"cmd":"WHO","args":{"all_faces":true}},{"cmd":"SCAN"}]}}'
+        )
+        results = self._last_json(uart)["result"]["results"]
+        self.assertEqual(results[0]["result"]["faces"][0]["person"], "ALICE")
+        self.assertNotIn("faces", results[1]["result"])
+        scans = [c for c in rt._vision.calls if c[0] == "SCAN"]
+        self.assertEqual(scans, [("SCAN", {"frames": 3, "allow_partial": False, "all_faces": True})])
+
+    def test_worst_case_batch_sheds_inside_sub_results(self):
+        rt, uart = self._new_runtime()
+        pid = "X" * config.GALLERY_MAX_ID_LEN
+        faces_list = [{"person": pid, "conf": 0.95, "bbox": [319, 239, 320, 240]}] * config.MULTI_FACE_MAX
+        labels = list(config.SUPPORTED_OBJECTS)
+
+        def scan(args, _deadline):
+            return {"person": pid, "faces_detected": 9, "objects": labels, "frames": 5, "frames_used": 3,
+                    "truncated": False, "confidence": {"person": 0.95}, "faces": faces_list, "age_ms": 1234,
+                    "debug": {"elapsed_ms": 1}}
+
+        rt._vision.scan = scan
+        for i in range(8):
+            rt._rx_latency.add(123456 + i)
+        rt._handle_line(
+            b'{"cmd":"BATCH","req_id":"' + b"b" * 16 + b'","args":{"cmds":['
+            b'{"cmd":"SCAN","args":{"all_faces":true}},{"cmd":"WHO","args":{"all_faces":true}},'
+            b'{"cmd":"OBJECTS"},"STATS"]}}'
+        )
+        self.assertLessEqual(len(uart.writes[-1]), config.MAX_JSON_BYTES + 1)
+        data = self._last_json(uart)
+        self.assertTrue(data["ok"])
+        results = data["result"]["results"]
+        self.assertEqual([r["cmd"] for r in results], ["SCAN", "WHO", "OBJECTS", "STATS"])
+        self.assertTrue(all(r["ok"] for r in results))
+        self.assertTrue(results[0]["result"]["truncated"])
+        self.assertEqual(results[0]["result"]["person"], pid)
+        self.assertIn("reader", results[3]["result"])
+
+    def test_batch_reports_per_subcommand_errors(self):
+        rt, uart = self._new_runtime()
+
+        def boom(_args, _deadline):
+            raise VisionError("VISION_FAILED", "objects_detect")
+
+        rt._vision.objects = boom
+        rt._handle_line(
+            b'{"cmd":"BATCH","req_id":"bt2","args":{"cmds":["PING","OBJECTS","LEARN"]}}'
+        )
+        results = self._last_json(uart)["result"]["results"]
+        self.assertTrue(results[0]["ok"])
+        self.assertEqual(results[1]["error"]["code"], "VISION_FAILED")
+        self.assertEqual(results[2]["error"]["code"], "BAD_REQUEST")
+        self.assertEqual(rt._vision.recover_called, 1)
+
+    def test_batch_who_survives_objects_failure_of_shared_scan(self):
+        rt, uart = self._new_runtime()
+
+        def scan(_args, _deadline):
+            raise VisionError("VISION_FAILED", "objects_detect")
+
+        rt._vision.scan = scan
+        rt._handle_line(b'{"cmd":"BATCH","req_id":"bt4","args":{"cmds":["WHO","OBJECTS","INFO"]}}')
+        results = self._last_json(uart)["result"]["results"]
+        self.assertEqual(results[0], {"cmd": "WHO", "ok": True, "result": {"person": "NONE", "frames": 1}})
+        self.assertEqual(results[1]["error"], {"code": "VISION_FAILED", "message": "objects_detect"})
+        self.assertTrue(results[2]["ok"])
+        self.assertEqual(rt._vision.recover_reasons, ["objects_detect"])
+
+    def test_batch_skips_past_deadline_without_recover(self):
+        rt, uart = self._new_runtime()
+        with mock.patch.object(config, "COMMAND_TIMEOUT_MS", -1):
+            rt._handle_line(b'{"cmd":"BATCH","req_id":"bt5","args":{"cmds":["PING","OBJECTS"]}}')
+        results = self._last_json(uart)["result"]["results"]
+        self.assertEqual([r["error"]["code"] for r in results], ["TIMEOUT", "TIMEOUT"])
+        self.assertEqual(rt._vision.recover_called, 0)
+
+    def test_batch_rejects_too_many_subcommands(self):
+        rt, uart = self._new_runtime()
+        cmds = ",".join(['"PING"'] * (config.MAX_BATCH_CMDS + 1))
+        rt._handle_line(('{"cmd":"BATCH","req_id":"bt3","args":{"cmds":[%s]}}' % cmds).encode("utf-8"))
+        self.assertEqual(self._last_json(uart)["error"]["code"], "BAD_REQUEST")
+
     def test_dedup_returns_byte_identical_response(self):
         rt, uart = self._new_runtime()
         line = b'{"cmd":"PING","req_id":"same"}'
@@ -97,11 +307,172 @@ class RuntimeTests(unittest.TestCase):
     def test_busy_returns_busy(self):
         rt, uart = self._new_runtime()
         rt._processing = True
-        rt._handle_line(b'{"cmd":"PING","req_id":"3"}')
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"3"}')
         data = self._last_json(uart)
         self.assertFalse(data["ok"])
         self.assertEqual(data["error"]["code"], "BUSY")
 
+    def test_busy_is_not_replayed_after_job_finishes(self):
+        rt, uart = self._new_runtime()
+        rt._processing = True
+        rt._dedup.begin("running")
+        rt._handle_line(b'{"cmd":"WHO","req_id":"other"}')
+        self.assertEqual(self._last_json(uart)["error"]["code"], "BUSY")
+        rt._processing = False
+        rt._dedup.finish("running", None, main._ticks_ms())
+        rt._handle_line(b'{"cmd":"WHO","req_id":"other"}')
+        self.assertTrue(self._last_json(uart)["ok"])
+
+    def test_duplicate_of_running_request_attaches(self):
+        rt, uart = self._new_runtime()
+        seen = []
+
+        def scan(_args, _deadline):
+            # A retry of the same req_id arrives while the scan is running.
+            rt._handle_line(b'{"cmd":"SCAN","req_id":"dup","args":{}}')
+            seen.append(len(uart.writes))
+            return {"person": "NONE", "objects": [], "frames": 1, "truncated": False, "faces_detected": 0}
+
+        rt._vision.scan = scan
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"dup","args":{}}')
+        self.assertEqual(seen, [0])
+        self.assertEqual(len(uart.writes), 1)
+        self.assertTrue(self._last_json(uart)["ok"])
+        self.assertEqual(rt._dedup.stats()["attached"], 1)
+
+    def test_control_commands_answered_between_frames(self):
+        uart = FakeRxUART()
+        rt = main.Runtime(uart)
+        rt._reader = main.protocol.LineReader(uart, wait_mode="any")
+        rt._vision = FakeVision()
+
+        def scan(_args, _deadline):
+            return {"person": "NONE", "objects": [], "frames": 1, "truncated": False, "faces_detected": 0}
+
+        def scan_steps(args, deadline_ms):
+            # Heartbeat and a competing heavy command arrive mid-scan.
+            uart.rx.extend(b'{"cmd":"PING","req_id":"hb"}\n{"cmd":"WHO","req_id":"w"}\n')
+            yield None
+            yield scan(args, deadline_ms)
+
+        rt._vision.scan_steps = scan_steps
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"s","args":{}}')
+        replies = [json.loads(raw.decode("utf-8")) for raw in uart.writes]
+        self.assertEqual([r["req_id"] for r in replies], ["hb", "w", "s"])
+        self.assertTrue(replies[0]["ok"])
+        self.assertEqual(replies[1]["error"]["code"], "BUSY")
+        self.assertTrue(replies[2]["ok"])
+        self.assertEqual(rt.stats()["interleaved"], 1)
+
+    def _runtime_with_rx(self):
+        uart = FakeRxUART()
+        rt = main.Runtime(uart)
+        rt._reader = main.protocol.LineReader(uart, wait_mode="any")
+        rt._vision = FakeVision()
+        return rt, uart
+
+    def _feed_during_scan(self, rt, uart, data):
+        scan = rt._vision.scan
+
+        def scan_steps(args, deadline_ms):
+            uart.rx.extend(data)
+            yield None
+            yield scan(args, deadline_ms)
+
+        rt._vision.scan_steps = scan_steps
+
+    def test_cancel_aborts_running_scan_without_recover(self):
+        rt, uart = self._runtime_with_rx()
+        self._feed_during_scan(rt, uart, b'{"cmd":"CANCEL","req_id":"c","args":{"target_req_id":"s"}}\n')
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"s","args":{}}')
+        replies = [json.loads(raw.decode("utf-8")) for raw in uart.writes]
+        self.assertEqual(replies[0]["result"], {"target_req_id": "s", "cancelled": True})
+        self.assertEqual(replies[1]["req_id"], "s")
+        self.assertEqual(replies[1]["error"]["code"], "CANCELLED")
+        self.assertEqual(rt._vision.recover_called, 0)
+        self.assertNotIn(("SCAN", {}), rt._vision.calls)
+
+    def test_ping_is_answered_between_learn_frames(self):
+        rt, uart = self._runtime_with_rx()
+        uart.rx.extend(b'{"cmd":"PING","req_id":"p","args":{}}\n')
+        rt._handle_line(b'{"cmd":"LEARN","req_id":"l","args":{"person":"OWNER_1"}}')
+        replies = [json.loads(raw.decode("utf-8")) for raw in uart.writes]
+        self.assertEqual([r["req_id"] for r in replies], ["p", "l"])
+        self.assertTrue(replies[0]["ok"])
+        self.assertEqual(replies[1]["result"]["status"], "learned")
+
+    def test_cancel_aborts_learn_before_it_saves(self):
+        rt, uart = self._runtime_with_rx()
+        uart.rx.extend(b'{"cmd":"CANCEL","req_id":"c","args":{"target_req_id":"l"}}\n')
+        rt._handle_line(b'{"cmd":"LEARN","req_id":"l","args":{"person":"OWNER_1"}}')
+        replies = [json.loads(raw.decode("utf-8")) for raw in uart.writes]
+        self.assertEqual(replies[1]["error"]["code"], "CANCELLED")
+        self.assertNotIn(("LEARN", {"person": "OWNER_1"}), rt._vision.calls)
+        self.assertEqual(rt._vision.recover_called, 0)
+
+    def test_cancel_without_running_target(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"CANCEL","req_id":"c","args":{"target_req_id":"gone"}}')
+        self.assertEqual(self._last_json(uart)["result"], {"target_req_id": "gone", "cancelled": False})
+
+    def test_preempt_cancels_running_request_then_runs(self):
+        rt, uart = self._runtime_with_rx()
+        self._feed_during_scan(rt, uart, b'{"cmd":"WHO","req_id":"w","args":{"preempt":true}}\n')
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"s","args":{}}')
+        replies = [json.loads(raw.decode("utf-8")) for raw in uart.writes]
+        self.assertEqual([r["req_id"] for r in replies], ["s", "w"])
+        self.assertEqual(replies[0]["error"], {"code": "CANCELLED", "message": "preempted"})
+        self.assertTrue(replies[1]["ok"])
+        self.assertEqual(rt._vision.recover_called, 0)
+
+    def test_retry_of_queued_preempting_request_gets_one_reply(self):
+        rt, uart = self._runtime_with_rx()
+        self._feed_during_scan(
+            rt, uart,
+            b'{"cmd":"WHO","req_id":"w","args":{"preempt":true}}\n'
+            b'{"cmd":"WHO","req_id":"w","args":{"preempt":true}}\n'
+            b'{"cmd":"WHO","req_id":"w","args":{}}\n',
+        )
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"s","args":{}}')
+        replies = [json.loads(raw.decode("utf-8")) for raw in uart.writes]
+        self.assertEqual([r["req_id"] for r in replies], ["s", "w"])
+        self.assertTrue(replies[1]["ok"])
+        self.assertEqual(rt._dedup.attached, 2)
+
+    def test_cancel_targets_queued_preempting_request(self):
+        rt, uart = self._runtime_with_rx()
+        self._feed_during_scan(
+            rt, uart,
+            b'{"cmd":"WHO","req_id":"w","args":{"preempt":true}}\n'
+            b'{"cmd":"CANCEL","req_id":"c","args":{"target_req_id":"w"}}\n',
+        )
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"s","args":{}}')
+        replies = [json.loads(raw.decode("utf-8")) for raw in uart.writes]
+        self.assertEqual([r["req_id"] for r in replies], ["w", "c", "s"])
+        self.assertEqual(replies[0]["error"], {"code": "CANCELLED", "message": "cancelled"})
+        self.assertEqual(replies[1]["result"], {"target_req_id": "w", "cancelled": True})
+        # Nothing left to make room for: the running SCAN completes.
+        self.assertTrue(replies[2]["ok"])
+        self.assertEqual([c[0] for c in rt._vision.calls if c[0] != "INFO"], ["SCAN"])
+
+    def test_interleaved_control_error_keeps_its_code(self):
+        rt, uart = self._runtime_with_rx()
+        self._feed_during_scan(rt, uart, b'{"cmd":"CANCEL","req_id":"c","args":{}}\n')
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"s","args":{}}')
+        replies = [json.loads(raw.decode("utf-8")) for raw in uart.writes]
+        self.assertEqual([r["req_id"] for r in replies], ["c", "s"])
+        self.assertEqual(replies[0]["error"], {"code": "BAD_REQUEST", "message": "missing_target"})
+        self.assertTrue(replies[1]["ok"])
+
+    def test_preempt_flag_accepts_string_booleans(self):
+        rt, uart = self._runtime_with_rx()
+        self._feed_during_scan(rt, uart, b'{"cmd":"WHO","req_id":"w","args":{"preempt":"1"}}\n')
+        rt._handle_line(b'{"cmd":"SCAN","req_id":"s","args":{}}')
+        replies = [json.loads(raw.decode("utf-8")) for raw in uart.writes]
+        self.assertEqual([r["req_id"] for r in replies], ["s", "w"])
+        self.assertEqual(replies[0]["error"]["code"], "CANCELLED")
+        self.assertTrue(replies[1]["ok"])
+
     def test_vision_error_triggers_recover(self):
         rt, uart = self._new_runtime()
 
@@ -113,7 +484,7 @@ class RuntimeTests(unittest.TestCase):
         data = self._last_json(uart)
         self.assertFalse(data["ok"])
         self.assertEqual(data["error"]["code"], "VISION_FAILED")
-        self.assertEqual(rt._vision.recover_called, 1)
+        self.assertEqual(rt._vision.recover_reasons, ["x"])
 
     def test_missing_req_id(self):
         rt, uart = self._new_runtime()
@@ -122,6 +493,17 @@ class RuntimeTests(unittest.TestCase):
         self.assertFalse(data["ok"])
         self.assertEqual(data["error"]["code"], "BAD_REQUEST")
 
+    def test_gallery_commands_dispatch(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"ENROLL","req_id":"e","args":{"person":"alice"}}')
+        rt._handle_line(b'{"cmd":"LIST_FACES","req_id":"l"}')
+        self.assertEqual(self._last_json(uart)["result"]["persons"], {"ALICE": 2})
+        rt._handle_line(b'{"cmd":"DELETE_FACE","req_id":"d","args":{"person":"alice"}}')
+        self.assertEqual(self._last_json(uart)["result"]["status"], "deleted")
+        self.assertEqual(
+            [c[0] for c in rt._vision.calls if c[0] != "INFO"], ["LEARN", "LIST_FACES", "DELETE_FACE"]
+        )
+
     def test_debug_dispatch(self):
         rt, uart = self._new_runtime()
         rt._handle_line(b'{"cmd":"DEBUG","req_id":"d","args":{"enabled":true}}')
@@ -142,6 +524,76 @@ class RuntimeTests(unittest.TestCase):
         self.assertEqual(data["error"]["code"], "TIMEOUT")
         self.assertEqual(rt._vision.recover_called, 1)
 
+    def test_stats_reports_rx_to_dispatch_latency(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"PING","req_id":"s1"}', rx_us=main._ticks_us() - 1500)
+        rt._handle_line(b'{"cmd":"STATS","req_id":"s2"}')
+        data = self._last_json(uart)
+        self.assertTrue(data["ok"])
+        lat = data["result"]["rx_dispatch_us"]
+        self.assertEqual(lat["n"], 1)
+        self.assertGreaterEqual(lat["max"], 1500)
+
+    def test_stats_reports_templates_only_when_some_failed(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"STATS","req_id":"s1"}')
+        self.assertNotIn("templates", self._last_json(uart)["result"])
+        rt._vision.template_stats = lambda: {"loaded": 1, "failed": 2, "error": "face_embed"}
+        rt._handle_line(b'{"cmd":"STATS","req_id":"s2"}')
+        self.assertEqual(self._last_json(uart)["result"]["templates"], {"loaded": 1, "failed": 2, "error": "face_embed"})
+
+
+class SetBaudTests(unittest.TestCase):
+    def _new_runtime(self):
+        uart = FakeBaudUART()
+        rt = main.Runtime(uart)
+        rt._vision = FakeVision()
+        return rt, uart
+
+    def test_set_baud_replies_at_old_rate_then_switches(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"SET_BAUD","req_id":"b1","args":{"baud":921600}}')
+        data = json.loads(uart.writes[-1].decode("utf-8"))
+        self.assertTrue(data["ok"])
+        self.assertEqual(data["result"]["baud"], 921600)
+        self.assertEqual(uart.inits, [921600])
+        self.assertEqual(rt._baud, 921600)
+
+    def test_unconfirmed_switch_reverts(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"SET_BAUD","req_id":"b2","args":{"baud":460800}}')
+        rt.poll_baud_confirm(now=main._ticks_ms() + 10)
+        self.assertEqual(rt._baud, 460800)
+        rt.poll_baud_confirm(now=main._ticks_ms() + config.UART_BAUD_CONFIRM_MS + 100)
+        self.assertEqual(uart.inits, [460800, config.UART_BAUD])
+        self.assertEqual(rt._baud, config.UART_BAUD)
+        self.assertIsNone(rt._baud_pending)
+
+    def test_confirm_ping_persists_rate(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"SET_BAUD","req_id":"b3","args":{"baud":921600}}')
+        with mock.patch("storage.read_config", return_value={"other": 1}), mock.patch(
+            "storage.write_config", return_value=True
+        ) as write:
+            rt._handle_line(b'{"cmd":"PING","req_id":"b4"}')
+        write.assert_called_once_with({"other": 1, config.UART_BAUD_CONFIG_KEY: 921600})
+        self.assertIsNone(rt._baud_pending)
+        rt.poll_baud_confirm(now=main._ticks_ms() + config.UART_BAUD_CONFIRM_MS + 100)
+        self.assertEqual(rt._baud, 921600)
+
+    def test_rejects_unsupported_rate(self):
+        rt, uart = self._new_runtime()
+        rt._handle_line(b'{"cmd":"SET_BAUD","req_id":"b5","args":{"baud":12345}}')
+        data = json.loads(uart.writes[-1].decode("utf-8"))
+        self.assertEqual(data["error"]["code"], "BAD_REQUEST")
+        self.assertEqual(uart.inits, [])
+
+    def test_configured_baud_reads_sd_config(self):
+        with mock.patch("storage.read_config", return_value={config.UART_BAUD_CONFIG_KEY: 921600}):
+            self.assertEqual(main._configured_baud(), 921600)
+        with mock.patch("storage.read_config", return_value={config.UART_BAUD_CONFIG_KEY: 7}):
+            self.assertEqual(main._configured_baud(), config.UART_BAUD)
+
 
 class DedupCacheTests(unittest.TestCase):
     def test_ttl_expiry(self):
@@ -150,6 +602,44 @@ class DedupCacheTests(unittest.TestCase):
         self.assertEqual(cache.get("x", now=5), b"abc")
         self.assertIsNone(cache.get("x", now=11))
 
+    def test_expiry_from_head_keeps_newer_entries(self):
+        cache = main.DedupCache(ttl_ms=10)
+        cache.set("a", b"1", now=0)
+        cache.set("b", b"2", now=6)
+        self.assertIsNone(cache.get("a", now=12))
+        self.assertEqual(cache.get("b", now=12), b"2")
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_entry_cap_evicts_least_recently_used(self):
+        cache = main.DedupCache(ttl_ms=1000, max_entries=2, max_bytes=1000)
+        cache.set("a", b"1", now=0)
+        cache.set("b", b"2", now=1)
+        self.assertEqual(cache.get("a", now=2), b"1")
+        cache.set("c", b"3", now=3)
+        self.assertIsNone(cache.get("b", now=4))
+        self.assertEqual(cache.get("a", now=4), b"1")
+        self.assertEqual(cache.get("c", now=4), b"3")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_byte_budget(self):
+        cache = main.DedupCache(ttl_ms=1000, max_entries=100, max_bytes=10)
+        cache.set("a", b"12345", now=0)
+        cache.set("b", b"12345", now=1)
+        cache.set("c", b"123", now=2)
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 10)
+        self.assertIsNone(cache.get("a", now=3))
+        cache.set("huge", b"x" * 11, now=4)
+        self.assertIsNone(cache.get("huge", now=5))
+
+    def test_overwrite_same_req_id(self):
+        cache = main.DedupCache(ttl_ms=1000)
+        cache.set("a", b"old", now=0)
+        cache.set("a", b"newer", now=1)
+        self.assertEqual(cache.get("a", now=2), b"newer")
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["bytes"], 5)
+
 
 class BuildUartTests(unittest.TestCase):
     def test_build_uart_fallback(self):
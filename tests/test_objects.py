@@ -1,3 +1,4 @@
+import json
 import unittest
 from unittest import mock
 import tempfile
@@ -40,6 +41,36 @@ class FakeKPU:
         return None
 
 
+class SizedFrame:
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+
+    def width(self):
+        return self.w
+
+    def height(self):
+        return self.h
+
+    def resize(self, w, h):
+        return SizedFrame(w, h)
+
+
+class SizedKPU(FakeKPU):
+    """Rejects frames that do not match the model input, like MaixPy's run_yolo2."""
+
+    def __init__(self, w, h):
+        super().__init__(detections=[FakeDet(0)])
+        self.model = (w, h)
+        self.runs = []
+
+    def run_yolo2(self, _task, frame):
+        self.runs.append((frame.w, frame.h))
+        if (frame.w, frame.h) != self.model:
+            raise RuntimeError("kpu: img w=%d,h=%d, but model w=%d,h=%d" % (frame.w, frame.h, self.model[0], self.model[1]))
+        return self.detections
+
+
 class ObjectRuntimeTests(unittest.TestCase):
     def test_model_missing(self):
         rt = objects.ObjectRuntime(kpu_mod=FakeKPU())
@@ -108,6 +139,54 @@ class ObjectRuntimeTests(unittest.TestCase):
                 names = rt._load_class_names()
         self.assertEqual(names, ["apple", "banana", "orange"])
 
+    def _sd_patches(self, saved):
+        def write_config(data):
+            saved.clear()
+            saved.update(json.loads(json.dumps(data)))
+            return True
+
+        return [
+            mock.patch("storage.sd_available", return_value=True),
+            mock.patch("storage.ensure_sd_layout", return_value=True),
+            mock.patch("objects._os.stat", return_value=(0, 0, 0, 0, 0, 0, 1234)),
+            mock.patch("storage.read_config", side_effect=lambda default=None: json.loads(json.dumps(saved))),
+            mock.patch("storage.write_config", side_effect=write_config),
+        ]
+
+    def test_learned_dims_become_fast_path_and_persist(self):
+        saved = {}
+        kpu = SizedKPU(224, 224)
+        rt = objects.ObjectRuntime(kpu_mod=kpu)
+        patches = self._sd_patches(saved)
+        for p in patches:
+            p.start()
+        try:
+            rt.detect_frame(SizedFrame(320, 240))
+            rt.detect_frame(SizedFrame(320, 240))
+        finally:
+            for p in patches:
+                p.stop()
+        # One failed full-frame call to discover the size, then resize first.
+        self.assertEqual(kpu.runs, [(320, 240), (224, 224), (224, 224)])
+        key = config.OBJECT_MODEL_SD_PATH + ":1234"
+        self.assertEqual(saved[config.OBJECT_MODEL_DIMS_CONFIG_KEY], {key: [224, 224]})
+
+    def test_saved_dims_skip_discovery_after_boot(self):
+        key = config.OBJECT_MODEL_SD_PATH + ":1234"
+        saved = {config.OBJECT_MODEL_DIMS_CONFIG_KEY: {key: [224, 224]}}
+        kpu = SizedKPU(224, 224)
+        rt = objects.ObjectRuntime(kpu_mod=kpu)
+        patches = self._sd_patches(saved)
+        for p in patches:
+            p.start()
+        try:
+            labels = rt.detect_frame(SizedFrame(320, 240))
+        finally:
+            for p in patches:
+                p.stop()
+        self.assertEqual(labels, ["door"])
+        self.assertEqual(kpu.runs, [(224, 224)])
+
 
 if __name__ == "__main__":
     unittest.main()
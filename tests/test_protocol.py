@@ -1,5 +1,6 @@
 import json
 import unittest
+from unittest import mock
 
 import config
 import protocol
@@ -14,6 +15,36 @@ class FakeUART:
         return len(data)
 
 
+class FakeStreamUART:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def readinto(self, buf):
+        if not self.chunks:
+            return None
+        chunk = self.chunks.pop(0)
+        n = min(len(chunk), len(buf))
+        buf[:n] = chunk[:n]
+        if n < len(chunk):
+            self.chunks.insert(0, chunk[n:])
+        return n
+
+
+class FakeFifoUART(FakeStreamUART):
+    def __init__(self, chunks):
+        super().__init__(chunks)
+        self.reads = 0
+
+    def any(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def readinto(self, buf):
+        self.reads += 1
+        if not self.chunks:
+            raise AssertionError("readinto called on empty FIFO")
+        return super().readinto(buf)
+
+
 class ProtocolTests(unittest.TestCase):
     def test_parse_json_line_success(self):
         payload, err = protocol.parse_json_line(b'{"cmd":"PING","req_id":"1"}')
@@ -34,6 +65,57 @@ class ProtocolTests(unittest.TestCase):
         self.assertFalse(decoded["ok"])
         self.assertEqual(decoded["error"]["code"], "BAD_REQUEST")
 
+    def test_safe_json_encode_matches_compact_json(self):
+        payload = {
+            "req_id": 7,
+            "ok": True,
+            "result": {"person": "OWNER_1", "objects": ["door", "cup"], "confidence": {"person": 0.91}, "x": None},
+        }
+        raw = protocol.safe_json_encode(payload)
+        self.assertEqual(json.loads(raw.decode("utf-8")), payload)
+        self.assertNotIn(b" ", raw)
+
+    def test_safe_json_encode_sheds_fields_instead_of_failing(self):
+        result = {
+            "person": "OWNER_1",
+            "faces_detected": 1,
+            "objects": ["label_%03d" % i for i in range(60)],
+            "confidence": {"person": 0.91},
+            "frames": 3,
+            "truncated": False,
+            "debug": {"elapsed_ms": 4200, "note": "d" * 200},
+        }
+        raw = protocol.safe_json_encode({"req_id": "s", "ok": True, "result": result})
+        self.assertLessEqual(len(raw), config.MAX_JSON_BYTES)
+        decoded = json.loads(raw.decode("utf-8"))
+        self.assertTrue(decoded["ok"])
+        self.assertTrue(decoded["result"]["truncated"])
+        self.assertNotIn("debug", decoded["result"])
+        self.assertEqual(decoded["result"]["person"], "OWNER_1")
+        self.assertEqual(decoded["result"]["objects"], result["objects"][:len(decoded["result"]["objects"])])
+        self.assertFalse(result["truncated"])
+
+    def test_batch_drops_unsheddable_sub_result_last_first(self):
+        results = [
+            {"cmd": "SCAN", "ok": True, "result": {"person": "OWNER_1", "objects": ["door"], "truncated": False}},
+            {"cmd": "STATS", "ok": True, "result": {"blob": "s" * 900}},
+        ]
+        raw = protocol.safe_json_encode({"req_id": "b", "ok": True, "result": {"results": results}})
+        self.assertLessEqual(len(raw), config.MAX_JSON_BYTES)
+        decoded = json.loads(raw.decode("utf-8"))
+        self.assertTrue(decoded["ok"])
+        scan, stats = decoded["result"]["results"]
+        self.assertEqual(scan, results[0])
+        self.assertEqual(stats, {"cmd": "STATS", "ok": False, "error": {"code": "BAD_REQUEST", "message": "too_long"}})
+        self.assertTrue(results[1]["ok"])
+
+    def test_uart_writeline_allows_full_budget_plus_newline(self):
+        uart = FakeUART()
+        body = b'{"x":"' + b"a" * (config.MAX_JSON_BYTES - 8) + b'"}'
+        self.assertEqual(len(body), config.MAX_JSON_BYTES)
+        protocol.uart_writeline(uart, body)
+        self.assertEqual(uart.writes[0], body + b"\n")
+
     def test_uart_writeline_adds_newline(self):
         uart = FakeUART()
         ok = protocol.uart_writeline(uart, {"req_id": "1", "ok": True, "result": {"x": 1}})
@@ -42,5 +124,165 @@ class ProtocolTests(unittest.TestCase):
         self.assertTrue(uart.writes[0].endswith(b"\n"))
 
 
+    def test_parse_json_line_accepts_memoryview(self):
+        payload, err = protocol.parse_json_line(memoryview(b'{"cmd":"PING","req_id":"1"}'))
+        self.assertIsNone(err)
+        self.assertEqual(payload["cmd"], "PING")
+
+
+class ResponseTemplateTests(unittest.TestCase):
+    def _generic(self, req_id, result):
+        return json.loads(protocol.safe_json_encode({"req_id": req_id, "ok": True, "result": result}))
+
+    def test_constant_template_splices_req_id(self):
+        tpl = protocol.ResponseTemplate({"status": "ok", "tool": config.TOOL_NAME})
+        raw = tpl.render("hb-1", {"status": "ok", "tool": config.TOOL_NAME})
+        self.assertEqual(json.loads(raw), self._generic("hb-1", {"status": "ok", "tool": config.TOOL_NAME}))
+
+    def test_nested_and_optional_slots(self):
+        tpl = protocol.ResponseTemplate({
+            "person": protocol.Slot(),
+            "caps": {"faces": True, "sd": protocol.Slot()},
+            "confidence": protocol.Slot(optional=True),
+        })
+        with_conf = {"person": "OWNER_1", "caps": {"faces": True, "sd": False}, "confidence": {"person": 0.9}}
+        without = {"person": "NONE", "caps": {"faces": True, "sd": True}}
+        self.assertEqual(json.loads(tpl.render(5, with_conf)), self._generic(5, with_conf))
+        self.assertEqual(json.loads(tpl.render(6, without)), self._generic(6, without))
+
+    def test_shape_mismatch_returns_none(self):
+        tpl = protocol.ResponseTemplate({"person": protocol.Slot()})
+        self.assertIsNone(tpl.render("x", {"person": "NONE", "extra": 1}))
+        self.assertIsNone(tpl.render("x", {}))
+
+    def test_nested_constant_or_key_mismatch_returns_none(self):
+        tpl = protocol.ResponseTemplate({"tool": "a", "caps": {"faces": True, "sd": protocol.Slot()}})
+        self.assertIsNone(tpl.render("1", {"tool": "b", "caps": {"faces": True, "sd": True}}))
+        self.assertIsNone(tpl.render("1", {"tool": "a", "caps": {"faces": False, "sd": True}}))
+        self.assertIsNone(tpl.render("1", {"tool": "a", "caps": {"faces": True, "sd": True, "extra": 1}}))
+        self.assertIsNone(tpl.render("1", {"tool": "a", "caps": {"faces": 1, "sd": True}}))
+        self.assertIsNone(tpl.render("1", {"tool": "a", "caps": {"sd": True}}))
+        self.assertIsNotNone(tpl.render("1", {"tool": "a", "caps": {"faces": True, "sd": True}}))
+
+    def test_overflow_returns_none(self):
+        tpl = protocol.ResponseTemplate({"objects": protocol.Slot()})
+        self.assertIsNone(tpl.render("x", {"objects": ["a" * 100] * 10}))
+
+
+class LineReaderTests(unittest.TestCase):
+    def test_multiple_lines_in_one_chunk(self):
+        reader = protocol.LineReader(FakeStreamUART([b'{"a":1}\r\n{"b":2}\n']))
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"a":1}')
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"b":2}')
+        self.assertIsNone(reader.readline(timeout_ms=5))
+
+    def test_line_split_across_chunks(self):
+        reader = protocol.LineReader(FakeStreamUART([b'{"cmd":', b'"PING"}', b'\n']))
+        line = reader.readline(timeout_ms=50)
+        payload, err = protocol.parse_json_line(line)
+        self.assertIsNone(err)
+        self.assertEqual(payload["cmd"], "PING")
+
+    def test_oversized_line_is_dropped_and_stream_resyncs(self):
+        uart = FakeStreamUART([b"x" * 20, b"yyyy\nok\n"])
+        reader = protocol.LineReader(uart, max_bytes=16)
+        self.assertIsNone(reader.readline(timeout_ms=20))
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b"ok")
+
+    def test_compacts_when_buffer_wraps(self):
+        uart = FakeStreamUART([b"aaaaaaaaaa\nbbbbb", b"bbbbbbbb\n"])
+        reader = protocol.LineReader(uart, max_bytes=16)
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b"aaaaaaaaaa")
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b"b" * 13)
+
+
+    def test_any_mode_reads_only_available_bytes(self):
+        uart = FakeFifoUART([b'{"a":1}\n'])
+        reader = protocol.LineReader(uart, wait_mode="any")
+        self.assertEqual(reader.wait_mode(), "any")
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"a":1}')
+        self.assertIsNotNone(reader.line_rx_us)
+        self.assertIsNone(reader.readline(timeout_ms=5))
+        self.assertEqual(uart.reads, 1)
+
+    def test_loop_mode_reports_no_arrival_time(self):
+        reader = protocol.LineReader(FakeStreamUART([b'{"a":1}\n']), wait_mode="loop")
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"a":1}')
+        # The blocking read hides when the bytes came in.
+        self.assertIsNone(reader.line_rx_us)
+
+    def test_arrival_is_stamped_when_wait_returns(self):
+        reader = protocol.LineReader(FakeFifoUART([b'{"a":1}\n']), wait_mode="any")
+        stamps = iter([1000, 5000])
+        with mock.patch("protocol._ticks_us", side_effect=lambda: next(stamps)):
+            self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"a":1}')
+        self.assertEqual(reader.line_rx_us, 1000)
+
+    def test_poll_line_never_blocks_or_flushes_fragments(self):
+        uart = FakeFifoUART([b'{"cmd":'])
+        reader = protocol.LineReader(uart, wait_mode="loop")
+        self.assertIsNone(reader.poll_line())
+        self.assertEqual(reader.pending(), 7)
+        uart.chunks.append(b'"PING"}\n')
+        self.assertEqual(bytes(reader.poll_line()), b'{"cmd":"PING"}')
+        self.assertIsNone(reader.poll_line())
+
+    def test_fill_drains_the_fifo_in_one_call(self):
+        uart = FakeFifoUART([b'{"a":', b'1}\n{"b"', b':2}\n'])
+        reader = protocol.LineReader(uart, wait_mode="any")
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"a":1}')
+        self.assertEqual(uart.reads, 3)
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"b":2}')
+        self.assertEqual(uart.reads, 3)
+
+    def test_empty_buffer_reads_without_slicing(self):
+        class NbytesUART(FakeFifoUART):
+            def readinto(self, buf, nbytes=None):
+                self.targets.append((buf, nbytes))
+                return super().readinto(memoryview(buf)[:nbytes] if nbytes else buf)
+
+        uart = NbytesUART([b'{"a":1}\n'])
+        uart.targets = []
+        reader = protocol.LineReader(uart, wait_mode="any")
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"a":1}')
+        self.assertIs(uart.targets[0][0], reader._buf)
+        self.assertEqual(uart.targets[0][1], 8)
+
+    def test_poll_mode_falls_back_without_poll_support(self):
+        reader = protocol.LineReader(FakeFifoUART([]), wait_mode="poll")
+        self.assertEqual(reader.wait_mode(), "any")
+        reader = protocol.LineReader(FakeStreamUART([]), wait_mode="any")
+        self.assertEqual(reader.wait_mode(), "loop")
+
+    def test_wait_failure_downgrades_mode(self):
+        class BrokenPoller:
+            def __init__(self):
+                self.calls = 0
+
+            def poll(self, _timeout_ms):
+                self.calls += 1
+                if self.calls > 2:
+                    raise OSError("poll")
+                return []
+
+        uart = FakeFifoUART([])
+        reader = protocol.LineReader(uart, wait_mode="any")
+        reader._mode = "poll"
+        reader._poller = BrokenPoller()
+        for _ in range(3):
+            self.assertIsNone(reader.readline(timeout_ms=1))
+        self.assertEqual(reader.wait_mode(), "any")
+        self.assertEqual(reader.downgrades, 1)
+        uart.chunks.append(b'{"a":1}\n')
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"a":1}')
+
+        # any() failing too leaves the blocking loop mode.
+        uart.any = lambda: (_ for _ in ()).throw(OSError("any"))
+        uart.chunks.append(b'{"b":2}\n')
+        self.assertEqual(bytes(reader.readline(timeout_ms=20)), b'{"b":2}')
+        self.assertEqual(reader.wait_mode(), "loop")
+        self.assertEqual(reader.downgrades, 2)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -54,6 +54,40 @@ class StorageTests(unittest.TestCase):
         self.assertIn(config.PERSON_OWNER_1, faces)
         self.assertNotIn(config.PERSON_OWNER_2, faces)
 
+    def test_gallery_keeps_newest_templates(self):
+        storage.ensure_sd_layout()
+        for i in range(config.GALLERY_MAX_TEMPLATES + 1):
+            self.assertTrue(storage.save_face_jpeg("ALICE", b"t%d" % i))
+        names = storage.gallery_index()["ALICE"]
+        self.assertEqual(len(names), config.GALLERY_MAX_TEMPLATES)
+        self.assertNotIn("alice_0.jpg", names)
+        self.assertFalse(os.path.exists(storage.template_path("alice_0.jpg")))
+        self.assertEqual(storage.load_face_bytes("ALICE"), b"t%d" % config.GALLERY_MAX_TEMPLATES)
+        self.assertEqual(storage.delete_face("ALICE"), config.GALLERY_MAX_TEMPLATES)
+        self.assertEqual(storage.gallery_index(), {})
+
+    def test_legacy_owner_file_is_picked_up(self):
+        storage.ensure_sd_layout()
+        with open(config.OWNER_1_FACE_PATH, "wb") as f:
+            f.write(b"old")
+        self.assertEqual(storage.gallery_index(), {config.PERSON_OWNER_1: ["owner_1.jpg"]})
+        storage.save_face_jpeg(config.PERSON_OWNER_1, b"new")
+        self.assertEqual(storage.gallery_index()[config.PERSON_OWNER_1], ["owner_1.jpg", "owner_1_0.jpg"])
+
+    def test_new_template_never_reuses_another_file(self):
+        storage.ensure_sd_layout()
+        # Legacy OWNER_1 template, "owner_1.jpg", is what person "OWNER" would name its second.
+        with open(config.OWNER_1_FACE_PATH, "wb") as f:
+            f.write(b"owner1")
+        with open(storage.template_path("owner_2.jpg"), "wb") as f:
+            f.write(b"stray")
+        for i in range(3):
+            self.assertTrue(storage.save_face_jpeg("OWNER", b"o%d" % i))
+        self.assertEqual(storage.gallery_index()["OWNER"], ["owner_0.jpg", "owner_3.jpg", "owner_4.jpg"])
+        self.assertEqual(storage.load_face_bytes(config.PERSON_OWNER_1), b"owner1")
+        with open(storage.template_path("owner_2.jpg"), "rb") as f:
+            self.assertEqual(f.read(), b"stray")
+
     def test_read_write_config(self):
         self.assertEqual(storage.read_config({"a": 1}), {"a": 1})
         self.assertTrue(storage.write_config({"x": 2}))
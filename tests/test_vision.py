@@ -1,7 +1,9 @@
+import json
 import unittest
 from unittest import mock
 
 import config
+import protocol
 import vision
 
 
@@ -27,10 +29,37 @@ class DummySensor:
     def skip_frames(self, time=0):
         self.calls.append(("skip", time))
 
+    def set_windowing(self, window):
+        self.calls.append(("window", tuple(window)))
+
     def snapshot(self):
         return object()
 
 
+class FakeStat:
+    def __init__(self, mean):
+        self._mean = mean
+
+    def l_mean(self):
+        return self._mean
+
+
+class LumaFrame:
+    """Frame whose grid cells all have the same mean luminance."""
+
+    def __init__(self, level):
+        self.level = level
+
+    def width(self):
+        return 320
+
+    def height(self):
+        return 240
+
+    def get_statistics(self, roi=None):
+        return FakeStat(self.level)
+
+
 class FakeFace:
     def __init__(self):
         self.samples = []
@@ -39,7 +68,7 @@ class FakeFace:
     def load_templates(self):
         return 1
 
-    def recognize_frame(self, _frame):
+    def recognize_frame(self, _frame, costs=None):
         if self.samples:
             return self.samples.pop(0)
         return {"person": config.PERSON_NONE, "confidence": 0.0, "faces_detected": 0}
@@ -47,10 +76,27 @@ class FakeFace:
     def vote_people(self, samples):
         return {"person": samples[0]["person"], "confidence": samples[0].get("confidence", 0.0), "faces_detected": 1}
 
+    def recognize_faces(self, _frame, costs=None):
+        self.multi_calls = getattr(self, "multi_calls", 0) + 1
+        return {
+            "faces": [
+                {"person": "ALICE", "confidence": 0.9, "score": 5, "bbox": (10, 10, 80, 80)},
+                {"person": "BOB", "confidence": 0.8, "score": 8, "bbox": (200, 20, 50, 50)},
+            ],
+            "faces_detected": 2,
+        }
+
+    def vote_faces(self, samples):
+        last = samples[-1]["faces"]
+        return [{"person": f["person"], "conf": f["confidence"], "bbox": list(f["bbox"])} for f in last]
+
     def templates_loaded(self):
         return 1
 
-    def learn(self, capture_cb, person, frames, deadline_ms):
+    def recognizer_stats(self):
+        return {"name": "difference"}
+
+    def learn(self, capture_cb, person, frames, deadline_ms, between_frames=None):
         self.learn_calls.append((person, frames))
         capture_cb()
         return {"status": "learned", "person": person}
@@ -131,6 +177,255 @@ class VisionRuntimeTests(unittest.TestCase):
         rt.recover()
         self.assertFalse(rt._camera_ready)
 
+    def _count_deinits(self, rt):
+        deinits = []
+        rt._face.deinit = lambda: deinits.append("face")
+        rt._objects.deinit = lambda: deinits.append("objects")
+        return deinits
+
+    def test_object_failure_resets_only_the_object_model(self):
+        rt = self._new_runtime()
+        deinits = self._count_deinits(rt)
+        rt.recover("objects_detect")
+        self.assertEqual(deinits, ["objects"])
+        self.assertTrue(rt._camera_ready)
+        self.assertEqual(rt.recovery_stats()["objects"], 1)
+        rt.recover("snapshot")
+        self.assertEqual(deinits, ["objects"])
+        self.assertFalse(rt._camera_ready)
+
+    def test_repeated_failures_escalate_with_backoff(self):
+        rt = self._new_runtime()
+        deinits = self._count_deinits(rt)
+        for _ in range(config.RECOVER_ESCALATE_AFTER):
+            rt.recover("face_detect")
+        self.assertEqual(rt.recovery_stats()["full"], 1)
+        self.assertEqual(deinits[-2:], ["face", "objects"])
+        rt._camera_ready = True
+        for _ in range(config.RECOVER_ESCALATE_AFTER):
+            rt.recover("face_detect")
+        # Inside the backoff window: still only the face model.
+        self.assertEqual(rt.recovery_stats()["full"], 1)
+        self.assertTrue(rt._camera_ready)
+        self.assertEqual(rt._backoff_ms, config.RECOVER_BACKOFF_MS * 2)
+
+    def test_unattributed_failures_never_escalate(self):
+        rt = self._new_runtime()
+        deinits = self._count_deinits(rt)
+        rt._camera_ready = True
+        for _ in range(config.RECOVER_ESCALATE_AFTER * 2):
+            rt.recover("timeout")
+        self.assertEqual(deinits, [])
+        self.assertTrue(rt._camera_ready)
+        self.assertEqual(rt.recovery_stats()["other"], config.RECOVER_ESCALATE_AFTER * 2)
+        self.assertEqual(rt.recovery_stats()["full"], 0)
+
+    def test_success_clears_failure_streak(self):
+        rt = self._new_runtime()
+        for _ in range(config.RECOVER_ESCALATE_AFTER - 1):
+            rt.recover("objects_detect")
+        rt.objects({"mode": "FAST", "frames": 1}, vision._ticks_ms() + 10000)
+        rt.recover("objects_detect")
+        self.assertEqual(rt.recovery_stats()["full"], 0)
+        self.assertEqual(rt.recovery_stats()["objects"], config.RECOVER_ESCALATE_AFTER)
+
+
+    def test_who_all_faces_lists_every_face(self):
+        rt = self._new_runtime()
+        out = rt.who({"mode": "RELIABLE", "frames": 3, "all_faces": True}, vision._ticks_ms() + 10000)
+        self.assertEqual(out["person"], "ALICE")
+        self.assertEqual(out["frames"], 3)
+        self.assertEqual([f["person"] for f in out["faces"]], ["ALICE", "BOB"])
+        self.assertEqual(rt._face.multi_calls, 3)
+
+    def test_all_faces_is_opt_in_and_cached_separately(self):
+        rt = self._new_runtime()
+        rt._face.samples = [{"person": "ALICE", "confidence": 0.9, "faces_detected": 1}]
+        plain = rt.who({"mode": "FAST"}, vision._ticks_ms() + 10000)
+        self.assertNotIn("faces", plain)
+        out = rt.who({"mode": "FAST", "all_faces": True, "max_age_ms": 1000}, vision._ticks_ms() + 10000)
+        self.assertIn("faces", out)
+        self.assertNotIn("age_ms", out)
+
+    def test_all_faces_result_fits_budget(self):
+        pid = "X" * config.GALLERY_MAX_ID_LEN
+        faces_list = [{"person": pid, "conf": 0.95, "bbox": [319, 239, 320, 240]}] * config.MULTI_FACE_MAX
+        result = {
+            "person": pid, "faces_detected": 9, "objects": list(config.SUPPORTED_OBJECTS)[:config.MAX_OBJECTS],
+            "frames": 5, "truncated": False, "confidence": {"person": 0.95}, "faces": faces_list,
+        }
+        raw = protocol.safe_json_encode({"req_id": "r" * 16, "ok": True, "result": result})
+        self.assertLessEqual(len(raw), config.MAX_JSON_BYTES)
+        out = json.loads(raw)["result"]
+        self.assertFalse(out["truncated"])
+        self.assertEqual(len(out["faces"]), config.MULTI_FACE_MAX)
+
+    def test_cached_hit_carries_its_own_debug(self):
+        rt = self._new_runtime()
+        rt.set_debug(True)
+        first = rt.who({"mode": "FAST"}, vision._ticks_ms() + 10000)
+        self.assertIn("stage_ms", first["debug"])
+        hit = rt.who({"mode": "FAST", "max_age_ms": 1000}, vision._ticks_ms() + 10000)
+        self.assertEqual(hit["debug"], {"elapsed_ms": 0, "age_ms": hit["age_ms"]})
+        self.assertNotIn("debug", rt._results[rt._cache_key("WHO", {"mode": "FAST"})][0])
+        # The filler's reply is not changed by the hit.
+        self.assertIn("stage_ms", first["debug"])
+
+    def test_merge_scan_args_covers_all_requests(self):
+        merged = vision.merge_scan_args([{"mode": "FAST"}], [{"frames": 4, "allow_partial": True}])
+        self.assertEqual(merged, {"frames": 4, "allow_partial": True})
+        merged = vision.merge_scan_args([{}], [{"mode": "FAST"}])
+        self.assertEqual(merged, {"frames": 3, "allow_partial": False})
+
+    def test_split_scan_result(self):
+        scan = {"person": "OWNER_1", "faces_detected": 1, "objects": ["cup"], "frames": 2,
+                "truncated": False, "confidence": {"person": 0.9}}
+        self.assertEqual(vision.who_from_scan(scan), {"person": "OWNER_1", "frames": 2, "confidence": {"person": 0.9}})
+        self.assertEqual(vision.objects_from_scan(scan), {"objects": ["cup"], "frames": 2, "truncated": False})
+
+    def test_scan_steps_yield_at_every_frame_boundary(self):
+        rt = self._new_runtime()
+        boundaries = []
+        out = vision.run_steps(
+            rt.scan_steps({"mode": "FAST", "frames": 3}, vision._ticks_ms() + 10000),
+            lambda: boundaries.append(len(rt._objects.calls)),
+        )
+        self.assertEqual(boundaries, [1, 2, 3])
+        self.assertEqual(out["frames"], 3)
+
+    def test_stops_before_frame_predicted_to_overrun(self):
+        rt = self._new_runtime()
+        rt._costs.add("objects", 4000)
+        out = rt.objects({"frames": 3}, vision._ticks_ms() + 3000)
+        # The first frame always runs; the next one would not fit the deadline.
+        self.assertEqual(out["frames"], 1)
+        self.assertTrue(out["partial"])
+        self.assertEqual(len(rt._objects.calls), 1)
+
+    def test_full_run_has_no_partial_flag(self):
+        rt = self._new_runtime()
+        out = rt.scan({"frames": 2}, vision._ticks_ms() + 10000)
+        self.assertEqual(out["frames"], 2)
+        self.assertNotIn("partial", out)
+        self.assertIn("objects", rt._costs.as_dict())
+
+    def test_stage_costs_ewma(self):
+        costs = vision.StageCosts(alpha=0.5)
+        costs.add("capture", 100)
+        costs.add("capture", 200)
+        costs.add("objects", 50)
+        self.assertEqual(costs.as_dict(), {"capture": 150, "objects": 50})
+        self.assertEqual(costs.estimate(("capture", "objects", "face_detect")), 200)
+
+    def test_reliable_scan_exits_early_on_unanimous_frames(self):
+        rt = self._new_runtime()
+        out = rt.scan({"mode": "RELIABLE", "frames": 5}, vision._ticks_ms() + 10000)
+        # NONE twice with two frames left is not yet decided; three is.
+        self.assertEqual(out["frames"], 5)
+        self.assertEqual(out["frames_used"], 3)
+        self.assertEqual(len(rt._objects.calls), 3)
+        self.assertNotIn("partial", out)
+
+    def test_split_votes_use_all_frames(self):
+        rt = self._new_runtime()
+        owner = {"person": config.PERSON_OWNER_1, "confidence": 0.9, "faces_detected": 1}
+        none = {"person": config.PERSON_NONE, "confidence": 0.0, "faces_detected": 0}
+        rt._face.samples = [owner, none, owner]
+        out = rt.who({"frames": 3}, vision._ticks_ms() + 10000)
+        self.assertEqual(out["frames"], 3)
+        self.assertNotIn("frames_used", out)
+
+    def test_frame_votes_objects_need_stable_label_set(self):
+        votes = vision.FrameVotes(5, faces=False, objects=True, stable_frames=2)
+        self.assertFalse(votes.add(labels=["door"]))
+        self.assertFalse(votes.add(labels=["cup", "door"]))
+        self.assertTrue(votes.add(labels=["door", "cup"]))
+
+    def _feed_frames(self, rt, levels):
+        frames = [LumaFrame(level) for level in levels]
+        rt._sensor.snapshot = lambda: frames.pop(0)
+
+    def test_static_scene_reuses_last_results(self):
+        rt = self._new_runtime()
+        self._feed_frames(rt, [50, 51, 50])
+        out = rt.scan({"mode": "FAST", "frames": 3}, vision._ticks_ms() + 10000)
+        self.assertEqual(out["objects"], ["door"])
+        self.assertEqual(len(rt._objects.calls), 1)
+        self.assertEqual(rt._motion.as_dict(), {"ran": 2, "reused": 4})
+
+    def test_scene_change_runs_inference(self):
+        rt = self._new_runtime()
+        self._feed_frames(rt, [50, 80])
+        rt.objects({"mode": "FAST", "frames": 2}, vision._ticks_ms() + 10000)
+        self.assertEqual(len(rt._objects.calls), 2)
+
+    def test_reuse_expires_after_max_age(self):
+        rt = self._new_runtime()
+        self._feed_frames(rt, [50, 50])
+        rt.objects({"mode": "FAST", "frames": 1}, vision._ticks_ms() + 10000)
+        rt._motion._max_age_ms = -1
+        rt.objects({"mode": "FAST", "frames": 1}, vision._ticks_ms() + 10000)
+        self.assertEqual(len(rt._objects.calls), 2)
+        self.assertEqual(rt._motion.reused, 0)
+
+    def test_scan_result_answers_who_and_objects_with_max_age(self):
+        rt = self._new_runtime()
+        rt.scan({"mode": "FAST", "frames": 1}, vision._ticks_ms() + 10000)
+        who = rt.who({"mode": "FAST", "frames": 1, "max_age_ms": 1000}, vision._ticks_ms() + 10000)
+        objs = rt.objects({"mode": "FAST", "frames": 1, "max_age_ms": 1000}, vision._ticks_ms() + 10000)
+        self.assertEqual(who["person"], config.PERSON_NONE)
+        self.assertEqual(objs["objects"], ["door"])
+        self.assertIn("age_ms", who)
+        self.assertIn("age_ms", objs)
+        self.assertEqual(len(rt._objects.calls), 1)
+
+    def test_result_cache_needs_max_age_and_matching_frames(self):
+        rt = self._new_runtime()
+        rt.objects({"mode": "FAST", "frames": 1}, vision._ticks_ms() + 10000)
+        rt.objects({"mode": "FAST", "frames": 1}, vision._ticks_ms() + 10000)
+        out = rt.objects({"mode": "FAST", "frames": 2, "max_age_ms": 1000}, vision._ticks_ms() + 10000)
+        self.assertEqual(len(rt._objects.calls), 4)
+        self.assertNotIn("age_ms", out)
+
+    def test_recover_drops_cached_results(self):
+        rt = self._new_runtime()
+        rt.objects({"mode": "FAST", "frames": 1}, vision._ticks_ms() + 10000)
+        rt.recover()
+        rt._camera_ready = True
+        rt.objects({"mode": "FAST", "frames": 1, "max_age_ms": 1000}, vision._ticks_ms() + 10000)
+        self.assertEqual(len(rt._objects.calls), 2)
+
+    def _windows(self, rt):
+        return [c[1] for c in rt._sensor.calls if c[0] == "window"]
+
+    def test_objects_window_needs_a_streak_and_faces_switch_back(self):
+        rt = self._new_runtime()
+        args = {"mode": "FAST", "frames": 1}
+        rt.objects(args, vision._ticks_ms() + 10000)
+        self.assertEqual(self._windows(rt), [])
+        rt.objects(args, vision._ticks_ms() + 10000)
+        rt.objects(args, vision._ticks_ms() + 10000)
+        self.assertEqual(self._windows(rt), [config.SENSOR_PROFILES["objects"]])
+        rt.scan(args, vision._ticks_ms() + 10000)
+        self.assertEqual(self._windows(rt), [config.SENSOR_PROFILES["objects"], config.SENSOR_PROFILES["faces"]])
+        self.assertEqual(rt._last_debug["sensor"]["profile"], "faces")
+        self.assertEqual(rt._last_debug["sensor"]["switches"], 2)
+
+    def test_objects_window_follows_learned_model_dims(self):
+        rt = self._new_runtime()
+        rt._objects.input_dims = lambda: (160, 120)
+        for _ in range(config.SENSOR_PROFILE_STREAK):
+            rt.objects({"mode": "FAST", "frames": 1}, vision._ticks_ms() + 10000)
+        self.assertEqual(self._windows(rt), [(160, 120)])
+
+    def test_sensor_without_windowing_stays_on_full_frames(self):
+        rt = self._new_runtime()
+        rt._sensor.set_windowing = None
+        for _ in range(config.SENSOR_PROFILE_STREAK + 1):
+            rt.objects({"mode": "FAST", "frames": 1}, vision._ticks_ms() + 10000)
+        self.assertEqual(rt._last_debug["sensor"]["profile"], "faces")
+        self.assertEqual(rt._last_debug["sensor"]["switches"], 0)
+
 
 if __name__ == "__main__":
     unittest.main()
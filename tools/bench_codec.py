@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Host benchmark: JSONL vs binary (codec.py) response framing — bytes, wire time, encode/decode time."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import codec  # noqa: E402
+import config  # noqa: E402
+import protocol  # noqa: E402
+
+SAMPLES = {
+    "PING": {"status": "ok", "tool": config.TOOL_NAME},
+    "INFO": {
+        "tool": config.TOOL_NAME,
+        "fw_version": config.FW_VERSION,
+        "protocol_version": config.PROTOCOL_VERSION,
+        "capabilities": {"faces": True, "objects": True, "learn": True, "sd": True},
+        "framings": list(codec.FRAMINGS),
+    },
+    "WHO": {"person": "OWNER_1", "frames": 3, "confidence": {"person": 0.91}},
+    "OBJECTS": {"objects": ["door", "sofa", "table", "cup"], "frames": 3, "truncated": False},
+    "SCAN": {
+        "person": "OWNER_1",
+        "faces_detected": 1,
+        "objects": ["door", "window", "sofa", "chair", "table", "cup"],
+        "frames": 3,
+        "truncated": False,
+        "confidence": {"person": 0.91},
+        "debug": {"elapsed_ms": 2841, "templates": 2, "object_model": "sd"},
+    },
+}
+
+
+def _normalize(obj):
+    # float32 on the wire: compare at the precision results are rounded to.
+    if isinstance(obj, float):
+        return round(obj, 4)
+    if isinstance(obj, dict):
+        return {k: _normalize(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_normalize(v) for v in obj]
+    return obj
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - t0) * 1e6 / iterations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--baud", type=int, default=config.UART_BAUD)
+    args = parser.parse_args()
+
+    # 8N1: 10 bit times per byte.
+    byte_ms = 10000.0 / args.baud
+    print("%-8s %6s %6s %7s %9s %9s %9s %9s" % (
+        "cmd", "json_B", "bin_B", "saved", "wire_ms", "json_enc", "bin_enc", "bin_dec"))
+    for cmd, result in SAMPLES.items():
+        payload = {"req_id": "req-000123", "ok": True, "result": result}
+        json_raw = protocol.safe_json_encode(payload) + b"\n"
+        bin_raw = codec.encode_frame(payload)
+        assert _normalize(codec.decode_frame(bin_raw)[0]) == _normalize(json.loads(json_raw))
+
+        json_enc = _per_call_us(lambda: protocol.safe_json_encode(payload), args.iterations)
+        bin_enc = _per_call_us(lambda: codec.encode_frame(payload), args.iterations)
+        bin_dec = _per_call_us(lambda: codec.decode_frame(bin_raw), args.iterations)
+        print("%-8s %6d %6d %6.0f%% %4.1f/%4.1f %7.1fus %7.1fus %7.1fus" % (
+            cmd,
+            len(json_raw),
+            len(bin_raw),
+            100.0 * (len(json_raw) - len(bin_raw)) / len(json_raw),
+            len(json_raw) * byte_ms,
+            len(bin_raw) * byte_ms,
+            json_enc,
+            bin_enc,
+            bin_dec,
+        ))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
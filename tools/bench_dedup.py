@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Host benchmark: main.DedupCache under a storm of distinct req_ids vs the old unbounded scan-on-access cache."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import config  # noqa: E402
+import main as runtime_main  # noqa: E402
+
+
+class LegacyDedupCache:
+    """Previous implementation: dict walked in full on every get/set, no size bound."""
+
+    def __init__(self, ttl_ms):
+        self._ttl_ms = ttl_ms
+        self._items = {}
+
+    def _gc(self, now):
+        for req_id in [k for k, (created, _) in self._items.items() if now - created > self._ttl_ms]:
+            del self._items[req_id]
+
+    def get(self, req_id, now):
+        self._gc(now)
+        item = self._items.get(req_id)
+        return item[1] if item else None
+
+    def set(self, req_id, raw_bytes, now):
+        self._gc(now)
+        self._items[req_id] = (now, raw_bytes)
+
+    def stats(self):
+        return {"entries": len(self._items), "bytes": sum(len(v[1]) for v in self._items.values())}
+
+
+def _storm(cache, requests: int, per_ms: float, blob: bytes) -> tuple[float, int, int]:
+    peak_entries = 0
+    peak_bytes = 0
+    t0 = time.perf_counter()
+    for i in range(requests):
+        now = int(i / per_ms)
+        req_id = "storm-%d" % i
+        cache.get(req_id, now)
+        cache.set(req_id, blob, now)
+        # A retry of a recent request, like an ESP that missed the reply.
+        cache.get("storm-%d" % max(i - 3, 0), now)
+        if i % 100 == 0:
+            stats = cache.stats()
+            peak_entries = max(peak_entries, stats["entries"])
+            peak_bytes = max(peak_bytes, stats["bytes"])
+    elapsed = time.perf_counter() - t0
+    return elapsed, peak_entries, peak_bytes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--per-ms", type=float, default=5.0, help="distinct req_ids arriving per millisecond")
+    parser.add_argument("--blob", type=int, default=config.MAX_JSON_BYTES, help="cached response size")
+    args = parser.parse_args()
+
+    blob = b"x" * args.blob
+    for label, cache in (
+        ("legacy", LegacyDedupCache(config.DEDUP_TTL_MS)),
+        ("bounded", runtime_main.DedupCache(config.DEDUP_TTL_MS)),
+    ):
+        elapsed, peak_entries, peak_bytes = _storm(cache, args.requests, args.per_ms, blob)
+        ops = args.requests * 3
+        print("%-8s ops=%d time=%.3fs per_op=%.2fus peak_entries=%d peak_bytes=%d" % (
+            label, ops, elapsed, elapsed * 1e6 / ops, peak_entries, peak_bytes))
+        extra = cache.stats()
+        if "evictions" in extra:
+            print("         hits=%d misses=%d evictions=%d expired=%d" % (
+                extra["hits"], extra["misses"], extra["evictions"], extra["expired"]))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Host benchmark: WHO latency and accuracy as the face gallery grows, coarse-pruned vs exhaustive matching."""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import config  # noqa: E402
+import faces  # noqa: E402
+import vision  # noqa: E402
+
+GRID = config.FACE_FEATURE_GRID
+
+
+class SimDet:
+    def x(self):
+        return 100
+
+    def y(self):
+        return 60
+
+    def w(self):
+        return 80
+
+    def h(self):
+        return 80
+
+
+class SimKPU:
+    def load(self, _addr):
+        return object()
+
+    def init_yolo2(self, *_args):
+        return None
+
+    def run_yolo2(self, _task, _img):
+        return [SimDet()]
+
+    def deinit(self, _task):
+        return None
+
+
+class SimFace:
+    """Face ROI whose resize() keeps a GRID x GRID luminance pattern."""
+
+    def __init__(self, pattern: list[int], w: int = 64, h: int = 64):
+        self.pattern = pattern
+        self.w = w
+        self.h = h
+
+    def width(self):
+        return self.w
+
+    def height(self):
+        return self.h
+
+    def resize(self, w: int, h: int):
+        return SimFace(self.pattern, w, h)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.pattern)
+
+
+class SimFrame:
+    """Camera frame holding one face; the next probe is swapped in before each WHO."""
+
+    def __init__(self):
+        self.face = None
+
+    def width(self):
+        return 320
+
+    def height(self):
+        return 240
+
+    def pix_to_ai(self):
+        pass
+
+    def copy(self, roi=None):
+        return SimFace(self.face.pattern)
+
+
+class SimSensor:
+    RGB565 = "rgb565"
+    QVGA = "qvga"
+
+    def __init__(self, frame: SimFrame):
+        self._frame = frame
+
+    def snapshot(self):
+        return self._frame
+
+
+def _identity(rnd: random.Random) -> list[int]:
+    coarse = [rnd.randint(0, 255) for _ in range(16)]
+    step = GRID // 4
+    return [coarse[(y // step) * 4 + x // step] for y in range(GRID) for x in range(GRID)]
+
+
+def _capture(base: list[int], rnd: random.Random, noise: int) -> list[int]:
+    return [min(max(v + rnd.randint(-noise, noise), 0), 255) for v in base]
+
+
+def _run(persons: int, per_person: int, shortlist: int, args: argparse.Namespace) -> tuple[float, float]:
+    config.GALLERY_SHORTLIST = shortlist
+    rnd = random.Random(args.seed)
+    bases = {"P%d" % i: _identity(rnd) for i in range(persons)}
+    face_rt = faces.FaceRuntime(image_mod=object(), kpu_mod=SimKPU())
+    for person, base in bases.items():
+        for _ in range(per_person):
+            face_rt._recognizer.add(person, faces.face_features(SimFace(_capture(base, rnd, args.noise))))
+
+    frame = SimFrame()
+    rt = vision.VisionRuntime(face_runtime=face_rt, object_runtime=object())
+    rt._sensor = SimSensor(frame)
+    rt._camera_ready = True
+    who_args = {"mode": "FAST", "frames": args.frames}
+
+    correct = 0
+    t0 = time.perf_counter()
+    for i in range(args.requests):
+        truth = "P%d" % (i % persons)
+        frame.face = SimFace(_capture(bases[truth], rnd, args.noise))
+        out = rt.who(who_args, vision._ticks_ms() + 60000)
+        correct += out["person"] == truth
+    elapsed = time.perf_counter() - t0
+    return elapsed * 1000.0 / args.requests, 100.0 * correct / args.requests
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="2,8,20,40", help="gallery sizes (templates) to measure")
+    parser.add_argument("--per-person", type=int, default=2, help="templates per person")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--frames", type=int, default=3)
+    parser.add_argument("--noise", type=int, default=12, help="max per-pixel noise between captures")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    config.USB_DEBUG_LOG = False
+    config.MOTION_GATE_ENABLED = False
+    shortlist = config.GALLERY_SHORTLIST
+    print("frames/WHO=%d per_person=%d shortlist=%d" % (args.frames, args.per_person, shortlist))
+    print("%9s %18s %18s" % ("templates", "exhaustive ms/acc", "pruned ms/acc"))
+    for size in [int(s) for s in args.sizes.split(",")]:
+        persons = max(1, size // args.per_person)
+        full_ms, full_acc = _run(persons, args.per_person, 0, args)
+        pruned_ms, pruned_acc = _run(persons, args.per_person, shortlist, args)
+        print("%9d %10.2f /%5.1f%% %10.2f /%5.1f%%" % (persons * args.per_person, full_ms, full_acc, pruned_ms, pruned_acc))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
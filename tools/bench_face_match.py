@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Host benchmark: face template matching by image difference vs precomputed feature vectors (work, accuracy).
+
+The image operations (difference, get_statistics, resize) run in C on the
+device but are Python loops here, so host time says nothing about the K210;
+pixel passes and ROI-sized allocations are the figures to compare.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import config  # noqa: E402
+import faces  # noqa: E402
+
+ROI = 64
+
+
+class SimStat:
+    def __init__(self, l_mean):
+        self._l_mean = l_mean
+
+    def l_mean(self):
+        return self._l_mean
+
+
+class SimImage:
+    """Grayscale image with the MaixPy calls the matchers use; counts pixel passes and allocated bytes.
+
+    Allocations are counted as RGB565 (2 bytes/pixel), like the camera ROI on the device.
+    """
+
+    pixels = 0
+    alloc = 0
+
+    def __init__(self, w: int, h: int, pix: bytearray):
+        self.w = w
+        self.h = h
+        self.pix = pix
+        SimImage.alloc += w * h * 2
+
+    def width(self):
+        return self.w
+
+    def height(self):
+        return self.h
+
+    def copy(self):
+        SimImage.pixels += len(self.pix)
+        return SimImage(self.w, self.h, bytearray(self.pix))
+
+    def difference(self, other):
+        SimImage.pixels += len(self.pix)
+        self.pix = bytearray(abs(a - b) for a, b in zip(self.pix, other.pix))
+
+    def get_statistics(self):
+        SimImage.pixels += len(self.pix)
+        return SimStat(sum(self.pix) * 100 // (255 * len(self.pix)))
+
+    def resize(self, w: int, h: int):
+        SimImage.pixels += len(self.pix)
+        fx = self.w // w
+        fy = self.h // h
+        out = bytearray(w * h)
+        for y in range(h):
+            for x in range(w):
+                total = 0
+                for yy in range(y * fy, (y + 1) * fy):
+                    row = yy * self.w
+                    total += sum(self.pix[row + x * fx:row + (x + 1) * fx])
+                out[y * w + x] = total // (fx * fy)
+        return SimImage(w, h, out)
+
+    def to_bytes(self) -> bytearray:
+        return self.pix
+
+
+def _face(seed: int) -> list[int]:
+    """Smooth random 8x8 pattern upscaled to the ROI size: one identity."""
+    rnd = random.Random(seed)
+    coarse = [rnd.randint(0, 255) for _ in range(64)]
+    step = ROI // 8
+    return [coarse[(y // step) * 8 + x // step] for y in range(ROI) for x in range(ROI)]
+
+
+def _sample(base: list[int], rnd: random.Random, shift: int, noise: int) -> SimImage:
+    """One capture of a face: brightness shift, small translation and pixel noise."""
+    dx = rnd.randint(-2, 2)
+    dy = rnd.randint(-2, 2)
+    light = rnd.randint(-shift, shift)
+    pix = bytearray(ROI * ROI)
+    for y in range(ROI):
+        sy = min(max(y + dy, 0), ROI - 1)
+        for x in range(ROI):
+            sx = min(max(x + dx, 0), ROI - 1)
+            v = base[sy * ROI + sx] + light + rnd.randint(-noise, noise)
+            pix[y * ROI + x] = min(max(v, 0), 255)
+    return SimImage(ROI, ROI, pix)
+
+
+def _decide(scores: dict) -> str:
+    person = min(scores, key=scores.get)
+    return person if scores[person] <= config.FACE_SCORE_THRESH else config.PERSON_UNKNOWN
+
+
+def _match_difference(candidate: SimImage, templates: dict) -> str:
+    scores = {}
+    for person, template in templates.items():
+        diff = candidate.copy()
+        diff.difference(template)
+        scores[person] = diff.get_statistics().l_mean()
+    return _decide(scores)
+
+
+def _match_features(candidate: SimImage, templates: dict) -> str:
+    features = faces.face_features(candidate)
+    best_person = config.PERSON_UNKNOWN
+    best_score = 255
+    for person, template in templates.items():
+        score = faces.feature_distance(features, template, best_score)
+        if score < best_score:
+            best_score = score
+            best_person = person
+    return best_person if best_score <= config.FACE_SCORE_THRESH else config.PERSON_UNKNOWN
+
+
+def _run(label: str, match, templates: dict, probes: list) -> tuple[list[str], float, int]:
+    SimImage.pixels = 0
+    SimImage.alloc = 0
+    correct = 0
+    decisions = []
+    t0 = time.perf_counter()
+    for truth, img in probes:
+        person = match(img, templates)
+        decisions.append(person)
+        correct += person == truth
+    elapsed = time.perf_counter() - t0
+    n = len(probes)
+    print("%-10s host_per_frame=%.3fms pixel_passes=%d alloc_bytes=%d accuracy=%.1f%%" % (
+        label, elapsed * 1000.0 / n, SimImage.pixels // n, SimImage.alloc // n, 100.0 * correct / n))
+    return decisions, SimImage.pixels, SimImage.alloc
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--templates", type=int, default=len(config.KNOWN_PERSONS), help="enrolled identities")
+    parser.add_argument("--probes", type=int, default=200, help="candidate faces per matcher")
+    parser.add_argument("--shift", type=int, default=12, help="max brightness change between captures")
+    parser.add_argument("--noise", type=int, default=10, help="max per-pixel noise")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    bases = {"P%d" % i: _face(args.seed * 1000 + i) for i in range(args.templates)}
+    # A third of the probes are strangers, which must come back UNKNOWN.
+    strangers = [_face(args.seed * 1000 + 500 + i) for i in range(4)]
+    images = {p: _sample(b, rnd, 0, 0) for p, b in bases.items()}
+    probes = []
+    for i in range(args.probes):
+        if i % 3 == 2:
+            probes.append((config.PERSON_UNKNOWN, _sample(strangers[i % len(strangers)], rnd, args.shift, args.noise)))
+        else:
+            person = "P%d" % (i % args.templates)
+            probes.append((person, _sample(bases[person], rnd, args.shift, args.noise)))
+
+    features = {p: faces.face_features(img) for p, img in images.items()}
+    print("templates=%d probes=%d grid=%d shift=%d noise=%d" % (
+        args.templates, args.probes, config.FACE_FEATURE_GRID, args.shift, args.noise))
+    old, old_px, old_alloc = _run("difference", _match_difference, images, probes)
+    new, new_px, new_alloc = _run("features", _match_features, features, probes)
+    agree = sum(1 for a, b in zip(old, new) if a == b)
+    print("agreement  %.1f%%" % (100.0 * agree / len(probes)))
+    print("work       %.1fx fewer pixel passes, %.1fx fewer ROI bytes allocated" % (
+        float(old_px) / new_px, float(old_alloc) / max(new_alloc, 1)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Host benchmark: protocol.uart_readline() vs protocol.LineReader (bytes/s, allocations)."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import protocol  # noqa: E402
+
+SAMPLE_LINE = b'{"cmd":"SCAN","req_id":"bench-000042","args":{"mode":"RELIABLE","frames":3}}\n'
+
+
+class FakeFifoUART:
+    """Replays a byte stream in FIFO-sized chunks, like the K210 UART driver.
+
+    The chunks are sliced up front, so readinto() itself does not allocate and
+    the allocation figures belong to the reader under test. readline() builds
+    a bytes object per line, as the MaixPy driver does.
+    """
+
+    def __init__(self, data: bytes, fifo_bytes: int):
+        self._raw = data
+        self._pos = 0
+        view = memoryview(data)
+        self._chunks = [view[i:i + fifo_bytes] for i in range(0, len(data), fifo_bytes)]
+        self._chunk = 0
+        self._offset = 0
+
+    def any(self) -> int:
+        return len(self._raw) - self._pos
+
+    def readline(self) -> bytes | None:
+        if self._pos >= len(self._raw):
+            return None
+        end = self._raw.find(b"\n", self._pos)
+        stop = len(self._raw) if end < 0 else end + 1
+        chunk = self._raw[self._pos:stop]
+        self._pos = stop
+        return chunk
+
+    def readinto(self, buf, nbytes: int | None = None) -> int | None:
+        if self._chunk >= len(self._chunks):
+            return None
+        chunk = self._chunks[self._chunk]
+        n = len(chunk) - self._offset
+        room = len(buf) if nbytes is None else min(nbytes, len(buf))
+        if n > room:
+            n = room
+        if self._offset == 0 and n == len(chunk):
+            buf[:n] = chunk
+            self._chunk += 1
+        else:
+            # The reader has less room than one FIFO chunk; hand over a part.
+            buf[:n] = chunk[self._offset:self._offset + n]
+            self._offset += n
+            if self._offset >= len(chunk):
+                self._chunk += 1
+                self._offset = 0
+        self._pos += n
+        return n
+
+
+def _drain(read_fn, lines: int) -> int:
+    got = 0
+    for _ in range(lines):
+        if read_fn() is None:
+            break
+        got += 1
+    return got
+
+
+def _allocations(make_read_fn, lines: int) -> tuple[float, float, int]:
+    """Per-line allocation churn: (transient bytes/line, retained blocks/line, retained bytes).
+
+    The reader is built before tracing starts, so a buffer preallocated once
+    does not count. For each line the traced high-water mark above the
+    pre-call level is taken: a lower bound on what readline() allocated,
+    including objects it freed again before returning.
+    """
+    read_fn = make_read_fn()
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    churn = 0
+    got = 0
+    line = None
+    for _ in range(lines):
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        line = read_fn()
+        _, peak = tracemalloc.get_traced_memory()
+        churn += peak - base
+        if line is None:
+            break
+        got += 1
+    del line
+    end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = end.filter_traces(ignore).compare_to(start.filter_traces(ignore), "filename")
+    blocks = sum(stat.count_diff for stat in diff)
+    size = sum(stat.size_diff for stat in diff)
+    got = max(got, 1)
+    return churn / got, blocks / got, size
+
+
+def _run(label: str, make_read_fn, total_bytes: int, lines: int) -> None:
+    read_fn = make_read_fn()
+    t0 = time.perf_counter()
+    got = _drain(read_fn, lines)
+    elapsed = time.perf_counter() - t0
+    rate = total_bytes / elapsed if elapsed > 0 else float("inf")
+
+    # Second pass under tracemalloc (slower, so timed separately above).
+    churn, blocks, retained = _allocations(make_read_fn, lines)
+
+    print(
+        "%-14s lines=%d time=%.3fs rate=%.0f B/s alloc=%.0f B/line retained=%.2f blocks/line (%d B)"
+        % (label, got, elapsed, rate, churn, blocks, retained)
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--fifo", type=int, default=64, help="bytes returned per readinto()")
+    args = parser.parse_args()
+
+    data = SAMPLE_LINE * args.lines
+    total = len(data)
+
+    def legacy():
+        uart = FakeFifoUART(data, args.fifo)
+        return lambda: protocol.uart_readline(uart, timeout_ms=50)
+
+    def reader():
+        line_reader = protocol.LineReader(FakeFifoUART(data, args.fifo))
+        return lambda: line_reader.readline(timeout_ms=50)
+
+    _run("uart_readline", legacy, total, args.lines)
+    _run("LineReader", reader, total, args.lines)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Host benchmark: first request byte -> line handed to dispatch, per LineReader wait mode."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import config  # noqa: E402
+import protocol  # noqa: E402
+
+SAMPLE_LINE = b'{"cmd":"PING","req_id":"hb-0001"}\n'
+
+
+class TimedUART:
+    """Delivers request lines at scheduled wall-clock times, one byte per baud slot.
+
+    Blocking readinto() mimics MicroPython: wait `timeout_ms` for the first byte,
+    then keep reading until the buffer is full or the line goes quiet for `timeout_char_ms`.
+    """
+
+    def __init__(self, gap_ms: int, count: int, baud: int, timeout_ms: int, timeout_char_ms: int):
+        self._byte_s = 10.0 / baud
+        self._timeout_s = timeout_ms / 1000.0
+        self._timeout_char_s = timeout_char_ms / 1000.0
+        self._data = SAMPLE_LINE * count
+        t0 = time.perf_counter() + 0.02
+        self.line_starts = [t0 + i * gap_ms / 1000.0 for i in range(count)]
+        self._arrival = []
+        for start in self.line_starts:
+            for j in range(len(SAMPLE_LINE)):
+                self._arrival.append(start + j * self._byte_s)
+        self._pos = 0
+
+    def _arrived(self, now: float) -> int:
+        n = self._pos
+        while n < len(self._arrival) and self._arrival[n] <= now:
+            n += 1
+        return n - self._pos
+
+    def any(self) -> int:
+        return self._arrived(time.perf_counter())
+
+    def done(self) -> bool:
+        return self._pos >= len(self._data)
+
+    def _copy(self, buf, n: int) -> int:
+        buf[:n] = self._data[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def readinto(self, buf) -> int | None:
+        avail = self.any()
+        if avail:
+            if avail >= len(buf) or self._pos + avail >= len(self._data):
+                return self._copy(buf, min(avail, len(buf)))
+        else:
+            deadline = time.perf_counter() + self._timeout_s
+            while not self.any():
+                if time.perf_counter() >= deadline or self.done():
+                    return None
+                time.sleep(0.0005)
+        # Blocking read: keep going until buffer full or inter-char timeout.
+        got = 0
+        while got < len(buf) and self._pos < len(self._data):
+            avail = self.any()
+            if avail:
+                got += self._copy(buf[got:], min(avail, len(buf) - got))
+                continue
+            next_at = self._arrival[self._pos]
+            if next_at - time.perf_counter() > self._timeout_char_s:
+                time.sleep(self._timeout_char_s)
+                break
+            time.sleep(max(next_at - time.perf_counter(), 0))
+        return got
+
+
+def _bench(mode: str, args: argparse.Namespace) -> None:
+    uart = TimedUART(args.gap_ms, args.requests, config.UART_BAUD, config.UART_READ_TIMEOUT_MS, config.UART_READ_TIMEOUT_MS)
+    reader = protocol.LineReader(uart, wait_mode=mode)
+    lat_true = []
+    lat_metric = []
+    seen = 0
+    while seen < args.requests:
+        line = reader.readline()
+        now = time.perf_counter()
+        now_us = protocol._ticks_us()
+        if line is None:
+            if uart.done() and not reader.pending():
+                break
+            continue
+        lat_true.append((now - uart.line_starts[seen]) * 1000.0)
+        if reader.line_rx_us is not None:
+            lat_metric.append((now_us - reader.line_rx_us) / 1000.0)
+        seen += 1
+
+    def _fmt(values: list[float]) -> str:
+        if not values:
+            return "n/a"
+        ordered = sorted(values)
+        return "avg=%.2fms p50=%.2fms max=%.2fms" % (
+            sum(ordered) / len(ordered),
+            ordered[len(ordered) // 2],
+            ordered[-1],
+        )
+
+    print("%-5s (resolved=%s) lines=%d" % (mode, reader.wait_mode(), seen))
+    print("  first_byte->line (true):   %s" % _fmt(lat_true))
+    print("  rx_dispatch metric:        %s" % _fmt(lat_metric))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--gap-ms", type=int, default=150, help="spacing between request lines")
+    parser.add_argument("--modes", default="loop,any")
+    args = parser.parse_args()
+    for mode in args.modes.split(","):
+        _bench(mode.strip(), args)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
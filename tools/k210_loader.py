@@ -19,6 +19,8 @@ DEFAULT_FACE_MODEL = REPO_ROOT / "face_model_at_0x300000.kfpkg"
 DEFAULT_APP_FILES = [
     "config.py",
     "protocol.py",
+    "codec.py",
+    "frames.py",
     "storage.py",
     "faces.py",
     "objects.py",
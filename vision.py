@@ -3,6 +3,7 @@
 import config
 import storage
 from faces import FaceRuntime, VisionError as FaceError
+from frames import frame_context
 from objects import ObjectRuntime, VisionError as ObjectError
 
 try:
@@ -42,6 +43,174 @@ def _ticks_diff(a, b):
   return a - b
 
 
+def _ticks_add(base, delta):
+  if hasattr(_time, "ticks_add"):
+    return _time.ticks_add(base, delta)
+  return base + delta
+
+
+# Stages whose estimated costs make up one frame of each command.
+_SCAN_STAGES = ("capture", "face_detect", "face_match", "objects")
+_WHO_STAGES = ("capture", "face_detect", "face_match")
+_OBJECTS_STAGES = ("capture", "objects")
+
+
+class StageCosts:
+  """EWMA of per-stage frame costs in ms; unseen stages estimate as 0."""
+
+  def __init__(self, alpha=config.STAGE_COST_ALPHA):
+    self._alpha = alpha
+    self._ewma = {}
+
+  def add(self, stage, ms):
+    old = self._ewma.get(stage)
+    if old is None:
+      self._ewma[stage] = float(ms)
+    else:
+      self._ewma[stage] = old + self._alpha * (ms - old)
+
+  def estimate(self, stages):
+    total = 0.0
+    for stage in stages:
+      total += self._ewma.get(stage, 0.0)
+    return int(total)
+
+  def as_dict(self):
+    out = {}
+    for stage in self._ewma:
+      out[stage] = int(self._ewma[stage])
+    return out
+
+
+class FrameVotes:
+  """Per-frame votes updated as frames arrive, for RELIABLE early exit.
+
+  Only decides when to stop; the final answer still comes from
+  FaceRuntime.vote_people() and VisionRuntime._aggregate_objects().
+  """
+
+  def __init__(self, frames, faces=True, objects=True, stable_frames=config.OBJECTS_STABLE_FRAMES):
+    self._frames = frames
+    self._faces = faces
+    self._objects = objects
+    self._stable_frames = stable_frames
+    self._used = 0
+    self._counts = {}
+    self._labels = None
+    self._stable = 0
+
+  def add(self, person=None, labels=None):
+    """Record one frame; True once further frames cannot change the outcome."""
+    self._used += 1
+    if person is not None:
+      self._counts[person] = self._counts.get(person, 0) + 1
+    if labels is not None:
+      key = tuple(sorted(labels))
+      if key == self._labels:
+        self._stable += 1
+      else:
+        self._labels = key
+        self._stable = 1
+    if self._faces and not self._person_settled():
+      return False
+    if self._objects and not self._objects_settled():
+      return False
+    return True
+
+  def _person_settled(self):
+    first = 0
+    second = 0
+    for person in self._counts:
+      n = self._counts[person]
+      if n > first:
+        second = first
+        first = n
+      elif n > second:
+        second = n
+    # Strict: a tie would be broken by confidence, which later frames can change.
+    return first - second > self._frames - self._used
+
+  def _objects_settled(self):
+    return self._stable_frames > 0 and self._stable >= self._stable_frames
+
+
+def _l_mean(stat):
+  if hasattr(stat, "l_mean"):
+    return int(stat.l_mean())
+  return int(stat[0])
+
+
+def frame_signature(frame, grid=config.MOTION_GRID):
+  """Mean luminance of a grid x grid split of `frame`, or None if unsupported."""
+  frame = frame_context(frame)
+  try:
+    cw = frame.width() // grid
+    ch = frame.height() // grid
+    if cw < 1 or ch < 1:
+      return None
+    sig = []
+    for gy in range(grid):
+      for gx in range(grid):
+        sig.append(_l_mean(frame.statistics((gx * cw, gy * ch, cw, ch))))
+    return sig
+  except Exception:
+    return None
+
+
+def signature_delta(a, b):
+  if len(a) != len(b) or not a:
+    return 255
+  total = 0
+  for i in range(len(a)):
+    total += abs(a[i] - b[i])
+  return total // len(a)
+
+
+class MotionGate:
+  """Reuses the last per-stage result ("face"/"objects") while the scene is static."""
+
+  def __init__(self, threshold=config.MOTION_THRESHOLD, max_age_ms=config.MOTION_MAX_REUSE_MS):
+    self._threshold = threshold
+    self._max_age_ms = max_age_ms
+    # stage -> (result, ticks_ms, signature of the frame it was computed on)
+    self._entries = {}
+    self._sig = None
+    self.ran = 0
+    self.reused = 0
+
+  def observe(self, frame):
+    self._sig = None
+    if config.MOTION_GATE_ENABLED:
+      self._sig = frame_signature(frame)
+
+  def lookup(self, stage):
+    entry = self._entries.get(stage)
+    if entry is None or self._sig is None:
+      return None
+    if _ticks_diff(_ticks_ms(), entry[1]) > self._max_age_ms:
+      return None
+    if signature_delta(entry[2], self._sig) > self._threshold:
+      return None
+    self.reused += 1
+    return entry[0]
+
+  def store(self, stage, result):
+    self.ran += 1
+    if self._sig is None:
+      self._entries.pop(stage, None)
+      return
+    self._entries[stage] = (result, _ticks_ms(), self._sig)
+
+  def clear(self, stage=None):
+    if stage is None:
+      self._entries = {}
+    else:
+      self._entries.pop(stage, None)
+
+  def as_dict(self):
+    return {"ran": self.ran, "reused": self.reused}
+
+
 def _bool_arg(value, default=False):
   if value is None:
     return default
@@ -53,6 +222,121 @@ def _bool_arg(value, default=False):
   return text in ("1", "true", "yes", "on")
 
 
+def _mode_from_args(args):
+  if isinstance(args, dict):
+    return str(args.get("mode", "RELIABLE")).upper()
+  return "RELIABLE"
+
+
+def _frames_from_args(args):
+  mode = _mode_from_args(args)
+
+  default_frames = 3
+  if mode == "FAST":
+    default_frames = 1
+
+  frames = default_frames
+  if isinstance(args, dict) and "frames" in args:
+    try:
+      frames = int(args.get("frames"))
+    except Exception:
+      frames = default_frames
+
+  if frames < 1:
+    frames = 1
+  if frames > config.MAX_SCAN_FRAMES:
+    frames = config.MAX_SCAN_FRAMES
+  return frames
+
+
+def all_faces_requested(args):
+  """Whether WHO/SCAN `args` ask for every face ("all_faces") rather than the largest."""
+  return isinstance(args, dict) and _bool_arg(args.get("all_faces"), False)
+
+
+def merge_scan_args(face_args, object_args):
+  """Args for one SCAN covering several WHO (face_args) / OBJECTS (object_args) requests."""
+  frames = 1
+  for args in face_args + object_args:
+    frames = max(frames, _frames_from_args(args))
+  # Objects may only be skipped on a missing model if every objects consumer allows it.
+  allow_partial = True
+  for args in object_args:
+    if not (isinstance(args, dict) and _bool_arg(args.get("allow_partial"), False)):
+      allow_partial = False
+  merged = {"frames": frames, "allow_partial": allow_partial}
+  for args in face_args:
+    if all_faces_requested(args):
+      merged["all_faces"] = True
+  return merged
+
+
+def who_from_scan(result):
+  out = {
+    "person": result["person"],
+    "frames": result["frames"],
+  }
+  for key in ("frames_used", "partial"):
+    if key in result:
+      out[key] = result[key]
+  for key in ("confidence", "faces"):
+    if key in result:
+      out[key] = result[key]
+  return out
+
+
+def _largest_face(multi):
+  """recognize_frame()-style sample from a recognize_faces() result."""
+  faces = multi["faces"]
+  if not faces:
+    return {"person": config.PERSON_NONE, "confidence": 0.0, "faces_detected": 0}
+  return {
+    "person": faces[0]["person"],
+    "confidence": faces[0]["confidence"],
+    "faces_detected": multi["faces_detected"],
+  }
+
+
+def run_steps(steps, between_frames=None):
+  """Drive a *_steps() generator to its result.
+
+  The generators yield None at every frame boundary and the result last;
+  `between_frames()` runs at each boundary (the runtime serves the UART there).
+  """
+  result = None
+  for result in steps:
+    if result is None and between_frames is not None:
+      between_frames()
+  return result
+
+
+def objects_from_scan(result):
+  out = {
+    "objects": result["objects"],
+    "frames": result["frames"],
+    "truncated": result["truncated"],
+  }
+  for key in ("frames_used", "partial"):
+    if key in result:
+      out[key] = result[key]
+  return out
+
+
+# VisionError message -> component that recover() resets. Other messages
+# (timeout, internal) are not attributable: they are counted as "other" and
+# only drop per-frame state, never escalating to a full reset.
+_RECOVER_COMPONENTS = {
+  "camera": "camera",
+  "snapshot": "camera",
+  "face_model": "face",
+  "face_detect": "face",
+  "face_embed": "face",
+  "objects_detect": "objects",
+}
+# Failures that say nothing about the hardware (LEARN saw no face).
+_RECOVER_IGNORED = ("no_face",)
+
+
 class VisionRuntime:
   def __init__(self, face_runtime=None, object_runtime=None):
     self._sensor = None
@@ -61,6 +345,22 @@ class VisionRuntime:
     self._debug_enabled = False
     self._last_debug = {}
     self._camera_ready = False
+    self._profile = "faces"
+    self._windowing = True
+    self._objects_streak = 0
+    self._profile_switches = 0
+    # FrameContext conversions run vs. served from the per-frame memo.
+    self._prep = {"done": 0, "saved": 0}
+    self._costs = StageCosts()
+    self._motion = MotionGate()
+    # "CMD:frames:allow_partial" -> (result, ticks_ms)
+    self._results = {}
+    # Per-component failures: totals for STATS, streaks since the last success.
+    self._failures = {"camera": 0, "face": 0, "objects": 0, "other": 0}
+    self._fail_streak = {}
+    self._full_resets = 0
+    self._backoff_ms = config.RECOVER_BACKOFF_MS
+    self._next_full_ms = None
     _usb_debug("init")
 
   def _load_sensor(self):
@@ -80,6 +380,7 @@ class VisionRuntime:
       self._sensor.set_framesize(self._sensor.QVGA)
       self._sensor.run(1)
       self._sensor.skip_frames(time=250)
+      self._profile = "faces"
       self._camera_ready = True
       _usb_debug("camera", "ready")
     except Exception:
@@ -87,18 +388,185 @@ class VisionRuntime:
       _usb_debug("camera", "init_failed")
       raise VisionError("VISION_FAILED", "camera")
 
+  def _use_profile(self, name):
+    self._ensure_camera()
+    if name == self._profile or not self._windowing:
+      return
+    window = config.SENSOR_PROFILES.get(name)
+    if name == "objects":
+      # Window the sensor to the learned model input so detect_frame skips the resize.
+      dims_fn = getattr(self._objects, "input_dims", None)
+      dims = dims_fn() if dims_fn is not None else None
+      if dims:
+        window = dims
+    started = _ticks_ms()
+    try:
+      self._sensor.set_windowing(window)
+      self._sensor.skip_frames(time=config.SENSOR_PROFILE_SETTLE_MS)
+    except Exception:
+      # No windowing on this build: stay on full frames, objects resize on the CPU.
+      _usb_debug("sensor", "windowing_unsupported")
+      self._windowing = False
+      try:
+        self._sensor.set_windowing(config.SENSOR_PROFILES["faces"])
+      except Exception:
+        pass
+      self._profile = "faces"
+      return
+    self._costs.add("profile_switch", _ticks_diff(_ticks_ms(), started))
+    self._profile_switches += 1
+    self._profile = name
+    # Motion references belong to the old window.
+    self._motion.clear()
+    _usb_debug("sensor", "profile=%s" % name, "window=%dx%d" % window)
+
+  def _face_profile(self):
+    self._objects_streak = 0
+    self._use_profile("faces")
+
+  def _objects_profile(self):
+    # Lazy: a single OBJECTS between face requests is not worth two switches.
+    self._objects_streak += 1
+    if self._profile == "objects" or self._objects_streak >= config.SENSOR_PROFILE_STREAK:
+      self._use_profile("objects")
+    else:
+      self._ensure_camera()
+
+  def _sensor_stats(self):
+    return {
+      "profile": self._profile,
+      "switches": self._profile_switches,
+      "switch_ms": self._costs.estimate(("profile_switch",)),
+    }
+
   def _capture(self):
+    """Next frame as a FrameContext."""
     self._ensure_camera()
+    started = _ticks_ms()
     try:
-      return self._sensor.snapshot()
+      frame = self._sensor.snapshot()
     except Exception:
       _usb_debug("camera", "snapshot_failed")
       raise VisionError("VISION_FAILED", "snapshot")
+    self._costs.add("capture", _ticks_diff(_ticks_ms(), started))
+    frame = frame_context(frame, self._prep)
+    self._motion.observe(frame)
+    return frame
+
+  def _recognize(self, frame):
+    face = self._motion.lookup("face")
+    if face is not None:
+      return face
+    try:
+      face = self._face.recognize_frame(frame, self._costs)
+    except FaceError as err:
+      raise VisionError(err.code, err.message)
+    self._motion.store("face", face)
+    return face
+
+  def _recognize_all(self, frame):
+    faces = self._motion.lookup("faces")
+    if faces is not None:
+      return faces
+    try:
+      faces = self._face.recognize_faces(frame, self._costs)
+    except FaceError as err:
+      raise VisionError(err.code, err.message)
+    self._motion.store("faces", faces)
+    return faces
+
+  def _detect_objects(self, frame, allow_partial):
+    labels = self._motion.lookup("objects")
+    if labels is not None:
+      return labels
+    started = _ticks_ms()
+    try:
+      labels = self._objects.detect_frame(frame, allow_partial=allow_partial)
+    except ObjectError as err:
+      raise VisionError(err.code, err.message)
+    self._costs.add("objects", _ticks_diff(_ticks_ms(), started))
+    if self._objects.model_source():
+      # An empty allow_partial result for a missing model must not be replayed.
+      self._motion.store("objects", labels)
+    return labels
 
   def _check_deadline(self, deadline_ms):
     if _ticks_diff(_ticks_ms(), deadline_ms) > 0:
       raise VisionError("TIMEOUT", "timeout")
 
+  def _can_start_frame(self, done, stages, deadline_ms):
+    """Whether to run another frame; the first one always starts (or times out)."""
+    if done == 0:
+      self._check_deadline(deadline_ms)
+      return True
+    remaining = _ticks_diff(deadline_ms, _ticks_ms())
+    estimate = self._costs.estimate(stages)
+    if remaining > estimate + config.DEADLINE_GUARD_MS:
+      return True
+    _usb_debug("deadline", "stop_after=%d" % done, "remaining=%d" % remaining, "est=%d" % estimate)
+    return False
+
+  def _votes(self, args, frames, faces, objects):
+    if not config.EARLY_EXIT_VOTING or _mode_from_args(args) != "RELIABLE" or frames < 2:
+      return None
+    return FrameVotes(frames, faces=faces, objects=objects)
+
+  def _cache_key(self, cmd, args):
+    allow_partial = 0
+    if cmd != "WHO" and _bool_arg(args.get("allow_partial"), False):
+      allow_partial = 1
+    all_faces = 0
+    if cmd != "OBJECTS" and all_faces_requested(args):
+      all_faces = 1
+    return "%s:%d:%d:%d" % (cmd, _frames_from_args(args), allow_partial, all_faces)
+
+  def _cached_result(self, cmd, args):
+    max_age_ms = args.get("max_age_ms")
+    if max_age_ms is None:
+      return None
+    try:
+      max_age_ms = int(max_age_ms)
+    except Exception:
+      return None
+    entry = self._results.get(self._cache_key(cmd, args))
+    if entry is None:
+      return None
+    age = _ticks_diff(_ticks_ms(), entry[1])
+    if age > max_age_ms or age > config.RESULT_CACHE_TTL_MS:
+      return None
+    result = dict(entry[0])
+    result["age_ms"] = age
+    # No frames were taken for this answer; the debug must not be the filler's.
+    self._last_debug = {"elapsed_ms": 0, "age_ms": age}
+    _usb_debug("cache_hit", cmd, "age=%d" % age)
+    return result
+
+  def _remember(self, cmd, args, result):
+    if result.get("partial"):
+      return
+    now = _ticks_ms()
+    # A copy: _enrich_debug() later attaches this request's debug to `result`.
+    self._results[self._cache_key(cmd, args)] = (dict(result), now)
+    if cmd == "SCAN":
+      # A SCAN answers WHO and OBJECTS over the same frames.
+      self._results[self._cache_key("WHO", args)] = (who_from_scan(result), now)
+      self._results[self._cache_key("OBJECTS", args)] = (objects_from_scan(result), now)
+
+  def _forget_faces(self):
+    self._motion.clear("face")
+    self._motion.clear("faces")
+    for key in list(self._results):
+      if not key.startswith("OBJECTS:"):
+        del self._results[key]
+
+  def _frames_result(self, result, done, frames, early=False):
+    if early:
+      result["frames"] = frames
+      result["frames_used"] = done
+    elif done < frames:
+      result["partial"] = True
+    return result
+
   def boot(self):
     _usb_debug("boot", "start")
     self._ensure_camera()
@@ -134,33 +602,61 @@ class VisionRuntime:
     }
 
   def _scan_frames_count(self, args):
-    mode = "RELIABLE"
-    if isinstance(args, dict):
-      mode = str(args.get("mode", "RELIABLE")).upper()
-
-    default_frames = 3
-    if mode == "FAST":
-      default_frames = 1
-
-    frames = default_frames
-    if isinstance(args, dict) and "frames" in args:
-      try:
-        frames = int(args.get("frames"))
-      except Exception:
-        frames = default_frames
-
-    if frames < 1:
-      frames = 1
-    if frames > config.MAX_SCAN_FRAMES:
-      frames = config.MAX_SCAN_FRAMES
-    return frames
+    return _frames_from_args(args)
 
   def _enrich_debug(self, result):
     if self._debug_enabled:
       result["debug"] = self._last_debug
     return result
 
-  def recover(self):
+  def recover(self, reason=None):
+    """Reset after a failure; `reason` (the VisionError message) scopes it to one component.
+
+    Without a reason everything is reset, as after repeated failures.
+    """
+    if reason is None:
+      self._reset_all()
+      return
+    if reason in _RECOVER_IGNORED:
+      return
+    component = _RECOVER_COMPONENTS.get(reason, "other")
+    self._failures[component] += 1
+    # Motion references and cached results may come from the failed component.
+    self._motion.clear()
+    self._results = {}
+    if component == "other":
+      _usb_debug("recover", component)
+      return
+    streak = self._fail_streak.get(component, 0) + 1
+    self._fail_streak[component] = streak
+
+    now = _ticks_ms()
+    if streak >= config.RECOVER_ESCALATE_AFTER and (
+      self._next_full_ms is None or _ticks_diff(now, self._next_full_ms) >= 0
+    ):
+      _usb_debug("recover", "escalate", component, "streak=%d" % streak, "backoff_ms=%d" % self._backoff_ms)
+      self._reset_all()
+      self._next_full_ms = _ticks_add(now, self._backoff_ms)
+      self._backoff_ms = min(self._backoff_ms * 2, config.RECOVER_BACKOFF_MAX_MS)
+      return
+    _usb_debug("recover", component, "streak=%d" % streak)
+    self._reset_component(component)
+
+  def _reset_component(self, component):
+    if component == "camera":
+      self._camera_ready = False
+    elif component == "face":
+      try:
+        self._face.deinit()
+      except Exception:
+        pass
+    elif component == "objects":
+      try:
+        self._objects.deinit()
+      except Exception:
+        pass
+
+  def _reset_all(self):
     _usb_debug("recover", "start")
     try:
       self._face.deinit()
@@ -171,8 +667,27 @@ class VisionRuntime:
     except Exception:
       pass
     self._camera_ready = False
+    self._motion.clear()
+    self._results = {}
+    self._fail_streak = {}
+    self._full_resets += 1
     _usb_debug("recover", "done")
 
+  def _healthy(self, components):
+    for name in components:
+      self._fail_streak.pop(name, None)
+    self._fail_streak.pop("other", None)
+    if not self._fail_streak:
+      self._backoff_ms = config.RECOVER_BACKOFF_MS
+
+  def template_stats(self):
+    return self._face.template_stats()
+
+  def recovery_stats(self):
+    out = dict(self._failures)
+    out["full"] = self._full_resets
+    return out
+
   def _aggregate_objects(self, per_frame):
     seen = {}
     for labels in per_frame:
@@ -192,114 +707,192 @@ class VisionRuntime:
     return ordered, truncated
 
   def scan(self, args, deadline_ms):
+    return run_steps(self.scan_steps(args, deadline_ms))
+
+  def scan_steps(self, args, deadline_ms):
     if args is None:
       args = {}
+    cached = self._cached_result("SCAN", args)
+    if cached is not None:
+      yield self._enrich_debug(cached)
+      return
+    self._face_profile()
     frames = self._scan_frames_count(args)
     allow_partial = _bool_arg(args.get("allow_partial"), False)
+    all_faces = all_faces_requested(args)
 
     person_samples = []
+    faces_samples = []
     objects_samples = []
+    # Every tracked face needs its frames, so all_faces never stops early.
+    votes = None if all_faces else self._votes(args, frames, True, True)
+    early = False
     begin_ms = _ticks_ms()
 
-    for _ in range(frames):
-      self._check_deadline(deadline_ms)
+    for done in range(frames):
+      if not self._can_start_frame(done, _SCAN_STAGES, deadline_ms):
+        break
       frame = self._capture()
-
-      try:
-        face = self._face.recognize_frame(frame)
-      except FaceError as err:
-        raise VisionError(err.code, err.message)
-
-      try:
-        objs = self._objects.detect_frame(frame, allow_partial=allow_partial)
-      except ObjectError as err:
-        raise VisionError(err.code, err.message)
-
+      if all_faces:
+        multi = self._recognize_all(frame)
+        faces_samples.append(multi)
+        face = _largest_face(multi)
+      else:
+        face = self._recognize(frame)
+      objs = self._detect_objects(frame, allow_partial)
       person_samples.append(face)
       objects_samples.append(objs)
+      yield None
+      if votes is not None and done + 1 < frames and votes.add(face.get("person"), objs):
+        early = True
+        break
 
     agg = self._face.vote_people(person_samples)
     objects, truncated = self._aggregate_objects(objects_samples)
 
+    done = len(person_samples)
     self._last_debug = {
       "elapsed_ms": _ticks_diff(_ticks_ms(), begin_ms),
       "templates": self._face.templates_loaded(),
+      "recognizer": self._face.recognizer_stats(),
       "object_model": self._objects.model_source(),
+      "stage_ms": self._costs.as_dict(),
+      "motion": self._motion.as_dict(),
+      "sensor": self._sensor_stats(),
+      "prep": dict(self._prep),
     }
 
     result = {
       "person": agg["person"],
       "faces_detected": int(agg["faces_detected"]),
       "objects": objects,
-      "frames": frames,
+      "frames": done,
       "truncated": truncated,
     }
+    self._frames_result(result, done, frames, early)
     if agg["person"] != config.PERSON_NONE:
       result["confidence"] = {"person": round(float(agg["confidence"]), 2)}
-    _usb_debug("scan", "frames=%d" % frames, "person=%s" % result["person"], "objs=%d" % len(objects))
-    return self._enrich_debug(result)
+    if all_faces:
+      result["faces"] = self._face.vote_faces(faces_samples)
+    _usb_debug("scan", "frames=%d/%d" % (done, frames), "person=%s" % result["person"], "objs=%d" % len(objects))
+    self._healthy(("camera", "face", "objects"))
+    self._remember("SCAN", args, result)
+    yield self._enrich_debug(result)
 
   def who(self, args, deadline_ms):
+    return run_steps(self.who_steps(args, deadline_ms))
+
+  def who_steps(self, args, deadline_ms):
     if args is None:
       args = {}
+    cached = self._cached_result("WHO", args)
+    if cached is not None:
+      yield self._enrich_debug(cached)
+      return
+    self._face_profile()
     frames = self._scan_frames_count(args)
     begin_ms = _ticks_ms()
+    all_faces = all_faces_requested(args)
     samples = []
+    faces_samples = []
+    votes = None if all_faces else self._votes(args, frames, True, False)
+    early = False
 
-    for _ in range(frames):
-      self._check_deadline(deadline_ms)
+    for done in range(frames):
+      if not self._can_start_frame(done, _WHO_STAGES, deadline_ms):
+        break
       frame = self._capture()
-      try:
-        samples.append(self._face.recognize_frame(frame))
-      except FaceError as err:
-        raise VisionError(err.code, err.message)
-
+      if all_faces:
+        multi = self._recognize_all(frame)
+        faces_samples.append(multi)
+        face = _largest_face(multi)
+      else:
+        face = self._recognize(frame)
+      samples.append(face)
+      yield None
+      if votes is not None and done + 1 < frames and votes.add(face.get("person")):
+        early = True
+        break
+
+    done = len(samples)
     agg = self._face.vote_people(samples)
     self._last_debug = {
       "elapsed_ms": _ticks_diff(_ticks_ms(), begin_ms),
       "templates": self._face.templates_loaded(),
+      "recognizer": self._face.recognizer_stats(),
+      "stage_ms": self._costs.as_dict(),
+      "motion": self._motion.as_dict(),
+      "sensor": self._sensor_stats(),
+      "prep": dict(self._prep),
     }
 
     result = {
       "person": agg["person"],
-      "frames": frames,
+      "frames": done,
     }
+    self._frames_result(result, done, frames, early)
     if agg["person"] != config.PERSON_NONE:
       result["confidence"] = {"person": round(float(agg["confidence"]), 2)}
-    _usb_debug("who", "frames=%d" % frames, "person=%s" % result["person"])
-    return self._enrich_debug(result)
+    if all_faces:
+      result["faces"] = self._face.vote_faces(faces_samples)
+    _usb_debug("who", "frames=%d/%d" % (done, frames), "person=%s" % result["person"])
+    self._healthy(("camera", "face"))
+    self._remember("WHO", args, result)
+    yield self._enrich_debug(result)
 
   def objects(self, args, deadline_ms):
+    return run_steps(self.objects_steps(args, deadline_ms))
+
+  def objects_steps(self, args, deadline_ms):
     if args is None:
       args = {}
+    cached = self._cached_result("OBJECTS", args)
+    if cached is not None:
+      yield self._enrich_debug(cached)
+      return
+    self._objects_profile()
     frames = self._scan_frames_count(args)
     allow_partial = _bool_arg(args.get("allow_partial"), False)
     begin_ms = _ticks_ms()
 
     per_frame = []
-    for _ in range(frames):
-      self._check_deadline(deadline_ms)
+    votes = self._votes(args, frames, False, True)
+    early = False
+    for done in range(frames):
+      if not self._can_start_frame(done, _OBJECTS_STAGES, deadline_ms):
+        break
       frame = self._capture()
-      try:
-        per_frame.append(self._objects.detect_frame(frame, allow_partial=allow_partial))
-      except ObjectError as err:
-        raise VisionError(err.code, err.message)
-
+      labels = self._detect_objects(frame, allow_partial)
+      per_frame.append(labels)
+      yield None
+      if votes is not None and done + 1 < frames and votes.add(labels=labels):
+        early = True
+        break
+
+    done = len(per_frame)
     labels, truncated = self._aggregate_objects(per_frame)
     self._last_debug = {
       "elapsed_ms": _ticks_diff(_ticks_ms(), begin_ms),
       "object_model": self._objects.model_source(),
+      "stage_ms": self._costs.as_dict(),
+      "motion": self._motion.as_dict(),
+      "sensor": self._sensor_stats(),
+      "prep": dict(self._prep),
     }
 
     result = {
       "objects": labels,
-      "frames": frames,
+      "frames": done,
       "truncated": truncated,
     }
-    _usb_debug("objects", "frames=%d" % frames, "count=%d" % len(labels), "trunc=%s" % truncated)
-    return self._enrich_debug(result)
-
-  def learn(self, args, deadline_ms):
+    self._frames_result(result, done, frames, early)
+    _usb_debug("objects", "frames=%d/%d" % (done, frames), "count=%d" % len(labels), "trunc=%s" % truncated)
+    self._healthy(("camera", "objects"))
+    self._remember("OBJECTS", args, result)
+    yield self._enrich_debug(result)
+
+  def learn(self, args, deadline_ms, between_frames=None):
+    """LEARN; `between_frames()` runs at each frame boundary, as in run_steps()."""
     if not isinstance(args, dict):
       args = {}
 
@@ -315,10 +908,12 @@ class VisionRuntime:
       frames = config.MAX_LEARN_FRAMES
 
     begin_ms = _ticks_ms()
+    self._face_profile()
     try:
-      result = self._face.learn(self._capture, person, frames, deadline_ms)
+      result = self._face.learn(self._capture, person, frames, deadline_ms, between_frames)
     except FaceError as err:
       raise VisionError(err.code, err.message)
+    self._forget_faces()
 
     self._last_debug = {
       "elapsed_ms": _ticks_diff(_ticks_ms(), begin_ms),
@@ -327,11 +922,29 @@ class VisionRuntime:
     _usb_debug("learn", "person=%s" % person, "frames=%d" % frames)
     return self._enrich_debug(result)
 
+  def list_faces(self):
+    result = self._face.list_faces()
+    _usb_debug("list_faces", "templates=%d" % result["templates"])
+    return result
+
+  def delete_face(self, args):
+    if not isinstance(args, dict):
+      args = {}
+    try:
+      result = self._face.delete_face(args.get("person"))
+    except FaceError as err:
+      raise VisionError(err.code, err.message)
+    self._forget_faces()
+    self._last_debug = {"templates": self._face.templates_loaded()}
+    _usb_debug("delete_face", "person=%s" % result["person"])
+    return self._enrich_debug(result)
+
   def reset_faces(self):
     try:
       result = self._face.reset_faces()
     except FaceError as err:
       raise VisionError(err.code, err.message)
+    self._forget_faces()
     self._last_debug = {"templates": 0}
     _usb_debug("reset_faces", "ok")
     return self._enrich_debug(result)